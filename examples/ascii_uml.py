@@ -21,7 +21,7 @@
 
 # this program will only map out first-generation subclasses and doesn't handle multiple inheritance
 
-import pyctags, os
+import pyctags
 srcdir = "../pyctags/"
 
 class class_def:
@@ -131,11 +131,7 @@ class python_class_harvester(pyctags.harvesters.base_harvester):
                     thisclass += 1
             print("")
 
-source_files = list()
-for (dirpath, dirs, files) in os.walk(srcdir):
-    for f in files:
-        if f[-3:] == '.py':
-            source_files.append(os.path.join(dirpath, f))
+source_files = pyctags.find_sources(srcdir, extensions=['.py'])
 
 harvester = python_class_harvester()
 ec = pyctags.exuberant_ctags()
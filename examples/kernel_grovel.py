@@ -28,20 +28,24 @@ srcdir = "../../temp extracts/linux-2.6.27"
 if sys.platform.lower()[:len('linux')] == 'linux':
     srcdir = os.path.realpath("/usr/src/linux")
 
-source_files = list()
-extensions = ['.c', '.h', '.s']
+# the language maps find_sources() matches against are read from the ctags program
+ec = pyctags.exuberant_ctags(tag_program='ctags')
 
 cl = time.clock()
 print ("Walking source tree %s..." % (srcdir))
-for (dirpath, dirs, files) in os.walk(srcdir):
-    for f in files:
-        if f[-2:] in extensions:
-            source_files.append(os.path.join(dirpath, f))
-            
+# every file the ctags language maps know, skipping what git ignores
+source_files = pyctags.find_sources(srcdir, ctags=ec, gitignore=True)
+
 print ("%.2f seconds elapsed, found %d source files." % (time.clock() - cl, len(source_files)))
 print ("This part will take a while.  I've seen it take five to eight minutes on my machine which isn't exactly tuff...")
 cl = time.clock()
-tf = pyctags.exuberant_ctags().generate_object(files=source_files, generator_options={"--fields" : "-sfk+Kn"})
+# split the tree between ctags processes, one per core
+try:
+    import multiprocessing
+    jobs = multiprocessing.cpu_count()
+except (ImportError, NotImplementedError):
+    jobs = 1
+tf = ec.generate_object(files=source_files, generator_options={"--fields" : "-sfk+Kn"}, jobs=jobs)
 
 print ("%d tags parsed in %.2f seconds." % (len(tf.tags), time.clock() - cl))
 cl = time.clock()
@@ -20,16 +20,10 @@
 
 import sys
 
-from pyctags import exuberant_ctags, ctags_file
+from pyctags import exuberant_ctags, ctags_file, find_sources
 from pyctags.harvesters import name_lookup_harvester, by_name_harvester
-import os
 
-source_files = list()
-
-for (dirpath, dirs, files) in os.walk("../"):
-    for f in files:
-        if f[-3:] == '.py':
-            source_files.append(os.path.join(dirpath, f))
+source_files = find_sources("../", extensions=['.py'])
 
 generator = exuberant_ctags(files=source_files)
 list_o_tags = generator.generate_tags(generator_options={'--fields' : '+n'})
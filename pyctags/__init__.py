@@ -57,9 +57,94 @@ Feel free to contact me for or with details.
 
 Pyctags is pretty heavy for large projects.  A 153 MB tag file generated from linux kernel sources takes a while to 
 process and consumes over 1.1GB of RAM.  I hope to discover more ways to trim this down without going for a C implementation.
+In the meantime, ctags_file and generate_object take a few options that help::
+
+    # keep tags in packed columns, entries are built when they're looked at
+    tag_file = ctags_file('tags', columnar=True)
+
+    # only decode extension fields when they're used
+    tag_file = ctags_file('tags', lazy_extensions=True)
+
+    # don't keep the tags at all, just feed them to harvesters
+    names = pyctags.harvesters.name_lookup_harvester()
+    ctags_file('tags', harvesters=[names], keep_tags=False)
+
+    # what ctags supports is probed once per executable and cached in ~/.cache/pyctags,
+    # or PYCTAGS_CACHE_DIR; set this to None to only cache it in memory
+    exuberant_ctags.probe_cache_dir = None
+
+    # split the source files between four ctags processes, the tags come out the same
+    tag_file = ctags.generate_object(jobs=4)
+
+    # inputs over batch_size bytes of source are split between ctags runs too, set it to None to always run ctags once
+    exuberant_ctags.batch_size = 64 * 1024 * 1024
+
+    # only run ctags on the files added or changed since the last run, using a manifest of the source files
+    from pyctags.tag_manifest import update_tagfile
+    (added, changed, removed) = update_tagfile(ctags, 'tags', 'tags.manifest', files=source_files, content_hash=True)
+
+    # or run many tagging jobs at once on an asyncio event loop
+    from pyctags import tag_async
+    tag_file = await tag_async.generate_object(exuberant_ctags(files=source_files))
+    tag_file = await tag_async.parse(ctags_file(), 'tags', columnar=True)
+
+    # Universal Ctags output is read as cross reference or JSON lines when the installed ctags can write them,
+    # entries are built straight from the fields instead of being split out of tag lines
+    from pyctags import universal_ctags
+    uctags = universal_ctags(files=source_files)
+    print(uctags.output_formats) # cheapest to parse first, such as ['xref', 'json', 'ctags']
+    tag_file = uctags.generate_object()
+
+    # find the source files ctags knows how to tag, scanning directories on several threads
+    from pyctags import find_sources
+    source_files = find_sources('src', ctags=ctags, exclude=['build', '*.min.js'], gitignore=True)
+
+    # keep tags fresh while files are edited, re-tagging only the files that were saved
+    from pyctags.tag_watch import tag_watcher
+    watcher = tag_watcher(ctags, 'src', harvesters=[names], gitignore=True)
+    watcher.start()
+    with watcher.lock:
+        print(names.starts_with('get_'))
+    watcher.stop()
+
+    # tag unsaved editor buffers in one ctags run, tags name the buffers' paths
+    tag_file = ctags.generate_buffers([('src/unsaved.py', buffer_text)])
+
+    # compressed tag files are decompressed as they're read
+    tagfile = ctags_file('tags.gz')
+
+    # or walk the entries yourself
+    for entry in ctags_file().iter_entries('tags'):
+        print(entry.name)
+
+    # pick up tags appended by ctags -a --sort=no since the file was parsed
+    tagfile = ctags_file('tags', harvesters=[kinds])
+    new_tags = tagfile.refresh()
+
+    # group tags by source file, so re-tagging one file only touches its tags
+    tagfile = ctags_file('tags', partitioned=True)
+    tagfile.replace_file('path/to/source.c', ctags.generate_tags(files=['path/to/source.c']))
+
+    # load from a binary snapshot while the tag file is unchanged, parse and save one otherwise
+    from pyctags.tag_snapshot import cached_ctags_file
+    tagfile = cached_ctags_file('tags', 'tags.snapshot', harvesters=[kinds])
+
+    # write tags back out, sorted so editors can binary search them
+    tagfile.write('filtered.tags', sort=1)
+
+    # merge sorted tag files without sorting them again
+    from pyctags.tag_writer import merge_tags
+    merge_tags(['core.tags', 'drivers.tags'], 'tags', deduplicate=True)
+
+    # Emacs TAGS files are read a source file at a time
+    from pyctags.etags_file import etags_file
+    etags = etags_file('TAGS')
+    main_tags = etags.find('main', files=['path/to/source.c'])
 """
 
 from pyctags.tag_file import ctags_file
 from pyctags.tag_entry import ctags_entry
 from pyctags.exuberant import exuberant_ctags
+from pyctags.universal import universal_ctags
+from pyctags.source_files import find_sources
 import pyctags.harvesters
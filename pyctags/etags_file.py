@@ -0,0 +1,253 @@
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not,
+##    see <http://www.gnu.org/licenses/>.
+
+"""
+Reader for Emacs style TAGS files, as written by etags or ctags -e.
+
+A TAGS file is a series of sections, one per source file.  Each starts with a form feed line and a 'file,size' header giving the size of the section in bytes.  Only the headers are read when the file is opened; a section is parsed the first time its tags are asked for, so looking up tags in one source file never parses the others.
+"""
+
+import mmap
+try:
+    # do relative imports for tests
+    # try this first in case pyctags is already installed, since we want to be testing the source bundled in the distribution
+    from kwargs_validator import the_validator as validator
+    from tag_entry import ctags_entry, extension_fields
+    from tag_compression import compression, read_tag_file
+except ImportError:
+    from pyctags.kwargs_validator import the_validator as validator
+    from pyctags.tag_entry import ctags_entry, extension_fields
+    from pyctags.tag_compression import compression, read_tag_file
+
+_SECTION_BEGIN_ = b'\x0c\n'
+_NAME_BEGIN_ = b'\x7f'
+_NAME_END_ = b'\x01'
+
+_IDENTIFIER_CHARS_ = '_$~.:'
+
+def _implicit_name(text):
+    """
+    Works out the name of a tag that etags left implicit: the last identifier in the definition text, ignoring trailing punctuation.
+    @param text: definition text from the tag line
+    @type text: unicode str
+    @rtype: unicode str
+    """
+    text = text.rstrip(' \t(=,;:[{')
+    start = len(text)
+    while start > 0 and (text[start - 1].isalnum() or text[start - 1] in _IDENTIFIER_CHARS_):
+        start -= 1
+    return text[start:]
+
+def _text_pattern(text):
+    """ Turns etags definition text, the start of the tagged line, into a vi style search pattern."""
+    return '/^' + text.replace('\\', '\\\\').replace('/', '\\/') + '/'
+
+class etags_file:
+    """
+    Reads an Emacs TAGS file, parsing each source file's section on demand.
+    """
+    def __init__(self, filename):
+        """
+        Opens and memory maps a TAGS file, and reads its section headers.
+        @param filename: TAGS file, decompressed into memory if it ends in .gz, .bz2 or .xz
+        @type filename: str
+        @raise IOError: the file can't be opened
+        @raise ValueError: the file isn't in etags format
+        """
+        self._file = None
+        self._map = None
+        if compression(filename):
+            # compressed files can't be mapped, they're decompressed into memory instead
+            self._data = read_tag_file(filename)
+        else:
+            self._file = open(filename, 'rb')
+            try:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._data = self._map
+            except ValueError:
+                # empty files can't be mapped
+                self._data = self._file.read()
+
+        self._strings = dict()
+        """ Intern table shared by the entries returned from this instance."""
+
+        self._sections = dict()
+        """ Source file name as key, list of (offset, size) of its sections as value.  Files appended with etags -a can have more than one section."""
+
+        self._files = list()
+        """ Source files in the order their sections appear."""
+
+        self.includes = list()
+        """ Other TAGS files included by this one."""
+
+        self._parsed = dict()
+        """ Tags of the sections parsed so far, by source file."""
+
+        self._read_sections()
+
+    def _read_sections(self):
+        """ Walks the section headers, using each section's size to skip over its tags."""
+        data = self._data
+        pos = 0
+        while pos < len(data):
+            if data[pos:pos + 2] != _SECTION_BEGIN_:
+                raise ValueError("Expected a section at offset " + str(pos) + ", this isn't an etags file.")
+            header_end = data.find(b'\n', pos + 2)
+            if header_end < 0:
+                header_end = len(data)
+            (file, junk, size) = data[pos + 2:header_end].decode('utf-8').rpartition(',')
+            start = header_end + 1
+
+            if size == 'include':
+                self.includes.append(file)
+                pos = start
+                continue
+
+            try:
+                end = start + int(size)
+            except ValueError:
+                raise ValueError("Bad section header for " + file + ".")
+            if end < len(data) and data[end:end + 2] != _SECTION_BEGIN_:
+                # the size is off, find the next section instead
+                end = data.find(_SECTION_BEGIN_, start)
+                if end < 0:
+                    end = len(data)
+            end = min(end, len(data))
+
+            if file not in self._sections:
+                self._files.append(file)
+                self._sections[file] = list()
+            self._sections[file].append((start, end - start))
+            pos = end
+
+    def close(self):
+        """ Releases the memory map and the file.  Sections already parsed stay available."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._data = b''
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def files(self):
+        """
+        @returns: source files with a section in the TAGS file, in file order
+        @rtype: list
+        """
+        return list(self._files)
+
+    def _parse_section(self, file):
+        """
+        Parses the tag lines of a source file's sections.
+        @returns: tags of the sections, in file order
+        @rtype: list of ctags_entry
+        """
+        strings = self._strings
+        sections = self._sections[file]
+        file = strings.setdefault(file, file)
+        entries = list()
+        for (start, size) in sections:
+            self._parse_lines(self._data[start:start + size], file, entries)
+        return entries
+
+    def _parse_lines(self, data, file, entries):
+        """ Appends the tags in the tag lines of one section to entries."""
+        for raw in data.split(b'\n'):
+            pos = raw.rfind(_NAME_BEGIN_)
+            if pos < 0:
+                continue
+            text = raw[:pos].decode('utf-8', 'replace')
+            rest = raw[pos + 1:]
+            name_end = rest.find(_NAME_END_)
+            if name_end < 0:
+                name = _implicit_name(text)
+            else:
+                name = rest[:name_end].decode('utf-8', 'replace')
+                rest = rest[name_end + 1:]
+
+            line_number = rest.split(b',', 1)[0].strip()
+            if line_number:
+                line_number = int(line_number)
+            else:
+                line_number = None
+
+            pattern = None
+            if text:
+                pattern = _text_pattern(text)
+            if pattern is None and line_number is None:
+                continue
+            entries.append(ctags_entry._from_fields(name, file, pattern, line_number, extension_fields()))
+
+    def file_tags(self, file):
+        """
+        Gets the tags of one source file, parsing its sections if they haven't been parsed yet.
+        @param file: source file name, as it appears in the TAGS file
+        @type file: str
+        @returns: tags of the file, empty if it has no section
+        @rtype: list of ctags_entry
+        """
+        if file not in self._parsed:
+            if file not in self._sections:
+                return list()
+            self._parsed[file] = self._parse_section(file)
+        return list(self._parsed[file])
+
+    def iter_entries(self, files=None):
+        """
+        Yields tags section by section.
+        @param files: source files to read, default is every file
+        @type files: list
+        @rtype: generator of ctags_entry
+        """
+        if files is None:
+            files = self._files
+        for file in files:
+            for entry in self.file_tags(file):
+                yield entry
+
+    def find(self, name, **kwargs):
+        """
+        Finds tags by name.
+            - B{Keyword Arguments:}
+                - B{files:} (list) only look in these source files' sections
+                - B{case_sensitive:} (bool) default True
+        @param name: tag name
+        @type name: str
+        @returns: matching tags
+        @rtype: list of ctags_entry
+        """
+        valid_kwargs = ['files', 'case_sensitive']
+        validator.validate(kwargs.keys(), valid_kwargs)
+        
+        case_sensitive = kwargs.get('case_sensitive', True)
+        if not case_sensitive:
+            name = name.upper()
+
+        found = list()
+        for entry in self.iter_entries(kwargs.get('files')):
+            if entry.name == name or (not case_sensitive and entry.name.upper() == name):
+                found.append(entry)
+        return found
@@ -19,23 +19,214 @@
 """
 Exuberant Ctags (U{http://ctags.sourceforge.net}) wrapper.
 
-This module uses the subprocess.Popen function.  Users of this module could pass arbitrary commands to the system.
+Ctags is started from an argument list with subprocess.Popen, never through a shell, but users of this module can still run any program as the ctags executable.
 """
-import subprocess, os, sys
+import subprocess, os, sys, tempfile, shutil, threading
 from copy import copy
+try:
+    import queue
+except ImportError:
+    # python 2
+    import Queue as queue
 #from string import strip, lstrip
 import re
 
 try:
     # do relative imports for tests
     # try this first in case pyctags is already installed, since we want to be testing the source bundled in the distribution
-    from tag_base import ctags_base
+    from tag_base import ctags_base, _file_list_chunks, _write_buffers
     from kwargs_validator import the_validator as validator
     from tag_file import ctags_file
+    from tag_writer import _merge_sorted, _sort_key, _UNSORTED_, _SORTED_, _FOLDCASE_
 except ImportError:
-    from pyctags.tag_base import ctags_base
+    from pyctags.tag_base import ctags_base, _file_list_chunks, _write_buffers
     from pyctags.kwargs_validator import the_validator as validator
     from pyctags import ctags_file
+    from pyctags.tag_writer import _merge_sorted, _sort_key, _UNSORTED_, _SORTED_, _FOLDCASE_
+
+def _file_sizes(files):
+    """
+    @returns: size of each file plus one, since empty and missing files still cost a process some work
+    @rtype: list
+    """
+    sizes = list()
+    for f in files:
+        try:
+            sizes.append(os.path.getsize(f) + 1)
+        except OSError:
+            sizes.append(1)
+    return sizes
+
+def _shard_files(files, jobs, sizes=None):
+    """
+    Splits a file list into contiguous shards of about the same total size.
+    Shards keep the files in their original order, so concatenating the shards gives back the file list.
+    @param files: source files
+    @type files: list
+    @param jobs: number of shards wanted, there are fewer if there are fewer files
+    @type jobs: int
+    @param sizes: sizes of the files from _file_sizes(), found out if not given
+    @type sizes: list
+    @returns: non-empty lists of files
+    @rtype: list
+    """
+    if sizes is None:
+        sizes = _file_sizes(files)
+
+    jobs = min(jobs, len(files))
+    total = float(sum(sizes))
+    shards = list()
+    start = 0
+    done = 0
+    for i in range(jobs):
+        target = total * (i + 1) / jobs
+        # leave at least one file for each of the remaining shards
+        limit = len(files) - (jobs - i - 1)
+        end = start
+        while end < limit and (end == start or done + sizes[end] / 2.0 <= target):
+            done += sizes[end]
+            end += 1
+        shards.append(files[start:end])
+        start = end
+    return shards
+
+_READ_SIZE_ = 1024 * 1024
+""" Bytes read from the ctags output pipe at a time."""
+
+_QUEUED_READS_ = 16
+""" Reads of ctags output held while the parser catches up, before the reader waits."""
+
+def _write_input(stream, chunks):
+    """ Writes ctags' file list to its stdin a chunk at a time and closes it, so ctags sees the end of the list."""
+    try:
+        for chunk in chunks:
+            stream.write(chunk)
+    except (IOError, OSError):
+        # ctags exited without reading everything, its return code says why
+        pass
+    try:
+        stream.close()
+    except (IOError, OSError):
+        pass
+
+def _read_output(stream, reads):
+    """ Reads a pipe in large blocks until it's closed, putting the blocks on a queue.  None is put last."""
+    fd = stream.fileno()
+    try:
+        while True:
+            data = os.read(fd, _READ_SIZE_)
+            if not data:
+                break
+            reads.put(data)
+    finally:
+        reads.put(None)
+
+def _read_messages(stream, messages):
+    """ Reads all of a pipe, for the messages ctags writes to stderr."""
+    messages.append(stream.read())
+
+def _pipeline(p, file_list, messages):
+    """
+    Runs a ctags process started with pipes for stdin, stdout and stderr, yielding its output lines as they arrive.
+    One thread writes the file list, one drains stdout into a queue and one drains stderr, so ctags never waits on a full pipe while the lines are parsed.
+    Closing the generator early kills ctags.
+    @param p: ctags process
+    @type p: subprocess.Popen
+    @param file_list: input for ctags, written a chunk at a time
+    @type file_list: iterable of bytes
+    @param messages: list the stderr output is appended to, complete once the generator is done
+    @type messages: list
+    @returns: lines without line endings
+    @rtype: generator of bytes
+    """
+    reads = queue.Queue(_QUEUED_READS_)
+    threads = [threading.Thread(target=_write_input, args=(p.stdin, file_list)),
+        threading.Thread(target=_read_output, args=(p.stdout, reads)),
+        threading.Thread(target=_read_messages, args=(p.stderr, messages))]
+    for t in threads:
+        t.daemon = True
+        t.start()
+
+    finished = False
+    try:
+        rest = b''
+        while True:
+            data = reads.get()
+            if data is None:
+                finished = True
+                break
+            lines = (rest + data).split(b'\n')
+            rest = lines.pop()
+            for line in lines:
+                line = line.rstrip(b'\r')
+                if len(line):
+                    yield line
+        rest = rest.rstrip(b'\r')
+        if len(rest):
+            yield rest
+    finally:
+        if not finished:
+            # the lines weren't all wanted, stop ctags and let the reader finish
+            try:
+                p.kill()
+            except OSError:
+                pass
+            while reads.get() is not None:
+                pass
+        for t in threads:
+            t.join()
+        p.wait()
+        p.stdout.close()
+        p.stderr.close()
+
+def _finish_run(run):
+    """
+    Waits for a ctags process started by _run_shards and closes its output files.
+    @param run: (process, stdout file, stderr file)
+    @type run: tuple
+    @returns: return code of the process
+    @rtype: int
+    """
+    (p, out, err) = run
+    try:
+        return p.wait()
+    finally:
+        out.close()
+        err.close()
+
+def _buffer_lines(lines, virtual):
+    """
+    Renames the files in tag lines, from the files buffers were written to back to the buffers' virtual paths.
+    @param lines: tag lines without line endings
+    @type lines: iterable of bytes
+    @param virtual: file written as key, virtual path as value
+    @type virtual: dict
+    @rtype: generator of bytes
+    """
+    names = dict()
+    for (f, path) in virtual.items():
+        names[f.encode('utf-8')] = path.encode('utf-8')
+    for line in lines:
+        fields = line.split(b'\t', 2)
+        if len(fields) == 3 and fields[1] in names:
+            line = b'\t'.join([fields[0], names[fields[1]], fields[2]])
+        yield line
+
+def _output_sort(gen_opts):
+    """
+    @returns: sort type of the tags ctags writes with these options, or None if its output isn't in ctags format
+    @rtype: int
+    """
+    if '-e' in gen_opts:
+        return None
+    if '-u' in gen_opts:
+        return _UNSORTED_
+    sort = gen_opts.get('--sort', 'yes')
+    if sort == 'no':
+        return _UNSORTED_
+    if sort == 'foldcase':
+        return _FOLDCASE_
+    return _SORTED_
 
 class exuberant_ctags(ctags_base):
     """
@@ -53,6 +244,9 @@ class exuberant_ctags(ctags_base):
     __exuberant_id = "exuberant ctags"
     __supported_versions = ["5.7", "5.6b1", "5.8"]
     __warning_str = ": Warning:"
+    _probe_fields = ['version', 'language_info', 'language_extensions', 'all_extensions']
+    batch_size = 256 * 1024 * 1024
+    """ Most bytes of source one ctags process is given.  Larger inputs are split between several processes, run jobs at a time, and their output combined as one process would have written it.  None never splits a run."""
     
     def __init__(self, *args, **kwargs):
         """
@@ -132,13 +326,11 @@ class exuberant_ctags(ctags_base):
         @raise TypeError: Executable is not Exuberant Ctags.
         """
         
-        shell_str = path + ' ' + self.__version_opt
-
-        p = subprocess.Popen(shell_str, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
+        p = subprocess.Popen([path, self.__version_opt], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         (out, err) = p.communicate()
         outstr = out.decode("utf-8")
         if outstr.lower().find(self.__exuberant_id) < 0:
-            raise TypeError("Executable file " + self._executable_path + " is not Exuberant Ctags")
+            raise TypeError("Executable file " + path + " is not Exuberant Ctags")
         
         comma = outstr.find(',')
         self.version = outstr[len(self.__exuberant_id):comma].strip()
@@ -147,43 +339,42 @@ class exuberant_ctags(ctags_base):
             print("Version %s of Exuberant Ctags isn't known to work, but might." % (self.version))
 
         # find out what this version of ctags supports in terms of language and kinds of tags
-        p = subprocess.Popen(path + ' ' + self.__list_kinds_opt, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
+        p = subprocess.Popen([path, self.__list_kinds_opt], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         (out, err) = p.communicate()
         
         self.language_info = self.__process_kinds_list(out.decode("utf-8").splitlines())
         
-        p = subprocess.Popen(path + ' ' + self.__list_maps_opt, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
+        p = subprocess.Popen([path, self.__list_maps_opt], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         (out, err) = p.communicate()
         self.language_extensions = self.__process_maps_list([x.strip() for x in out.decode("utf-8").splitlines()])
         self.all_extensions = [y for x in self.language_extensions.values() for y in x]
         
-    def _dict_to_args(self, gen_opts):
+    def _dict_to_argv(self, gen_opts):
         """
-        Converts from a dict with command line arguments to a string to feed exuberant ctags on the comand line.
+        Converts from a dict with command line arguments to the argument list of an exuberant ctags process, starting with the executable.
+        Arguments are passed to ctags as they are, without a shell, so file names with spaces or quotes need no quoting.
         @param gen_opts: command line arguments, key=argument, value=setting
         @type gen_opts: dict
-        @rtype: str
+        @rtype: list
         """
-        
-        # because yargs sounds like a pirate
-        yargs = ""
+        # flags go first, then the options with values
+        argv = [self._executable_path]
+        argv.extend([k for k, v in gen_opts.items() if k in self.__argless_args or v is None])
         for k, v in gen_opts.items():
-            if k in self.__argless_args:
-                yargs += k + ' '
+            if k in self.__argless_args or v is None:
                 continue
-            if k[0:2] == '--':
+            elif k[0:2] == '--':
                 # long opt
-                yargs += k + '=' + v
+                argv.append(k + '=' + v)
             elif k[0] == '-':
                 # short opt
-                yargs += k + ' ' + v + ' '
-                
-        return yargs
+                argv.extend([k, v])
+        return argv
     
     def _prepare_to_generate(self, kw):
         """
         Prepares parameters to be passed to exuberant ctags.
-        @returns: tuple (generator_options_dict, files_str)
+        @returns: tuple (generator_options_dict, file list for stdin as a generator of bytes chunks)
         """
         input_file_override = False
         
@@ -211,12 +402,213 @@ class exuberant_ctags(ctags_base):
         if 'generator_options' in kw:
             gen_opts.update(kw['generator_options'])
             
-        file_list = ''
+        file_list = iter([])
         if not input_file_override:
-            for f in self._file_list:
-                file_list += f + os.linesep
-                
+            file_list = _file_list_chunks(self._file_list)
+
         return (gen_opts, file_list)
+
+    def _plan_shards(self, gen_opts, jobs):
+        """
+        Works out how to split a run over several ctags processes: one shard per job, and more if a shard would have more than batch_size bytes of source.
+        Runs reading a custom -L file list, appending to a tag file or writing a cross reference can't be split.
+        @param gen_opts: command line arguments, from _prepare_to_generate
+        @type gen_opts: dict
+        @param jobs: number of ctags processes to run at once
+        @type jobs: int
+        @returns: file list of each ctags process, or None to run ctags once
+        @rtype: list
+        """
+        if len(self._file_list) < 2:
+            return None
+        if gen_opts.get('-L') != '-' or '-a' in gen_opts or '-x' in gen_opts:
+            return None
+        if jobs < 2 and self.batch_size is None:
+            return None
+
+        sizes = _file_sizes(self._file_list)
+        count = jobs
+        if self.batch_size is not None:
+            count = max(count, -(-sum(sizes) // self.batch_size))
+        if count < 2:
+            return None
+        return _shard_files(self._file_list, count, sizes)
+
+    def _warning_prefix(self):
+        """
+        @returns: start of the warning lines ctags writes to stdout on win32, None on other platforms where they go to stderr
+        @rtype: bytes
+        """
+        if sys.platform != 'win32':
+            return None
+        if self._executable_path.rfind("/") >= 0:
+            shortname = self._executable_path[self._executable_path.rfind("/"):]
+        elif self._executable_path.rfind("\\") >= 0:
+            shortname = self._executable_path[self._executable_path.rfind("\\"):]
+        else:
+            shortname = self._executable_path
+        return (shortname + self.__warning_str).encode("utf-8")
+
+    def _run_shards(self, gen_opts, shards, jobs, work_dir, to_tagfile):
+        """
+        Runs one ctags process per shard, up to jobs of them at once.
+        Each process reads its file list from a file in work_dir and writes its tags and messages to files there, so none of them waits on a pipe.
+        @param gen_opts: command line arguments, from _prepare_to_generate
+        @type gen_opts: dict
+        @param shards: file list of each process, from _plan_shards
+        @type shards: list
+        @param jobs: number of ctags processes to run at once
+        @type jobs: int
+        @param work_dir: directory for the shard files
+        @type work_dir: str
+        @param to_tagfile: write tag files with -f, instead of capturing the tags ctags prints
+        @type to_tagfile: boolean
+        @returns: (all processes succeeded, tag output file of each shard in shard order)
+        @rtype: tuple
+        """
+        self.warnings = list()
+        self.command_line = None
+        running = list()
+        returncodes = list()
+        outputs = list()
+        try:
+            for (i, shard) in enumerate(shards):
+                while len(running) >= max(jobs, 1):
+                    returncodes.append(_finish_run(running.pop(0)))
+
+                base = os.path.join(work_dir, str(i))
+                f = open(base + '.files', 'wb')
+                try:
+                    for chunk in _file_list_chunks(shard):
+                        f.write(chunk)
+                finally:
+                    f.close()
+
+                opts = copy(gen_opts)
+                opts['-L'] = base + '.files'
+                if to_tagfile:
+                    opts['-f'] = base + '.tags'
+                    outputs.append(base + '.tags')
+                else:
+                    outputs.append(base + '.out')
+                argv = self._dict_to_argv(opts)
+                if self.command_line is None:
+                    self.command_line = subprocess.list2cmdline(argv)
+
+                out = open(base + '.out', 'wb')
+                err = open(base + '.err', 'wb')
+                try:
+                    p = subprocess.Popen(argv, stdout=out, stderr=err)
+                except OSError:
+                    out.close()
+                    err.close()
+                    raise
+                running.append((p, out, err))
+        finally:
+            # wait for every process that started, even if a later one couldn't
+            for run in running:
+                returncodes.append(_finish_run(run))
+
+        for i in range(len(outputs)):
+            base = os.path.join(work_dir, str(i))
+            if sys.platform == 'win32' and to_tagfile:
+                messages = base + '.out'
+            elif sys.platform != 'win32':
+                messages = base + '.err'
+            else:
+                # warnings are mixed in with the tags, they're picked out as the tags are read
+                continue
+            f = open(messages, 'rb')
+            try:
+                self.warnings.extend(f.read().decode("utf-8").splitlines())
+            finally:
+                f.close()
+
+        return (len([x for x in returncodes if x != 0]) == 0, outputs)
+
+    def _shard_lines(self, filename):
+        """
+        Yields the tag lines a shard's ctags process printed, without line endings.  Warning lines are added to self.warnings instead.
+        @rtype: generator of bytes
+        """
+        prefix = self._warning_prefix()
+        f = open(filename, 'rb')
+        try:
+            for line in f:
+                line = line.rstrip(b'\r\n')
+                if not len(line):
+                    continue
+                if prefix and line.startswith(prefix):
+                    self.warnings.append(line.decode("utf-8", "replace"))
+                    continue
+                yield line
+        finally:
+            f.close()
+
+    def _tagfile_lines(self, filename):
+        """
+        Yields the tag lines of a shard's tag file, without its headers or line endings.
+        @rtype: generator of bytes
+        """
+        f = open(filename, 'rb')
+        try:
+            for line in f:
+                line = line.rstrip(b'\r\n')
+                if len(line) and not line.startswith(b'!_TAG_'):
+                    yield line
+        finally:
+            f.close()
+
+    def _merged_lines(self, gen_opts, outputs):
+        """
+        Combines the tags printed by each shard's ctags process into the order one process would have printed them.
+        Sorted output is merged, other output is concatenated in shard order, so the result doesn't depend on which process finished first.
+        @rtype: generator of bytes
+        """
+        runs = [self._shard_lines(x) for x in outputs]
+        sort = _output_sort(gen_opts)
+        if sort in (_SORTED_, _FOLDCASE_):
+            return _merge_sorted(runs, _sort_key(sort))
+        return (line for run in runs for line in run)
+
+    def _combine_tagfiles(self, gen_opts, outputs, output_file):
+        """
+        Writes the tag files written by each shard's ctags process as one tag file.
+        Sorted tag files are merged, keeping the headers of the first one, others are concatenated in shard order.
+        Lines are copied as bytes, so the headers, such as !_TAG_FILE_FORMAT, and tags in any encoding come through unchanged.
+        """
+        sort = _output_sort(gen_opts)
+        if sort in (_SORTED_, _FOLDCASE_):
+            out = open(output_file, 'wb')
+            try:
+                f = open(outputs[0], 'rb')
+                try:
+                    for line in f:
+                        if not line.startswith(b'!_TAG_'):
+                            break
+                        out.write(line)
+                finally:
+                    f.close()
+                for line in _merge_sorted([self._tagfile_lines(x) for x in outputs], _sort_key(sort)):
+                    out.write(line + b'\n')
+            finally:
+                out.close()
+            return
+
+        out = open(output_file, 'wb')
+        try:
+            for (i, tagfile) in enumerate(outputs):
+                f = open(tagfile, 'rb')
+                try:
+                    for line in f:
+                        # only the first shard's headers are kept
+                        if i and line.startswith(b'!_TAG_'):
+                            continue
+                        out.write(line)
+                finally:
+                    f.close()
+        finally:
+            out.close()
         
     
     def generate_tags(self, **kwargs):
@@ -226,47 +618,50 @@ class exuberant_ctags(ctags_base):
                 - B{tag_program:} (str) path to ctags executable, or name of a ctags program in path
                 - B{files:} (sequence) files to process with ctags
                 - B{generator_options:} (dict) command-line options to pass to ctags program
+                - B{jobs:} (int) number of ctags processes to split the files between, default 1.  Inputs over batch_size bytes are split too, running jobs processes at a time.  The output is the same as one process would give.
             @returns: strings output by exuberant ctags
             @rtype: list
             @raise ValueError: ctags executable path not set, fails execution
         """
-        valid_kwargs = ['tag_program', 'files', 'generator_options']
+        valid_kwargs = ['tag_program', 'files', 'generator_options', 'jobs']
         validator.validate(kwargs.keys(), valid_kwargs)
         
         (gen_opts, file_list) = self._prepare_to_generate(kwargs)
-        tag_args = self._dict_to_args(gen_opts)
-        
-        self.command_line = self._executable_path + ' ' + tag_args
-        p = subprocess.Popen(self.command_line, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
-        (out, err) = p.communicate(input=file_list.encode())
+
+        jobs = 1
+        if 'jobs' in kwargs:
+            jobs = kwargs['jobs']
+        shards = self._plan_shards(gen_opts, jobs)
+        if shards:
+            work_dir = tempfile.mkdtemp()
+            try:
+                (ok, outputs) = self._run_shards(gen_opts, shards, jobs, work_dir, False)
+                if not ok:
+                    raise ValueError("Ctags execution did not complete.\nCommand line: " + self.command_line)
+                return [line.decode("utf-8") for line in self._merged_lines(gen_opts, outputs)]
+            finally:
+                shutil.rmtree(work_dir, True)
+
+        argv = self._dict_to_argv(gen_opts)
+        self.command_line = subprocess.list2cmdline(argv)
+        p = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        prefix = self._warning_prefix()
+
+        results = list()
+        messages = list()
+        for line in _pipeline(p, file_list, messages):
+            line = line.decode("utf-8")
+            if prefix and line.startswith(prefix.decode("utf-8")):
+                # win32 ctags writes its warnings to stdout
+                self.warnings.append(line)
+            else:
+                results.append(line)
         
         if p.returncode != 0:
-            raise ValueError("Ctags execution did not complete, return value: " + p.returncode + ".\nCommand line: " + self.command_line)
-        
-        results = out.decode("utf-8").splitlines()
-            
-        if sys.platform == 'win32':
-            # check for warning strings in output
-            if self._executable_path.rfind("/") >= 0:
-                shortname = self._executable_path[self._executable_path.rfind("/"):]
-            elif self._executable_path.rfind("\\") >= 0:
-                shortname = self._executable_path[self._executable_path.rfind("\\"):]
-            else:
-                shortname = self._executable_path
-
-            idxs = []
-            i = 0
-            for r in results:
-                if r.find(shortname + self.__warning_str) == 0:
-                    idxs.append(i)
-                i += 1
-    
-            # reverse the list so we don't mess up index numbers as we're removing them
-            idxs.sort(reverse=True)
-            for i in idxs:
-                self.warnings.append(results.pop(i))
-        else:
-            self.warnings = err.decode("utf-8").splitlines()
+            raise ValueError("Ctags execution did not complete, return value: " + str(p.returncode) + ".\nCommand line: " + self.command_line)
+
+        if sys.platform != 'win32':
+            self.warnings = b''.join(messages).decode("utf-8").splitlines()
 
         return results
 
@@ -277,6 +672,7 @@ class exuberant_ctags(ctags_base):
                 - B{tag_program:} (str) path to ctags executable, or name of a ctags program in path
                 - B{files:} (sequence) files to process with ctags
                 - B{generator_options:} (dict) options to pass to ctags program
+                - B{jobs:} (int) number of ctags processes to split the files between, default 1.  Inputs over batch_size bytes are split too, running jobs processes at a time.  The output is the same as one process would give.
         @param output_file: File name and location to write tagfile.
         @type output_file: str
         @returns: file written
@@ -284,7 +680,7 @@ class exuberant_ctags(ctags_base):
         @raise ValueError: ctags executable path not set or output file isn't valid
             
         """
-        valid_kwargs = ['tag_program', 'files', 'generator_options']
+        valid_kwargs = ['tag_program', 'files', 'generator_options', 'jobs']
         validator.validate(kwargs.keys(), valid_kwargs)
 
         # exuberant ctags 5.7 chops 'def' off the beginning of variables, if it starts with def
@@ -309,16 +705,34 @@ class exuberant_ctags(ctags_base):
             raise ValueError("No output file set")
         
         (gen_opts, file_list) = self._prepare_to_generate(kwargs)
-        gen_opts['-f'] = '"' + output_file + '"'
-        tag_args = self._dict_to_args(gen_opts)
 
-        self.command_line = self._executable_path + ' ' + tag_args
-        p = subprocess.Popen(self.command_line, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
-        (out, err) = p.communicate(input=file_list.encode())
+        jobs = 1
+        if 'jobs' in kwargs:
+            jobs = kwargs['jobs']
+        shards = None
+        if output_file != '-':
+            shards = self._plan_shards(gen_opts, jobs)
+        if shards:
+            work_dir = tempfile.mkdtemp()
+            try:
+                (ok, outputs) = self._run_shards(gen_opts, shards, jobs, work_dir, True)
+                if not ok:
+                    return False
+                self._combine_tagfiles(gen_opts, outputs, output_file)
+                return True
+            finally:
+                shutil.rmtree(work_dir, True)
+
+        gen_opts['-f'] = output_file
+        argv = self._dict_to_argv(gen_opts)
+        self.command_line = subprocess.list2cmdline(argv)
+        p = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        messages = list()
+        out = list(_pipeline(p, file_list, messages))
         if sys.platform == 'win32':
-            self.warnings = out.decode("utf-8").splitlines()
+            self.warnings = [line.decode("utf-8") for line in out]
         else:
-            self.warnings = err.decode("utf-8").splitlines()
+            self.warnings = b''.join(messages).decode("utf-8").splitlines()
         
         if (p.returncode == 0):
             return True
@@ -329,67 +743,86 @@ class exuberant_ctags(ctags_base):
         Parses source files into a ctags_file instance.
         This method exists to avoid storing ctags generated data in an intermediate form before parsing.
         
-        According to python documentation, this mechanism could deadlock due to other OS pipe buffers filling and blocking the child process.
-        U{http://docs.python.org/library/subprocess.html}
+        ctags output is parsed as it's read, while ctags is still running.
             - B{Keyword Arguments:}
                 - B{tag_program:} (str) path to ctags executable, or name of a ctags program in path
                 - B{files:} (sequence) files to process with ctags
                 - B{generator_options:} (dict) options to pass to ctags program
                 - B{harvesters:} (list) list of harvester data classes for ctags_file to use while parsing
+                - B{columnar:} (bool) keep tags in a tag_store instead of a list of ctags_entry instances
+                - B{lazy_extensions:} (bool) keep each entry's extension fields as text until they're used
+                - B{keep_tags:} (bool) if False, entries are only passed to the harvesters and the returned ctags_file has no tags, default True
+                - B{encoding_errors:} (str) how to handle invalid UTF-8 in ctags output, as for bytes.decode(), default 'strict'
+                - B{jobs:} (int) number of ctags processes to split the files between, default 1.  Inputs over batch_size bytes are split too, running jobs processes at a time.  The output is the same as one process would give.
         @returns: generated instance of ctags_file on success, None on failure
         @rtype: (ctags_file or None)
         @raise ValueError: ctags executable path not set
         """
-        valid_kwargs = ['tag_program', 'files', 'generator_options', 'harvesters']
+        valid_kwargs = ['tag_program', 'files', 'generator_options', 'harvesters', 'columnar', 'lazy_extensions', 'keep_tags', 'encoding_errors', 'jobs']
         validator.validate(kwargs.keys(), valid_kwargs)
         
         (gen_opts, file_list) = self._prepare_to_generate(kwargs)
-        tag_args = self._dict_to_args(gen_opts)
         
         tagfile = ctags_file()
 
         harvesters = list()
         if 'harvesters' in kwargs:
             harvesters = kwargs['harvesters']
-            
-        tagfile.feed_init(harvesters=harvesters)
-
-        self.command_line = self._executable_path + ' ' + tag_args
-        p = subprocess.Popen(self.command_line, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
-        p.stdin.write(file_list.encode())
         
-        # is this the cleanest way to do this?  it makes the program execute, but I haven't found another way
-        p.stdin.close()
+        columnar = False
+        if 'columnar' in kwargs:
+            columnar = kwargs['columnar']
         
-        if sys.platform == "win32":
-            if self._executable_path.rfind("/") >= 0:
-                shortname = self._executable_path[self._executable_path.rfind("/"):]
-            elif self._executable_path.rfind("\\") >= 0:
-                shortname = self._executable_path[self._executable_path.rfind("\\"):]
-            else:
-                shortname = self._executable_path
+        lazy_extensions = False
+        if 'lazy_extensions' in kwargs:
+            lazy_extensions = kwargs['lazy_extensions']
+        
+        keep_tags = True
+        if 'keep_tags' in kwargs:
+            keep_tags = kwargs['keep_tags']
+        
+        encoding_errors = 'strict'
+        if 'encoding_errors' in kwargs:
+            encoding_errors = kwargs['encoding_errors']
+            
+        tagfile.feed_init(harvesters=harvesters, columnar=columnar, lazy_extensions=lazy_extensions, keep_tags=keep_tags, encoding_errors=encoding_errors)
 
+        jobs = 1
+        if 'jobs' in kwargs:
+            jobs = kwargs['jobs']
+        shards = self._plan_shards(gen_opts, jobs)
+        if shards:
+            work_dir = tempfile.mkdtemp()
+            try:
+                (ok, outputs) = self._run_shards(gen_opts, shards, jobs, work_dir, False)
+                for line in self._merged_lines(gen_opts, outputs):
+                    tagfile.feed_line(line)
+                tagfile.feed_finish()
+            finally:
+                shutil.rmtree(work_dir, True)
+            if ok:
+                return tagfile
+            return None
 
-        while p.poll() is None:
-            line = p.stdout.readline().decode("utf-8")
-            if not len(line):
-                continue
-            if sys.platform == 'win32' and line.find(shortname + self.__warning_str) == 0:
-                self.warnings.append(line)
-            else:
-                tagfile.feed_line(line)
+        argv = self._dict_to_argv(gen_opts)
+        self.command_line = subprocess.list2cmdline(argv)
+        p = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        prefix = self._warning_prefix()
 
-        # process the remaining buffer 
-        for line in p.stdout.read().decode("utf-8").splitlines():
-            if not len(line):
-                continue
-            if sys.platform == 'win32' and line.find(shortname + self.__warning_str) == 0:
-                self.warnings.append(line)
-            else:
-                tagfile.feed_line(line)
+        # lines are fed to the ctags_file undecoded, so file names are only decoded once each
+        messages = list()
+        lines = _pipeline(p, file_list, messages)
+        try:
+            for line in lines:
+                if prefix and line.startswith(prefix):
+                    self.warnings.append(line.decode("utf-8", encoding_errors))
+                else:
+                    tagfile.feed_line(line)
+        finally:
+            lines.close()
     
         if sys.platform != 'win32':
-            self.warnings = p.stderr.read().decode("utf-8").splitlines()
+            self.warnings = b''.join(messages).decode("utf-8").splitlines()
     
         tagfile.feed_finish()
         
@@ -397,4 +830,80 @@ class exuberant_ctags(ctags_base):
             return tagfile
         else:
             return None
-        
\ No newline at end of file
+        
+
+    def generate_buffers(self, buffers, **kwargs):
+        """
+        Parses source text that isn't saved, such as editor buffers, into a ctags_file instance.
+        Exuberant Ctags only reads files, so the buffers are written to a temporary directory and all of them are tagged by one ctags run.  Tags come back with the virtual path of their buffer as their file.
+            - B{Keyword Arguments:}
+                - B{tag_program:} (str) path to ctags executable, or name of a ctags program in path
+                - B{generator_options:} (dict) options to pass to ctags program
+                - B{harvesters:} (list) list of harvester data classes for ctags_file to use while parsing
+                - B{columnar:} (bool) keep tags in a tag_store instead of a list of ctags_entry instances
+                - B{lazy_extensions:} (bool) keep each entry's extension fields as text until they're used
+                - B{keep_tags:} (bool) if False, entries are only passed to the harvesters and the returned ctags_file has no tags, default True
+                - B{encoding_errors:} (str) how to handle invalid UTF-8 in ctags output, as for bytes.decode(), default 'strict'
+                - B{temp_dir:} (str) directory to write the buffers under, default is the system temporary directory
+        @param buffers: (virtual path, text) pairs, text as unicode str or bytes.  The virtual path's extension or name decides the language, as for a file.
+        @type buffers: sequence
+        @returns: generated instance of ctags_file on success, None on failure
+        @rtype: (ctags_file or None)
+        @raise ValueError: ctags executable path not set, or -L was passed
+        """
+        valid_kwargs = ['tag_program', 'generator_options', 'harvesters', 'columnar', 'lazy_extensions', 'keep_tags', 'encoding_errors', 'temp_dir']
+        validator.validate(kwargs.keys(), valid_kwargs)
+
+        if '-L' in kwargs.get('generator_options', dict()):
+            raise ValueError("The option -L is used internally.")
+
+        feed_options = dict()
+        for k in ['harvesters', 'columnar', 'lazy_extensions', 'keep_tags', 'encoding_errors']:
+            if k in kwargs:
+                feed_options[k] = kwargs[k]
+        encoding_errors = feed_options.get('encoding_errors', 'strict')
+        tagfile = ctags_file()
+        tagfile.feed_init(**feed_options)
+
+        work_dir = tempfile.mkdtemp(dir=kwargs.get('temp_dir'))
+        # the buffers aren't the wrapper's files, keep its file list as it was
+        file_list = self._file_list
+        try:
+            (files, virtual) = _write_buffers(buffers, work_dir)
+            prepare = dict(files=files)
+            for k in ['tag_program', 'generator_options']:
+                if k in kwargs:
+                    prepare[k] = kwargs[k]
+            (gen_opts, chunks) = self._prepare_to_generate(prepare)
+
+            argv = self._dict_to_argv(gen_opts)
+            self.command_line = subprocess.list2cmdline(argv)
+            p = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            prefix = self._warning_prefix()
+
+            messages = list()
+            lines = _pipeline(p, chunks, messages)
+            try:
+                for line in _buffer_lines(lines, virtual):
+                    if prefix and line.startswith(prefix):
+                        self.warnings.append(line.decode("utf-8", encoding_errors))
+                    else:
+                        tagfile.feed_line(line)
+            finally:
+                lines.close()
+
+            if sys.platform != 'win32':
+                self.warnings = b''.join(messages).decode("utf-8").splitlines()
+            if self.warnings:
+                # warnings name the files written, not the buffers
+                for (f, path) in virtual.items():
+                    self.warnings = [w.replace(f, path) for w in self.warnings]
+        finally:
+            self._file_list = file_list
+            shutil.rmtree(work_dir, True)
+
+        tagfile.feed_finish()
+
+        if p.returncode == 0:
+            return tagfile
+        return None
@@ -26,6 +26,14 @@ try:
 except ImportError:
     from pyctags.kwargs_validator import the_validator as validator
 
+def _supports(harvester, method):
+    """
+    @returns: True if the harvester's class overrides one of base_harvester's optional methods, such as 'merge' or 'remove'
+    @rtype: bool
+    """
+    function = getattr(harvester.__class__, method)
+    return getattr(function, '__func__', function) is not base_harvester.__dict__[method]
+
 class base_harvester:
     """ This class definition outlines the basic interface for harvesting classes."""
     def do_before(self):
@@ -39,6 +47,16 @@ class base_harvester:
         """
         pass
     
+    def feed_index(self, store, index):
+        """ Called once per tag when harvesting from a columnar tag_store.
+        The default builds the entry and passes it to self.feed(), derived classes can work from the store's columns instead.
+        @param store: tag store being harvested
+        @type store: tag_store
+        @param index: index of the tag in store
+        @type index: int
+        """
+        self.feed(store[index])
+    
     def do_after(self):
         """ Called after all ctags_entry instances are processed with self.feed()."""
         pass
@@ -47,6 +65,36 @@ class base_harvester:
         """ Used to retrieve derived-class specific harvested data."""
         pass
     
+    def merge(self, other):
+        """
+        Combines the data from another harvester of the same class into this one.
+        Used when tags are fed to separate harvesters in parallel.  I{other} was fed the tags that come after the ones fed to this harvester.
+        Called between self.feed() and self.do_after().
+        @param other: harvester to take data from
+        @type other: base_harvester
+        @raise NotImplementedError: the harvester doesn't support merging
+        """
+        raise NotImplementedError
+    
+    def clone(self):
+        """
+        Makes an empty harvester with the same settings as this one.
+        Used to give each parallel job its own harvester to feed, whose data is then passed to self.merge().
+        The default calls the class with no arguments, derived classes whose constructors take arguments override it.
+        @rtype: base_harvester
+        """
+        return self.__class__()
+    
+    def remove(self, entry):
+        """
+        Takes back a tag fed earlier, when the tags of a source file are replaced or removed.
+        Tags fed and removed this way are followed by a call to self.do_after().
+        @param entry: tag previously passed to self.feed(), the same instance
+        @type entry: ctags_entry
+        @raise NotImplementedError: the harvester doesn't support removing tags
+        """
+        raise NotImplementedError
+    
     def process_tag_list(self, taglist):
         """
         Allows processing of a list of ctags_entry instances without an associated ctags_file.
@@ -62,6 +110,7 @@ class kind_harvester(base_harvester):
     """ Harvests exuberant ctags' extended "kind" information, such as class, member, variable, etc."""
     def __init__(self):
         self.kinds = dict()
+        self.__removed = dict()
     
     def feed(self, entry):
         """ 
@@ -69,13 +118,59 @@ class kind_harvester(base_harvester):
         @param entry: entry to process
         @type entry: ctags_entry
         """
-        if 'kind' in entry.extensions:
-            # note: case sensitive output from exuberant ctags
-            entkey = entry.extensions['kind']
+        # note: case sensitive output from exuberant ctags
+        entkey = entry.get_extension('kind')
+        if entkey is not None:
             if entkey not in self.kinds:
                 self.kinds[entkey] = list()
             self.kinds[entkey].append(entry)
     
+    def feed_index(self, store, index):
+        """
+        Groups tags from a tag_store by kind, keeping indices instead of entries.
+        Values for kinds found this way are tag_store_view instances.
+        @param store: tag store being harvested
+        @type store: tag_store
+        @param index: index of the tag in store
+        @type index: int
+        """
+        entkey = store.kind(index)
+        if entkey is not None:
+            if entkey not in self.kinds:
+                self.kinds[entkey] = store.view()
+            self.kinds[entkey].append_index(index)
+    
+    def merge(self, other):
+        """
+        Appends the entries of each kind collected by other.
+        @param other: harvester to take data from
+        @type other: kind_harvester
+        """
+        for (k, entries) in other.kinds.items():
+            if k not in self.kinds:
+                self.kinds[k] = list()
+            self.kinds[k].extend(entries)
+    
+    def remove(self, entry):
+        """
+        Marks an entry to be taken out of its kind's list.  Kinds can hold many entries, so they're filtered once per kind in self.do_after().
+        @param entry: entry previously passed to self.feed()
+        @type entry: ctags_entry
+        """
+        entkey = entry.get_extension('kind')
+        if entkey in self.kinds:
+            self.__removed.setdefault(entkey, set()).add(id(entry))
+    
+    def do_after(self):
+        """ Drops the entries passed to self.remove()."""
+        for (k, removed) in self.__removed.items():
+            entries = [e for e in self.kinds[k] if id(e) not in removed]
+            if entries:
+                self.kinds[k] = entries
+            else:
+                del self.kinds[k]
+        self.__removed = dict()
+    
     def get_data(self):
         """
         Gets the dict built with self.feed().  
@@ -98,6 +193,43 @@ class by_name_harvester(base_harvester):
             self.names[entry.name] = list()
         self.names[entry.name].append(entry)
     
+    def feed_index(self, store, index):
+        """
+        Groups tags from a tag_store by name, keeping indices instead of entries.
+        Values for names found this way are tag_store_view instances.
+        """
+        name = store.name(index)
+        if name not in self.names:
+            self.names[name] = store.view()
+        self.names[name].append_index(index)
+    
+    def merge(self, other):
+        """
+        Appends the entries of each name collected by other.
+        @param other: harvester to take data from
+        @type other: by_name_harvester
+        """
+        for (name, entries) in other.names.items():
+            if name not in self.names:
+                self.names[name] = list()
+            self.names[name].extend(entries)
+    
+    def remove(self, entry):
+        """
+        Takes an entry out of the list for its name.
+        @param entry: entry previously passed to self.feed()
+        @type entry: ctags_entry
+        """
+        entries = self.names.get(entry.name)
+        if entries is None:
+            return
+        for i in range(len(entries)):
+            if entries[i] is entry:
+                del entries[i]
+                break
+        if not len(entries):
+            del self.names[entry.name]
+    
     def get_data(self):
         """
         Gets the name-organized data.
@@ -122,13 +254,43 @@ class name_lookup_harvester(base_harvester):
         @param entry: the entry to collect the name from.
         @type entry: ctags_entry
         """
-        # use dict characteristic of unique keys instead of testing if the key is already there
-        self.__unique_names[entry.name] = None
+        # count each name, so a name stays until its last tag is removed
+        names = self.__unique_names
+        names[entry.name] = names.get(entry.name, 0) + 1
+    
+    def feed_index(self, store, index):
+        """ Records unique names from a tag_store without building entries."""
+        name = store.name(index)
+        self.__unique_names[name] = self.__unique_names.get(name, 0) + 1
+    
+    def merge(self, other):
+        """
+        Adds the unique names recorded by other.
+        @param other: harvester to take data from
+        @type other: name_lookup_harvester
+        """
+        for (name, count) in other.__unique_names.items():
+            self.__unique_names[name] = self.__unique_names.get(name, 0) + count
+    
+    def remove(self, entry):
+        """
+        Forgets a tag's name once no other tag has it.
+        @param entry: entry previously passed to self.feed()
+        @type entry: ctags_entry
+        """
+        count = self.__unique_names.get(entry.name, 0) - 1
+        if count > 0:
+            self.__unique_names[entry.name] = count
+        elif count == 0:
+            del self.__unique_names[entry.name]
     
     def do_after(self):
         """ Process the unique names into a form easier to query."""
         self.__sorted_names = list(self.__unique_names.keys())
         self.__sorted_names.sort()
+        self.__name_index = dict()
+        if not self.__sorted_names:
+            return
 
         i = 0
         prev_char = self.__sorted_names[0][0]
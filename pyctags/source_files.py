@@ -0,0 +1,402 @@
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not,
+##    see <http://www.gnu.org/licenses/>.
+
+"""
+Finds the source files in a tree that ctags can tag.
+
+Directories are scanned with os.scandir by a few long-lived threads taking directories from a shared queue, and file names are matched against the extensions and file names from a ctags wrapper's language maps.  Exclude globs and .gitignore files can keep parts of the tree out.
+"""
+
+import os, sys, re, fnmatch, threading
+try:
+    import queue
+except ImportError:
+    # python 2
+    import Queue as queue
+
+try:
+    # do relative imports for tests
+    # try this first in case pyctags is already installed, since we want to be testing the source bundled in the distribution
+    from kwargs_validator import the_validator as validator
+except ImportError:
+    from pyctags.kwargs_validator import the_validator as validator
+
+_WORKERS_ = 8
+""" Default number of threads scanning directories."""
+
+_GLOB_CHARS_ = '*?['
+
+class _name_matcher:
+    """
+    Matches file names against extensions such as '.c', whole file names such as 'Makefile' and glob patterns, as found in ctags language maps.
+    Extensions and names are looked up in sets, so the cost doesn't grow with the number of languages.
+    """
+    def __init__(self, names):
+        self.extensions = set()
+        self.names = set()
+        self.patterns = list()
+        for n in names:
+            n = os.path.normcase(n)
+            if len([c for c in _GLOB_CHARS_ if c in n]):
+                self.patterns.append(n)
+            elif n.startswith('.'):
+                self.extensions.add(n)
+            else:
+                self.names.add(n)
+
+    def __call__(self, name):
+        name = os.path.normcase(name)
+        if name in self.names:
+            return True
+        # every suffix starting at a dot, for extensions like .tar.gz
+        dot = name.find('.', 1)
+        while dot >= 0:
+            if name[dot:] in self.extensions:
+                return True
+            dot = name.find('.', dot + 1)
+        for p in self.patterns:
+            if fnmatch.fnmatchcase(name, p):
+                return True
+        return False
+
+def _glob_regex(pattern):
+    """
+    Translates a .gitignore glob into a regular expression over '/' separated paths.  '**' matches across directories, '*' and '?' don't.
+    @rtype: str
+    """
+    out = list()
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern[i:i + 3] == '**/':
+            out.append('(?:.*/)?')
+            i += 3
+            continue
+        if pattern[i:i + 2] == '**':
+            out.append('.*')
+            i += 2
+            continue
+        if c == '*':
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 1)
+            if end < 0:
+                out.append(re.escape(c))
+            else:
+                chars = pattern[i + 1:end]
+                if chars[:1] == '!':
+                    chars = '^' + chars[1:]
+                out.append('[' + chars.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < len(pattern):
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out) + '$'
+
+def _read_gitignore(filename, base):
+    """
+    Reads the rules of a .gitignore file.
+    @param filename: .gitignore file
+    @type filename: str
+    @param base: directory holding the file, relative to the scan root, '' for the root
+    @type base: str
+    @returns: rules (base, compiled regex, matches base names only, negated, directories only)
+    @rtype: list
+    """
+    rules = list()
+    try:
+        f = open(filename, 'rb')
+        try:
+            lines = f.read().decode('utf-8', 'replace').splitlines()
+        finally:
+            f.close()
+    except (IOError, OSError):
+        return rules
+
+    for line in lines:
+        if not line.strip() or line.startswith('#'):
+            continue
+        line = line.rstrip(' ')
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        elif line.startswith('\\!') or line.startswith('\\#'):
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+        # a slash anywhere but the end anchors the pattern to the .gitignore's directory
+        anchored = '/' in line
+        line = line.lstrip('/')
+        rules.append((base, re.compile(_glob_regex(line)), not anchored, negate, dir_only))
+    return rules
+
+def _ignored(rules, rel, is_dir):
+    """
+    @param rules: .gitignore rules in effect, outermost directory first
+    @param rel: '/' separated path relative to the scan root
+    @returns: the last rule matching the path excludes it
+    @rtype: boolean
+    """
+    ignored = False
+    name = rel.rpartition('/')[2]
+    for (base, regex, name_only, negate, dir_only) in rules:
+        if dir_only and not is_dir:
+            continue
+        if base:
+            if not rel.startswith(base + '/'):
+                continue
+            path = rel[len(base) + 1:]
+        else:
+            path = rel
+        if regex.match(name if name_only else path):
+            ignored = not negate
+    return ignored
+
+class _scanner:
+    """
+    Scans one directory at a time, so directories can be handed to worker threads.
+    """
+    def __init__(self, matcher, exclude, gitignore, follow_links):
+        self.matcher = matcher
+        self.exclude = exclude
+        self.gitignore = gitignore
+        self.follow_links = follow_links
+        self.seen = set()
+        self.lock = threading.Lock()
+
+    def excluded(self, rel, name):
+        for pattern in self.exclude:
+            if fnmatch.fnmatchcase(rel, pattern) or fnmatch.fnmatchcase(name, pattern):
+                return True
+        return False
+
+    def first_visit(self, path):
+        """ Guards against link loops when links are followed."""
+        real = os.path.realpath(path)
+        self.lock.acquire()
+        try:
+            if real in self.seen:
+                return False
+            self.seen.add(real)
+            return True
+        finally:
+            self.lock.release()
+
+    def scan(self, path, rel, rules):
+        """
+        Lists a directory.
+        @param path: directory as it will appear in the results
+        @param rel: '/' separated path relative to the scan root, '' for the root
+        @param rules: .gitignore rules in effect from the parent directories
+        @returns: (source files, subdirectories as (path, rel, rules) to scan next)
+        @rtype: tuple
+        """
+        if self.gitignore:
+            local = os.path.join(path, '.gitignore')
+            if os.path.isfile(local):
+                rules = rules + _read_gitignore(local, rel)
+
+        files = list()
+        subdirs = list()
+        try:
+            entries = list(_list_dir(path))
+        except OSError:
+            # unreadable directories are skipped, as os.walk does
+            return (files, subdirs)
+
+        for (name, full, is_dir) in entries:
+            entry_rel = rel + '/' + name if rel else name
+            if self.excluded(entry_rel, name):
+                continue
+            if is_dir is None:
+                # a link, or a file system that doesn't say
+                is_dir = os.path.isdir(full)
+                if is_dir and not self.follow_links and os.path.islink(full):
+                    continue
+            if is_dir and self.gitignore and name == '.git':
+                continue
+            if rules and _ignored(rules, entry_rel, is_dir):
+                continue
+            if is_dir:
+                if not self.follow_links or self.first_visit(full):
+                    subdirs.append((full, entry_rel, rules))
+            elif self.matcher is None or self.matcher(name):
+                files.append(full)
+        return (files, subdirs)
+
+def _list_dir(path):
+    """
+    @returns: (name, path, is a directory) of each entry, is a directory is None for links and when the type is unknown
+    @rtype: generator of tuples
+    """
+    scandir = getattr(os, 'scandir', None)
+    if scandir is None:
+        for name in os.listdir(path):
+            yield (name, os.path.join(path, name), None)
+        return
+    it = scandir(path)
+    try:
+        for entry in it:
+            if entry.is_symlink():
+                yield (entry.name, entry.path, None)
+            else:
+                yield (entry.name, entry.path, entry.is_dir())
+    finally:
+        close = getattr(it, 'close', None)
+        if close:
+            close()
+
+def find_sources(roots, **kwargs):
+    """
+    Finds source files under one or more directories.
+        - B{Keyword Arguments:}
+            - B{ctags:} (ctags_base) ctags wrapper whose language maps, in all_extensions, decide which files are sources
+            - B{extensions:} (sequence) extensions, file names and globs to match instead, such as ['.c', '.h', 'Makefile', '*.mk']
+            - B{exclude:} (sequence) glob patterns for files and directories to skip, matched against the '/' separated path relative to the root and against the base name
+            - B{gitignore:} (bool) follow the .gitignore files in the tree and skip .git directories, default False
+            - B{follow_links:} (bool) descend into linked directories, default False
+            - B{workers:} (int) number of threads scanning directories, default 8
+    If neither ctags nor extensions is given, every file is returned.
+    @param roots: directory or list of directories to scan.  Files in the list are checked and returned like files found in a directory.
+    @type roots: str or sequence
+    @returns: sorted paths of the source files, starting with their root
+    @rtype: list
+    @raise ValueError: the ctags wrapper hasn't found out its language maps
+    """
+    valid_kwargs = ['ctags', 'extensions', 'exclude', 'gitignore', 'follow_links', 'workers']
+    validator.validate(kwargs.keys(), valid_kwargs)
+
+    if isinstance(roots, str):
+        roots = [roots]
+    scanner = _make_scanner(kwargs)
+
+    found = list()
+    dirs = list()
+    for root in roots:
+        if os.path.isdir(root):
+            if scanner.follow_links:
+                scanner.first_visit(root)
+            dirs.append((root, '', list()))
+        elif os.path.isfile(root) and (scanner.matcher is None or scanner.matcher(os.path.basename(root))):
+            found.append(root)
+
+    found.extend(_walk(scanner, dirs, kwargs.get('workers', _WORKERS_)))
+    found.sort()
+    return found
+
+def _make_scanner(kwargs):
+    """
+    Sets up a scanner from the keyword arguments of find_sources().
+    @rtype: _scanner
+    @raise ValueError: the ctags wrapper hasn't found out its language maps
+    """
+    matcher = None
+    if 'extensions' in kwargs:
+        matcher = _name_matcher(kwargs['extensions'])
+    elif 'ctags' in kwargs:
+        if kwargs['ctags'].all_extensions is None:
+            raise ValueError("The ctags wrapper has no language maps, set its tag_program first.")
+        matcher = _name_matcher(kwargs['ctags'].all_extensions)
+    return _scanner(matcher, list(kwargs.get('exclude', [])), kwargs.get('gitignore', False), kwargs.get('follow_links', False))
+
+def _walk(scanner, dirs, workers, scanned=None):
+    """
+    Scans directories and everything under them, on worker threads taking directories from a queue.
+    @param dirs: directories to start from, as (path, rel, rules) for _scanner.scan()
+    @type dirs: list
+    @param workers: number of threads, directories are scanned one at a time if less than 2
+    @type workers: int
+    @param scanned: list each directory scanned is appended to, as ((path, rel, rules), source files, subdirectories)
+    @type scanned: list
+    @returns: source files found, unsorted
+    @rtype: list
+    """
+    found = list()
+    lock = threading.Lock()
+
+    def done(d, result):
+        (files, subdirs) = result
+        lock.acquire()
+        try:
+            found.extend(files)
+            if scanned is not None:
+                scanned.append((d, files, subdirs))
+        finally:
+            lock.release()
+        return subdirs
+
+    if workers < 2:
+        dirs = list(dirs)
+        while dirs:
+            d = dirs.pop()
+            dirs.extend(done(d, scanner.scan(*d)))
+        return found
+
+    tasks = queue.Queue()
+    errors = list()
+    idle = [0]
+
+    def work():
+        while True:
+            lock.acquire()
+            idle[0] += 1
+            lock.release()
+            d = tasks.get()
+            lock.acquire()
+            idle[0] -= 1
+            lock.release()
+            if d is None:
+                return
+            try:
+                # a thread works through its own subdirectories, and only hands them to the queue while other threads are idle
+                stack = [d]
+                while stack:
+                    d = stack.pop()
+                    stack.extend(done(d, scanner.scan(*d)))
+                    while idle[0] and len(stack) > 1:
+                        tasks.put(stack.pop(0))
+            except Exception:
+                errors.append(sys.exc_info()[1])
+            tasks.task_done()
+
+    for d in dirs:
+        tasks.put(d)
+    threads = list()
+    try:
+        for i in range(workers):
+            t = threading.Thread(target=work)
+            t.daemon = True
+            t.start()
+            threads.append(t)
+        # subdirectories are queued before the directory they're in is marked done, so this waits for the whole tree
+        tasks.join()
+    finally:
+        for t in threads:
+            tasks.put(None)
+        for t in threads:
+            t.join()
+    if errors:
+        raise errors[0]
+    return found
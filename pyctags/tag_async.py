@@ -0,0 +1,245 @@
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not,
+##    see <http://www.gnu.org/licenses/>.
+
+"""
+asyncio versions of tag generation and parsing, for Python 3.5 and later.
+
+ctags runs through asyncio.create_subprocess_exec, and its output is parsed a block at a time as it arrives, so many tagging jobs can share one event loop.  Tag files are read in the loop's default executor, so the loop never waits on the disk.
+
+The coroutines take an L{exuberant_ctags<exuberant.exuberant_ctags>} instance for the program and file settings, and leave command_line and warnings on it the way its own methods do.  Use an instance per job when jobs run at the same time; making instances is cheap once the ctags program has been probed.
+"""
+
+import asyncio, subprocess
+try:
+    # do relative imports for tests
+    # try this first in case pyctags is already installed, since we want to be testing the source bundled in the distribution
+    from kwargs_validator import the_validator as validator
+    from tag_file import ctags_file
+    from tag_compression import open_tag_file
+except ImportError:
+    from pyctags.kwargs_validator import the_validator as validator
+    from pyctags.tag_file import ctags_file
+    from pyctags.tag_compression import open_tag_file
+
+_READ_SIZE_ = 1024 * 1024
+""" Bytes read from ctags output or a tag file at a time."""
+
+async def _feed_blocks(read, consume):
+    """
+    Splits blocks of bytes into lines, passing the lines of each block on as one list.  Empty lines are dropped.
+    @param read: coroutine function returning the next block, empty at the end
+    @param consume: called with each list of lines, without line endings
+    """
+    rest = b''
+    while True:
+        data = await read()
+        if not data:
+            break
+        lines = (rest + data).split(b'\n')
+        rest = lines.pop()
+        lines = [line.rstrip(b'\r') for line in lines]
+        consume([line for line in lines if len(line)])
+    rest = rest.rstrip(b'\r')
+    if len(rest):
+        consume([rest])
+
+async def _write_input(stream, chunks):
+    """ Writes ctags' file list to its stdin a chunk at a time and closes it, so ctags sees the end of the list."""
+    try:
+        for chunk in chunks:
+            stream.write(chunk)
+            await stream.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        # ctags exited without reading everything, its return code says why
+        pass
+    finally:
+        stream.close()
+
+async def _start(ctags, kwargs):
+    """
+    Starts ctags with pipes for stdin, stdout and stderr.
+    @returns: (process, generator options, file list to write to stdin as a generator of bytes chunks)
+    @rtype: tuple
+    """
+    (gen_opts, file_list) = ctags._prepare_to_generate(kwargs)
+    argv = ctags._dict_to_argv(gen_opts)
+    ctags.command_line = subprocess.list2cmdline(argv)
+    p = await asyncio.create_subprocess_exec(*argv, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    return (p, gen_opts, file_list)
+
+async def _finish(p, finished, tasks):
+    """
+    Waits for ctags and the tasks feeding and reading its pipes, killing ctags first if its output wasn't all read.
+    Used in a finally clause, so nothing is left running when parsing fails or the coroutine is cancelled.
+    @param finished: ctags' output was read to the end
+    @type finished: bool
+    @param tasks: futures writing to or reading from ctags
+    @type tasks: list
+    @returns: results of the tasks, or the exceptions they raised
+    @rtype: list
+    """
+    if not finished and p.returncode is None:
+        try:
+            p.kill()
+        except ProcessLookupError:
+            pass
+    # let the other pipes finish either way
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    await p.wait()
+    return results
+
+def _split_warnings(ctags, lines, encoding_errors='strict'):
+    """
+    Moves the warning lines ctags writes to stdout on win32 into ctags.warnings.
+    @returns: the other lines
+    @rtype: list
+    """
+    prefix = ctags._warning_prefix()
+    if not prefix:
+        return lines
+    kept = list()
+    for line in lines:
+        if line.startswith(prefix):
+            ctags.warnings.append(line.decode("utf-8", encoding_errors))
+        else:
+            kept.append(line)
+    return kept
+
+async def generate_tags(ctags, **kwargs):
+    """
+    Parses source files into a list of tags, like L{exuberant_ctags.generate_tags<exuberant.exuberant_ctags.generate_tags>}.
+    If the coroutine is cancelled, ctags is killed.
+        - B{Keyword Arguments:}
+            - B{tag_program:} (str) path to ctags executable, or name of a ctags program in path
+            - B{files:} (sequence) files to process with ctags
+            - B{generator_options:} (dict) command-line options to pass to ctags program
+    @param ctags: ctags program wrapper
+    @type ctags: exuberant_ctags
+    @returns: strings output by exuberant ctags
+    @rtype: list
+    @raise ValueError: ctags executable path not set, fails execution
+    """
+    valid_kwargs = ['tag_program', 'files', 'generator_options']
+    validator.validate(kwargs.keys(), valid_kwargs)
+
+    (p, gen_opts, file_list) = await _start(ctags, kwargs)
+    writer = asyncio.ensure_future(_write_input(p.stdin, file_list))
+    finished = False
+    try:
+        (out, err) = await p.communicate()
+        finished = True
+    finally:
+        await _finish(p, finished, [writer])
+
+    if p.returncode != 0:
+        raise ValueError("Ctags execution did not complete, return value: " + str(p.returncode) + ".\nCommand line: " + ctags.command_line)
+
+    lines = _split_warnings(ctags, [line for line in out.splitlines() if len(line)])
+    if ctags._warning_prefix() is None:
+        ctags.warnings = err.decode("utf-8").splitlines()
+    return [line.decode("utf-8") for line in lines]
+
+async def generate_object(ctags, **kwargs):
+    """
+    Parses source files into a ctags_file instance, like L{exuberant_ctags.generate_object<exuberant.exuberant_ctags.generate_object>}.
+    Lines are parsed as ctags writes them.  If parsing fails or the coroutine is cancelled, ctags is killed.
+        - B{Keyword Arguments:}
+            - B{tag_program:} (str) path to ctags executable, or name of a ctags program in path
+            - B{files:} (sequence) files to process with ctags
+            - B{generator_options:} (dict) options to pass to ctags program
+            - B{harvesters:} (list) list of harvester data classes for ctags_file to use while parsing
+            - B{columnar:} (bool) keep tags in a tag_store instead of a list of ctags_entry instances
+            - B{lazy_extensions:} (bool) keep each entry's extension fields as text until they're used
+            - B{keep_tags:} (bool) if False, entries are only passed to the harvesters and the returned ctags_file has no tags, default True
+            - B{encoding_errors:} (str) how to handle invalid UTF-8 in ctags output, as for bytes.decode(), default 'strict'
+    @param ctags: ctags program wrapper
+    @type ctags: exuberant_ctags
+    @returns: generated instance of ctags_file on success, None on failure
+    @rtype: (ctags_file or None)
+    @raise ValueError: ctags executable path not set
+    """
+    valid_kwargs = ['tag_program', 'files', 'generator_options', 'harvesters', 'columnar', 'lazy_extensions', 'keep_tags', 'encoding_errors']
+    validator.validate(kwargs.keys(), valid_kwargs)
+
+    feed_options = dict()
+    for k in ['harvesters', 'columnar', 'lazy_extensions', 'keep_tags', 'encoding_errors']:
+        if k in kwargs:
+            feed_options[k] = kwargs.pop(k)
+    encoding_errors = feed_options.get('encoding_errors', 'strict')
+
+    tagfile = ctags_file()
+    tagfile.feed_init(**feed_options)
+
+    (p, gen_opts, file_list) = await _start(ctags, kwargs)
+    writer = asyncio.ensure_future(_write_input(p.stdin, file_list))
+    messages = asyncio.ensure_future(p.stderr.read())
+
+    def consume(lines):
+        for line in _split_warnings(ctags, lines, encoding_errors):
+            tagfile.feed_line(line)
+
+    finished = False
+    try:
+        await _feed_blocks(lambda: p.stdout.read(_READ_SIZE_), consume)
+        finished = True
+    finally:
+        results = await _finish(p, finished, [writer, messages])
+
+    if ctags._warning_prefix() is None and isinstance(results[1], bytes):
+        ctags.warnings = results[1].decode("utf-8").splitlines()
+
+    tagfile.feed_finish()
+
+    if p.returncode == 0:
+        return tagfile
+    return None
+
+async def parse(tagfile, tags, **kwargs):
+    """
+    Parses a tag file or sequence of tag lines into a ctags_file, like L{ctags_file.parse<tag_file.ctags_file.parse>}, reading the file in the event loop's default executor.
+    Tags parsed this way can't be refreshed.
+        - B{Keyword Arguments:}
+            - B{harvesters:} (list) list of harvester classes
+            - B{columnar:} (bool) keep tags in a L{tag_store} instead of a list of ctags_entry instances
+            - B{lazy_extensions:} (bool) keep each entry's extension fields as text until they're used
+            - B{keep_tags:} (bool) if False, entries are only passed to the harvesters and self.tags stays empty, default True
+            - B{partitioned:} (bool) keep tags in a L{tag_partitions} grouped by source file
+            - B{encoding_errors:} (str) how to handle invalid UTF-8 in tag files, as for bytes.decode(), default 'strict'
+    @param tagfile: ctags_file to parse into, its tags are replaced
+    @type tagfile: ctags_file
+    @param tags: file name, compressed if it ends in .gz, .bz2 or .xz, or sequence of tag lines
+    @type tags: str or sequence
+    @returns: tagfile
+    @rtype: ctags_file
+    @raises ValueError: parsing error
+    """
+    valid_kwargs = ['harvesters', 'columnar', 'lazy_extensions', 'keep_tags', 'partitioned', 'encoding_errors']
+    validator.validate(kwargs.keys(), valid_kwargs)
+
+    tagfile.feed_init(**kwargs)
+    if isinstance(tags, str):
+        loop = asyncio.get_event_loop()
+        f = await loop.run_in_executor(None, open_tag_file, tags)
+        try:
+            await _feed_blocks(lambda: loop.run_in_executor(None, f.read, _READ_SIZE_), tagfile._feed_lines)
+        finally:
+            f.close()
+    else:
+        tagfile._feed_lines([line for line in tags if line.strip()])
+    tagfile.feed_finish()
+    return tagfile
@@ -19,10 +19,10 @@
 """
 Base class for wrappers around ctags programs.
 
-This module uses the subprocess.Popen function.  Users of this module could pass arbitrary commands to the system.
+Ctags programs are started from argument lists, never through a shell, but users of this module can still run any program as the ctags executable.
 """
 
-import subprocess
+import os, sys, json, hashlib
 try:
     # do relative imports for tests
     # try this first in case pyctags is already installed, since we want to be testing the source bundled in the distribution
@@ -31,12 +31,111 @@ try:
 except ImportError:
     from pyctags.kwargs_validator import the_validator as validator
 
+def _default_probe_dir():
+    """
+    @returns: directory for cached ctags probe results, from PYCTAGS_CACHE_DIR or the user's cache directory
+    @rtype: str
+    """
+    if os.environ.get('PYCTAGS_CACHE_DIR'):
+        return os.environ['PYCTAGS_CACHE_DIR']
+    if sys.platform == 'win32' and os.environ.get('LOCALAPPDATA'):
+        return os.path.join(os.environ['LOCALAPPDATA'], 'pyctags')
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'pyctags')
+
+def _resolve_program(path):
+    """
+    Finds the file a program name or path runs, the way the shell would.
+    @param path: program name or path to it
+    @type path: str
+    @returns: absolute path of the executable with links resolved, or None if it isn't found
+    @rtype: str
+    """
+    extensions = ['']
+    if sys.platform == 'win32':
+        extensions += os.environ.get('PATHEXT', '.EXE').lower().split(os.pathsep)
+
+    if os.path.dirname(path):
+        candidates = [path]
+    else:
+        candidates = [os.path.join(d, path) for d in os.environ.get('PATH', '').split(os.pathsep) if d]
+    for candidate in candidates:
+        for ext in extensions:
+            if os.path.isfile(candidate + ext) and os.access(candidate + ext, os.X_OK):
+                return os.path.realpath(candidate + ext)
+    return None
+
+_CHUNK_SIZE_ = 64 * 1024
+""" Bytes of file list written to ctags' stdin at a time."""
+
+def _file_list_chunks(files, newline=os.linesep):
+    """
+    Encodes a file list for ctags' stdin a chunk at a time, so a long list is never built up as one string.
+    @param files: source files
+    @type files: sequence
+    @param newline: line ending after each file
+    @type newline: str
+    @rtype: generator of bytes
+    """
+    newline = newline.encode()
+    chunk = list()
+    size = 0
+    for f in files:
+        line = f.encode('utf-8') + newline
+        chunk.append(line)
+        size += len(line)
+        if size >= _CHUNK_SIZE_:
+            yield b''.join(chunk)
+            chunk = list()
+            size = 0
+    if chunk:
+        yield b''.join(chunk)
+
+def _write_buffers(buffers, work_dir):
+    """
+    Writes source text to files so ctags can read it, each in a directory of its own so names can repeat and keep the base name ctags picks a parser by.
+    @param buffers: (virtual path, text) pairs, text as unicode str or bytes
+    @type buffers: sequence
+    @param work_dir: directory to write the files in
+    @type work_dir: str
+    @returns: (files written in buffer order, dict with each file written as key and its virtual path as value)
+    @rtype: tuple
+    """
+    files = list()
+    virtual = dict()
+    for (i, (path, text)) in enumerate(buffers):
+        buffer_dir = os.path.join(work_dir, str(i))
+        os.mkdir(buffer_dir)
+        name = os.path.join(buffer_dir, os.path.basename(path) or 'buffer')
+        if not isinstance(text, bytes):
+            text = text.encode('utf-8')
+        f = open(name, 'wb')
+        try:
+            f.write(text)
+        finally:
+            f.close()
+        files.append(name)
+        virtual[name] = path
+    return (files, virtual)
+
+_probe_results = dict()
+""" Probe results of this process, (generator class name, executable, size, modification time) as key, dict of probed attributes as value."""
+
 class ctags_base:
     """
     This class exists to provide a template and some functionality for wrapping command line ctags programs.
 
     The functions B{_query_tag_generator}, B{generate_tags}, and B{generate_tagfile} should be overriden in child classes.
+    
+    What B{_query_tag_generator} finds out is cached for each executable, keyed on its resolved path, size and modification time, in this process and in files under B{probe_cache_dir}.
+    Child classes list the attributes it sets in B{_probe_fields}.
     """
+    probe_cache_dir = _default_probe_dir()
+    """ Directory for cached probe results, None to only cache them in this process."""
+    
+    _probe_fields = []
+    """ Attributes set by _query_tag_generator that are cached, their values must be plain data that json can store."""
+    
     def __init__(self, *args, **kwargs):
         """
         Base class to wrap ctags program.
@@ -76,17 +175,95 @@ class ctags_base:
         """
         rval = False
         if type(path) == str:
-            # see if exe_file is executable
-            try:
-                subprocess.Popen(path, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
-                rval = True
-            except OSError:
-                pass
+            key = self._probe_key(path)
+            if key is not None and self._load_probe(key):
+                return True
+            
+            # see if exe_file is executable, without starting a shell to find out
+            rval = _resolve_program(path) is not None
         if rval:
             self._query_tag_generator(path)
+            if key is not None:
+                self._save_probe(key)
             
         return rval
     
+    def _probe_key(self, path):
+        """
+        @returns: key for the probe results of an executable, or None if it can't be found so its results aren't cached
+        @rtype: tuple
+        """
+        if not self._probe_fields:
+            return None
+        resolved = _resolve_program(path)
+        if resolved is None:
+            return None
+        try:
+            st = os.stat(resolved)
+        except OSError:
+            return None
+        mtime = getattr(st, 'st_mtime_ns', None)
+        if mtime is None:
+            mtime = int(st.st_mtime * 1000000000)
+        return (self.__class__.__name__, resolved, st.st_size, mtime)
+    
+    def _probe_file(self, key):
+        """ @returns: cache file name for a probe key, one file per generator and executable."""
+        name = hashlib.sha1((key[0] + '\n' + key[1]).encode('utf-8')).hexdigest()
+        return os.path.join(self.probe_cache_dir, name + '.json')
+    
+    def _load_probe(self, key):
+        """
+        Sets the probed attributes from the cache.
+        @returns: cached results were found
+        @rtype: boolean
+        """
+        results = _probe_results.get(key)
+        if results is None and self.probe_cache_dir:
+            try:
+                f = open(self._probe_file(key), 'rb')
+                try:
+                    cached = json.loads(f.read().decode('utf-8'))
+                finally:
+                    f.close()
+                # the file is overwritten when the executable changes, check it's for this one
+                if [cached['generator'], cached['program'], cached['size'], cached['mtime']] == list(key):
+                    results = cached['fields']
+                    _probe_results[key] = results
+            except (IOError, OSError, ValueError, KeyError, TypeError):
+                results = None
+        
+        if results is None or len([f for f in self._probe_fields if f not in results]):
+            return False
+        for field in self._probe_fields:
+            setattr(self, field, results[field])
+        return True
+    
+    def _save_probe(self, key):
+        """ Caches the probed attributes.  A cache directory that can't be written to is skipped."""
+        results = dict()
+        for field in self._probe_fields:
+            results[field] = getattr(self, field)
+        _probe_results[key] = results
+        
+        if not self.probe_cache_dir:
+            return
+        filename = self._probe_file(key)
+        tmp = filename + '.' + str(os.getpid()) + '.tmp'
+        data = {'generator' : key[0], 'program' : key[1], 'size' : key[2], 'mtime' : key[3], 'fields' : results}
+        try:
+            if not os.path.isdir(self.probe_cache_dir):
+                os.makedirs(self.probe_cache_dir)
+            f = open(tmp, 'wb')
+            try:
+                f.write(json.dumps(data).encode('utf-8'))
+            finally:
+                f.close()
+            getattr(os, 'replace', os.rename)(tmp, filename)
+        except (IOError, OSError):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    
     def _query_tag_generator(self, path):
         """
         Abstract method, used to test ctags generator.
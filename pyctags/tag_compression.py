@@ -0,0 +1,82 @@
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not,
+##    see <http://www.gnu.org/licenses/>.
+
+"""
+Opens tag files that may be compressed with gzip, bzip2 or xz, going by the file name's extension.
+
+Compressed files are decompressed as they're read, through a large buffer, so they can be iterated line by line like plain files.
+"""
+
+import io, gzip, bz2
+try:
+    import lzma
+except ImportError:
+    # python 2, or built without xz support
+    lzma = None
+
+_BUFFER_SIZE_ = 1024 * 1024
+""" Read buffer for decompressed data."""
+
+def _open_xz(filename):
+    if lzma is None:
+        raise IOError("xz compressed tag files need the lzma module: " + filename)
+    return lzma.open(filename, 'rb')
+
+_OPENERS_ = {
+    '.gz' : gzip.GzipFile,
+    '.bz2' : bz2.BZ2File,
+    '.xz' : _open_xz
+}
+
+def compression(filename):
+    """
+    @param filename: tag file name
+    @type filename: str
+    @returns: compression extension of the file name, such as '.gz', or None for a plain file
+    @rtype: str
+    """
+    for ext in _OPENERS_:
+        if filename.endswith(ext):
+            return ext
+    return None
+
+def open_tag_file(filename):
+    """
+    Opens a tag file for reading bytes, decompressing it if its name ends in .gz, .bz2 or .xz.
+    @param filename: tag file name
+    @type filename: str
+    @returns: binary file object
+    @raise IOError: the file can't be opened
+    """
+    ext = compression(filename)
+    if ext is None:
+        return open(filename, 'rb')
+    return io.BufferedReader(_OPENERS_[ext](filename), _BUFFER_SIZE_)
+
+def read_tag_file(filename):
+    """
+    Reads a whole tag file, decompressing it if needed.
+    @param filename: tag file name
+    @type filename: str
+    @rtype: bytes
+    """
+    f = open_tag_file(filename)
+    try:
+        return f.read()
+    finally:
+        f.close()
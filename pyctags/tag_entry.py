@@ -24,6 +24,10 @@ This module uses the eval function, which will let package users execute arbitra
 
 from copy import copy
 import os
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
 try:
     # do relative imports for tests
     # try this first in case pyctags is already installed, since we want to be testing the source bundled in the distribution
@@ -39,10 +43,215 @@ if sys.version_info[0] < 3:
     
 _COMMENT_BEGIN_ = ';"'
 
-class ctags_entry:
+_UNSHARED_FIELDS_ = ['signature']
+""" Extension fields whose values are nearly always unique, so they aren't worth interning."""
+
+_TEXT_TYPES_ = (str,)
+if not _PYTHON_3000_:
+    _TEXT_TYPES_ = (str, unicode)
+
+_lazy_layouts = dict()
+""" Intern table for the field names and layouts of extensions decoded on demand."""
+
+class extension_fields(MutableMapping):
+    """
+    Compact dict-like container for the extension fields of a ctags_entry.
+    
+    Keys and values are held in two tuples.  The key tuple is shared between every entry parsed by a ctags_file with the same set of extension fields, so each entry only pays for its values.
+    """
+    __slots__ = ('_keys', '_values')
+    
+    def __init__(self, keys=(), values=()):
+        """
+        @param keys: extension field names
+        @type keys: tuple
+        @param values: extension field values, in the same order as keys
+        @type values: tuple
+        """
+        self._keys = keys
+        self._values = values
+
+    def __getitem__(self, key):
+        try:
+            return self._values[self._keys.index(key)]
+        except ValueError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        try:
+            i = self._keys.index(key)
+        except ValueError:
+            self._keys = self._keys + (key,)
+            self._values = self._values + (value,)
+        else:
+            self._values = self._values[:i] + (value,) + self._values[i + 1:]
+
+    def __delitem__(self, key):
+        try:
+            i = self._keys.index(key)
+        except ValueError:
+            raise KeyError(key)
+        self._keys = self._keys[:i] + self._keys[i + 1:]
+        self._values = self._values[:i] + self._values[i + 1:]
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __eq__(self, other):
+        if isinstance(other, extension_fields) and self._keys is other._keys:
+            return self._values == other._values
+        return dict(zip(self._keys, self._values)) == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return repr(dict(zip(self._keys, self._values)))
+
+    def get(self, key, default=None):
+        try:
+            return self._values[self._keys.index(key)]
+        except ValueError:
+            return default
+
+    def items(self):
+        return list(zip(self._keys, self._values))
+
+    def __reduce__(self):
+        # pickled as the two tuples, so shared key tuples stay shared
+        return (extension_fields, (self._keys, self._values))
+
+def _parse_extensions(text, strings, intern_values=True):
+    """
+    Parses the tab separated extension fields of a tag line.
+    @param text: extension fields, without the leading ;" and tab
+    @type text: unicode str
+    @param strings: intern table for field names, layouts and values
+    @type strings: dict
+    @param intern_values: whether field values are looked up in strings too
+    @type intern_values: bool
+    @returns: (extension_fields, line number from the 'line' field or None)
+    @rtype: tuple
+    @raise ValueError: more than one kind field, or a bad 'line' field
+    """
+    intern = strings.setdefault
+    keys = list()
+    values = list()
+    line = None
+    kind_arg_found = False
+    for ext in text.split('\t'):
+        if ':' in ext:
+            (k, v) = ext.split(':', 1)
+            if k == 'line' and line is None:
+                try:
+                    line = int(v)
+                except ValueError:
+                    raise ValueError("Extended tag 'line' found but can't be converted to integer.")
+        else:
+            if kind_arg_found:
+                raise ValueError("Unknown extended tag found.")
+            (k, v) = ('kind', ext)
+            kind_arg_found = True
+        keys.append(intern(k, k))
+        if intern_values and k not in _UNSHARED_FIELDS_:
+            v = intern(v, v)
+        values.append(v)
+
+    keys = tuple(keys)
+    return (extension_fields(intern(keys, keys), tuple(values)), line)
+
+def _find_extension(text, key):
+    """
+    Finds a single field in raw extension text without decoding the others.
+    
+    The kind may be given either as a bare first field or as a 'kind:' field, as exuberant ctags writes it.
+    @param text: extension fields, without the leading ;" and tab
+    @type text: unicode str or bytes
+    @param key: extension field name
+    @type key: str
+    @returns: field value, or None if the field isn't present, of the same type as text
+    @rtype: unicode str, bytes or None
+    """
+    is_kind = (key == 'kind')
+    tab = '\t'
+    colon = ':'
+    if _PYTHON_3000_ and type(text) is bytes:
+        tab = b'\t'
+        colon = b':'
+        key = key.encode("utf-8")
+    if is_kind:
+        end = text.find(tab)
+        if end < 0:
+            end = len(text)
+        if end and text.find(colon, 0, end) < 0:
+            return text[:end]
+    prefix = key + colon
+    if text.startswith(prefix):
+        start = len(prefix)
+    else:
+        start = text.find(tab + prefix)
+        if start < 0:
+            return None
+        start += len(prefix) + 1
+    end = text.find(tab, start)
+    if end < 0:
+        return text[start:]
+    return text[start:end]
+
+def _format_extensions(extensions):
+    """
+    Formats extension fields the way exuberant ctags writes them, kind first and bare.
+    @param extensions: extension fields
+    @type extensions: dict or extension_fields
+    @returns: tab separated extension text, without the leading ;" and tab
+    @rtype: unicode str
+    """
+    fields = list()
+    for (k, v) in extensions.items():
+        if k == 'kind' and ':' not in v:
+            fields.insert(0, v)
+        else:
+            fields.append(k + ':' + v)
+    return '\t'.join(fields)
+
+def _format_line(name, file, pattern, line_number, ext):
+    """
+    Formats a tag file line.
+    @param ext: extension fields as formatted by _format_extensions()
+    @type ext: unicode str
+    @returns: tag line, without a newline
+    @rtype: unicode str
+    """
+    if pattern:
+        locator = pattern
+        if line_number and _find_extension(ext, 'line') is None:
+            # the line number can only follow a pattern as an extension field
+            if ext:
+                ext += '\t'
+            ext += 'line:' + str(line_number)
+    else:
+        locator = str(line_number)
+    
+    if ext:
+        return name + '\t' + file + '\t' + locator + _COMMENT_BEGIN_ + '\t' + ext
+    return name + '\t' + file + '\t' + locator
+
+def _rebuild_entry(name, file, pattern, line_number, extensions):
+    """ Unpickles a ctags_entry."""
+    return ctags_entry._from_fields(name, file, pattern, line_number, extensions)
+
+class ctags_entry(object):
     """
     An entry in the tag file.
     """
+    __slots__ = ('name', 'file', 'pattern', 'line_number', '_extensions')
+    
     def __init__(self, *args, **kwargs):
         """
         A tag entry from ctags file. Initializes from str or keyword args.
@@ -86,59 +295,8 @@ class ctags_entry:
                     entry = eval(args[0])
 
                 else:
-                    argstr = args[0].strip()
-                    # bah!  uglies.
-                    if not _PYTHON_3000_ and type(argstr) is not unicode:
-                        argstr = unicode(argstr, "utf-8")
-                    
-                    # this should be a tag line, could use some safety checking here though
-                    (entry['name'], entry['file'], the_rest) = argstr.split('\t', 2)
-    
-                    extension_fields = None
-    
-                    if the_rest.find(_COMMENT_BEGIN_) > 0:
-                        try:
-                            (locator, junk, extension_fields) = the_rest.rpartition(_COMMENT_BEGIN_)
-                        except AttributeError:
-                            # assume this is pre Python 2.5
-                            tmplist = the_rest.split(_COMMENT_BEGIN_)
-                            locator = _COMMENT_BEGIN_.join(tmplist[:-1])
-                            junk = _COMMENT_BEGIN_
-                            extension_fields = tmplist[-1]
-                    else:
-                        locator = the_rest
-    
-                    if locator.isdigit():
-                        try:
-                            entry['line_number'] = int(locator)
-                        except ValueError:
-                            raise ValueError("Line number locator found for tag, but can't be converted to integer")
-                    else:
-                        # should be a regex pattern
-                        entry['pattern'] = locator
-    
-                    entry['extensions'] = {}
-                    kind_arg_found = False
-                    if extension_fields:
-                        if extension_fields[0] == '\t':
-    
-                            # probably exuberant ctags format
-                            extension_list = extension_fields[1:].split('\t')
-                            for ext in extension_list:
-                                if ':' in ext:
-                                    (k, v) = ext.split(':', 1)
-                                    entry['extensions'][k] = v
-                                    if k == 'line' and 'line_number' not in entry:
-                                        try:
-                                            entry['line_number'] = int(v)
-                                        except ValueError:
-                                            raise ValueError("Extended tag 'line' found but can't be converted to integer.")
-                                else:
-                                    if kind_arg_found:
-                                        raise ValueError("Unknown extended tag found.")
-                                    else:
-                                        entry['extensions']['kind'] = ext
-                                        kind_arg_found = True
+                    self._parse_line(args[0], dict())
+                    return
                 
         elif len(kwargs):
             entry = kwargs
@@ -165,6 +323,173 @@ class ctags_entry:
         if 'extensions' in entry:
             self.extensions = entry['extensions']
 
+    def _get_extensions(self):
+        ext = self._extensions
+        if isinstance(ext, _TEXT_TYPES_):
+            # decode extension text kept from a lazy parse
+            ext = _parse_extensions(ext, _lazy_layouts, False)[0]
+            self._extensions = ext
+        return ext
+
+    def _set_extensions(self, extensions):
+        self._extensions = extensions
+
+    extensions = property(_get_extensions, _set_extensions, doc=""" If not none, dict of extension fields embedded in comments in the tag entry, from exuberant ctags.  Decoded on first access for lazily parsed entries.""")
+
+    def get_extension(self, key, default=None):
+        """
+        Gets a single extension field.  For lazily parsed entries, this doesn't decode the other fields.
+        @param key: extension field name, such as 'kind'
+        @type key: str
+        @param default: returned if the field isn't present
+        @returns: field value, or default
+        """
+        ext = self._extensions
+        if ext is None:
+            return default
+        if isinstance(ext, _TEXT_TYPES_):
+            value = _find_extension(ext, key)
+            if value is None:
+                return default
+            return value
+        return ext.get(key, default)
+
+    @classmethod
+    def _from_line(cls, line, strings, lazy=False):
+        """
+        Builds an entry from a tag file line, sharing strings with other entries.
+        @param line: line from a tag file
+        @type line: unicode str
+        @param strings: intern table shared by the entries of one ctags_file
+        @type strings: dict
+        @param lazy: keep extension fields as text until they are accessed
+        @type lazy: bool
+        @rtype: ctags_entry
+        """
+        entry = cls.__new__(cls)
+        entry._parse_line(line, strings, lazy)
+        return entry
+
+    @classmethod
+    def _from_fields(cls, name, file, pattern, line_number, extensions):
+        """
+        Builds an entry from already validated fields, skipping keyword checks.
+        @rtype: ctags_entry
+        """
+        entry = cls.__new__(cls)
+        entry.name = name
+        entry.file = file
+        entry.pattern = pattern
+        entry.line_number = line_number
+        entry._extensions = extensions
+        return entry
+
+    def __reduce__(self):
+        # a plain argument tuple pickles much smaller and faster than slot state, which matters when entries are sent between processes
+        return (_rebuild_entry, (self.name, self.file, self.pattern, self.line_number, self._extensions))
+
+    def _parse_line(self, line, strings, lazy=False):
+        """
+        Sets this entry's fields from a tag file line.
+        
+        File names, kinds, and extension field names and layouts are looked up in I{strings} so that equal values are stored only once.
+        If I{lazy} is set, the extension fields are kept as text and only decoded when self.extensions is used, so errors in them aren't reported until then.
+        @raise ValueError: the line can't be parsed
+        """
+        argstr = line.strip()
+        # bah!  uglies.
+        if not _PYTHON_3000_ and type(argstr) is not unicode:
+            argstr = unicode(argstr, "utf-8")
+        
+        # this should be a tag line, could use some safety checking here though
+        (name, file, the_rest) = argstr.split('\t', 2)
+        self._parse_fields(name, strings.setdefault(file, file), the_rest, strings, lazy)
+
+    @classmethod
+    def _from_bytes(cls, line, strings, raw_files, lazy=False, errors='strict'):
+        """
+        Builds an entry from an undecoded tag file line.
+        
+        The line is split in bytes, and the file name is decoded only the first time it's seen, since most tags share their file with many others.  The name and the rest of the line are decoded as a whole.
+        @param line: line from a tag file
+        @type line: bytes
+        @param strings: intern table shared by the entries of one ctags_file
+        @type strings: dict
+        @param raw_files: undecoded file name as key, decoded file name from strings as value
+        @type raw_files: dict
+        @param lazy: keep extension fields as text until they are accessed
+        @type lazy: bool
+        @param errors: error handler for invalid UTF-8, as for bytes.decode()
+        @type errors: str
+        @rtype: ctags_entry
+        @raise ValueError: the line can't be parsed, or isn't valid UTF-8 and errors is 'strict'
+        """
+        (name, file, the_rest) = line.strip().split(b'\t', 2)
+        try:
+            file = raw_files[file]
+        except KeyError:
+            text = file.decode("utf-8", errors)
+            text = strings.setdefault(text, text)
+            raw_files[file] = text
+            file = text
+        
+        entry = cls.__new__(cls)
+        entry._parse_fields(name.decode("utf-8", errors), file, the_rest.decode("utf-8", errors), strings, lazy)
+        return entry
+
+    def _parse_fields(self, name, file, the_rest, strings, lazy):
+        """
+        Sets this entry's fields from the name, interned file name, and the rest of a tag file line.
+        @raise ValueError: the locator or extension fields can't be parsed
+        """
+        self.name = name
+        self.file = file
+        self.pattern = None
+        self.line_number = None
+
+        extension_fields_str = None
+
+        if the_rest.find(_COMMENT_BEGIN_) > 0:
+            try:
+                (locator, junk, extension_fields_str) = the_rest.rpartition(_COMMENT_BEGIN_)
+            except AttributeError:
+                # assume this is pre Python 2.5
+                tmplist = the_rest.split(_COMMENT_BEGIN_)
+                locator = _COMMENT_BEGIN_.join(tmplist[:-1])
+                junk = _COMMENT_BEGIN_
+                extension_fields_str = tmplist[-1]
+        else:
+            locator = the_rest
+
+        if locator.isdigit():
+            try:
+                self.line_number = int(locator)
+            except ValueError:
+                raise ValueError("Line number locator found for tag, but can't be converted to integer")
+        else:
+            # should be a regex pattern
+            self.pattern = locator
+
+        if extension_fields_str and extension_fields_str[0] == '\t' and lazy:
+            self._extensions = extension_fields_str[1:]
+            if self.line_number is None:
+                line = _find_extension(self._extensions, 'line')
+                if line is not None:
+                    try:
+                        self.line_number = int(line)
+                    except ValueError:
+                        raise ValueError("Extended tag 'line' found but can't be converted to integer.")
+        elif extension_fields_str and extension_fields_str[0] == '\t':
+            # probably exuberant ctags format
+            (self._extensions, line) = _parse_extensions(extension_fields_str[1:], strings)
+            if line is not None and self.line_number is None:
+                self.line_number = line
+        else:
+            self._extensions = extension_fields()
+
+        if not self.line_number and not self.pattern:
+            raise ValueError("No valid locator for this tag.")
+
     def __repr__(self):
         d = {'file' : self.file, 'name' : self.name}
         if self.pattern:
@@ -189,8 +514,46 @@ class ctags_entry:
         else:
             return "Unnamed tag."
         
+    def _to_line(self):
+        """
+        @returns: the entry as a tag file line, without a newline
+        @rtype: unicode str
+        """
+        ext = self._extensions
+        if not ext:
+            ext = ''
+        elif not isinstance(ext, _TEXT_TYPES_):
+            ext = _format_extensions(ext)
+        return _format_line(self.name, self.file, self.pattern, self.line_number, ext)
+
+    def _key(self):
+        """
+        Identity of the tag apart from its extension fields.  Unset and empty locators compare equal, as they do in repr().
+        @rtype: tuple
+        """
+        return (self.name, self.file, self.pattern or None, self.line_number or None)
+
     def __eq__(self, other):
-        return (repr(self) == repr(other))
+        if not isinstance(other, ctags_entry):
+            return NotImplemented
+        if self._key() != other._key():
+            return False
+        
+        ext = self._extensions
+        other_ext = other._extensions
+        if ext is other_ext:
+            return True
+        if isinstance(ext, _TEXT_TYPES_) and isinstance(other_ext, _TEXT_TYPES_) and ext == other_ext:
+            # identical raw extension text, no need to decode it
+            return True
+        return (self.extensions or None) == (other.extensions or None)
     
     def __ne__(self, other):
-        return (repr(self) != repr(other))
+        eq = self.__eq__(other)
+        if eq is NotImplemented:
+            return eq
+        return not eq
+    
+    def __hash__(self):
+        """ Hashes name, file and locator, so entries can be used in sets and as dict keys.  Don't change an entry while it's in one."""
+        return hash(self._key())
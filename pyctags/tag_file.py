@@ -21,15 +21,59 @@ Python representation of ctags format file.
 """
 
 import os
+try:
+    import multiprocessing
+except ImportError:
+    # python 2.5
+    multiprocessing = None
 try:
     # do relative imports for tests
     # try this first in case pyctags is already installed, since we want to be testing the source bundled in the distribution
     from kwargs_validator import the_validator as validator
     from tag_entry import ctags_entry, _PYTHON_3000_
+    from tag_store import tag_store, tag_partitions
+    from tag_writer import write_tags
+    from tag_compression import compression, open_tag_file
+    from harvesters import _supports
 except ImportError:
     from pyctags.kwargs_validator import the_validator as validator
     from pyctags.tag_entry import ctags_entry, _PYTHON_3000_
+    from pyctags.tag_store import tag_store, tag_partitions
+    from pyctags.tag_writer import write_tags
+    from pyctags.tag_compression import compression, open_tag_file
+    from pyctags.harvesters import _supports
+
+_HEADER_MARKS_ = ('!', b'!')
+""" First character of header lines, as text or bytes."""
+
+_TAIL_SIZE_ = 256
+""" Number of bytes checked by ctags_file.refresh() to make sure a tag file has only been appended to."""
 
+def _parse_range(task):
+    """
+    Parses the tag lines in a byte range of a tag file, run in a worker process by ctags_file.parse().
+    @param task: (file name, start offset, end offset, columnar, lazy_extensions, keep_tags, encoding_errors, harvesters)
+    @type task: tuple
+    @returns: (list of ctags_entry or tag_store, harvesters fed with the range's tags)
+    @rtype: tuple
+    """
+    (filename, start, end, columnar, lazy_extensions, keep_tags, encoding_errors, harvesters) = task
+    
+    f = open(filename, 'rb')
+    try:
+        f.seek(start)
+        data = f.read(end - start)
+    finally:
+        f.close()
+    
+    tagfile = ctags_file()
+    tagfile.feed_init(harvesters=harvesters, columnar=columnar, lazy_extensions=lazy_extensions, keep_tags=keep_tags, encoding_errors=encoding_errors)
+    for line in data.split(b'\n'):
+        if line.strip():
+            tagfile.feed_line(line)
+    
+    # the harvesters are finished off by the parent, after they're merged
+    return (tagfile.tags, harvesters)
 
 class ctags_file:
     """
@@ -41,17 +85,26 @@ class ctags_file:
         Initializes instances of ctags_file.
             - B{Keyword Arguments:}
                 - B{harvesters:} (list) list of harvester classes
-        @param tags: If I{tags} is a sequence, it will automatically be parsed.  If it is a filename or path, it will be opened and parsed.
+                - B{columnar:} (bool) keep tags in a L{tag_store} instead of a list of ctags_entry instances
+                - B{lazy_extensions:} (bool) keep each entry's extension fields as text until they're used
+                - B{keep_tags:} (bool) if False, entries are only passed to the harvesters and self.tags stays empty, default True
+                - B{partitioned:} (bool) keep tags in a L{tag_partitions} grouped by source file, so one file's tags can be replaced quickly
+                - B{encoding_errors:} (str) how to handle invalid UTF-8 in tag files, as for bytes.decode(): 'strict' (default), 'replace', 'ignore' or 'surrogateescape'
+                - B{jobs:} (int) number of worker processes used to parse a tag file given by name, default 1
+        @param tags: If I{tags} is a sequence, it will automatically be parsed.  If it is a filename or path, it will be opened and parsed; names ending in .gz, .bz2 or .xz are decompressed as they're read.
         @type tags: sequence or str
         """
         
-        valid_kwargs = ['harvesters']
+        valid_kwargs = ['harvesters', 'columnar', 'lazy_extensions', 'keep_tags', 'partitioned', 'encoding_errors', 'jobs']
         validator.validate(kwargs.keys(), valid_kwargs)
         
         self._clear_variables()
 
         if tags:
             self.parse(tags, **kwargs)
+        elif kwargs.get('partitioned', False):
+            # nothing to parse yet, but tags added later are kept by source file
+            self.tags = tag_partitions()
 
     def _clear_variables(self):
         """
@@ -83,11 +136,35 @@ class ctags_file:
         """ Tag program version comment."""
         
         self.tags = list()
-        """ List of ctags_entry elements."""
+        """ List of ctags_entry elements, or a tag_store in columnar mode."""
+        
+        self._strings = dict()
+        """ Intern table for file names, kinds, and extension fields shared by entries in self.tags."""
+        
+        self._raw_files = dict()
+        """ Undecoded file names of the tag lines parsed so far, with their decoded names from self._strings."""
+        
+        self._lazy_extensions = False
+        """ If True, entries keep their extension fields as text until they're used."""
+        
+        self._keep_tags = True
+        """ If False, parsed entries are only fed to harvesters."""
+        
+        self._encoding_errors = 'strict'
+        """ Error handler used when decoding tag file bytes."""
         
         self.__feed_harvesters = list()
         """ List of harvesters used when parsing ctags output on the fly."""
         
+        self._source = None
+        """ Name of the tag file last parsed, used by refresh()."""
+        self._source_offset = 0
+        """ Number of bytes of self._source consumed so far."""
+        self._source_tail = None
+        """ Last bytes consumed from self._source."""
+        self.__source_harvesters = list()
+        """ Harvesters passed when self._source was parsed, fed again by refresh()."""
+        
     def __header_format(self, line):
         """ Processes !_ctags_file_FORMAT ctags header."""
         if not self.format:
@@ -133,32 +210,275 @@ class ctags_file:
         Parses ctags file and constructs ctags_entry list.
             - B{Keyword Arguments:}
                 - B{harvesters:} (list) list of harvester classes
-        @param tags: Filename or sequence of tag strings to parse.
+                - B{columnar:} (bool) keep tags in a L{tag_store} instead of a list of ctags_entry instances
+                - B{lazy_extensions:} (bool) keep each entry's extension fields as text until they're used
+                - B{keep_tags:} (bool) if False, entries are only passed to the harvesters and self.tags stays empty, default True
+                - B{partitioned:} (bool) keep tags in a L{tag_partitions} grouped by source file, so one file's tags can be replaced quickly
+                - B{encoding_errors:} (str) how to handle invalid UTF-8 in tag files, as for bytes.decode(): 'strict' (default), 'replace', 'ignore' or 'surrogateescape'
+                - B{jobs:} (int) number of worker processes used to parse a tag file given by name, default 1.  Harvesters must support L{merge<harvesters.base_harvester.merge>}.
+        @param tags: Filename or sequence of tag strings to parse.  Files ending in .gz, .bz2 or .xz are decompressed as they're read, and parsed in a single process.
         @type tags: sequence or str
         @raises ValueError: parsing error
         """
 
+        jobs = 1
+        if 'jobs' in kwargs:
+            jobs = kwargs.pop('jobs')
+        
+        if jobs > 1 and multiprocessing and (type(tags) == str or (not _PYTHON_3000_ and type(tags) is unicode)) and not compression(tags):
+            # compressed files can't be split into byte ranges
+            self.__parse_parallel(tags, jobs, kwargs)
+            return
+
+        self.feed_init(**kwargs)
+        
         if type(tags) == str or (not _PYTHON_3000_ and type(tags) is unicode):
-            # we can iterate over the file, it doesn't have to be in a list first
-            tags = open(tags)
+            # keep the harvesters for refresh()
+            self.__source_harvesters = self.__feed_harvesters
+
+        for line in self.__read_lines(tags):
+            self.feed_line(line)
+
+        self.feed_finish()
 
+    def __parse_parallel(self, filename, jobs, kwargs):
+        """
+        Splits a tag file into byte ranges on line boundaries and parses them in a pool of processes.
+        Results are merged in file order.  Header lines are parsed once, here.
+        @raise NotImplementedError: a harvester doesn't support merging
+        """
         self.feed_init(**kwargs)
+        harvesters = self.__feed_harvesters
+        self.__source_harvesters = harvesters
+        columnar = isinstance(self.tags, tag_store)
+        if not columnar:
+            for h in harvesters:
+                if not _supports(h, 'merge'):
+                    raise NotImplementedError(h.__class__.__name__ + " can't merge, so it can't be fed by parallel jobs.")
+        
+        f = open(filename, 'rb')
+        try:
+            while True:
+                data_start = f.tell()
+                line = f.readline()
+                if line[:1] != b'!':
+                    break
+                self.__parse_header(line)
+            
+            size = os.path.getsize(filename)
+            bounds = [data_start]
+            for i in range(1, jobs):
+                pos = data_start + (size - data_start) * i // jobs
+                if pos <= bounds[-1]:
+                    continue
+                # move the boundary to the start of the next line
+                f.seek(pos - 1)
+                f.readline()
+                pos = f.tell()
+                if bounds[-1] < pos < size:
+                    bounds.append(pos)
+            bounds.append(size)
+            
+            self._source = filename
+            self._source_offset = size
+            self.__remember_tail(f)
+        finally:
+            f.close()
+        
+        # columnar stores are harvested by index after they're merged, so workers don't need the harvesters
+        worker_harvesters = harvesters
+        if columnar:
+            worker_harvesters = list()
+        
+        tasks = list()
+        for i in range(len(bounds) - 1):
+            # each worker gets empty harvesters, so data the caller's harvesters already hold isn't merged back once per worker
+            fresh = [h.clone() for h in worker_harvesters]
+            tasks.append((filename, bounds[i], bounds[i + 1], columnar, self._lazy_extensions, self._keep_tags, self._encoding_errors, fresh))
+        
+        pool = multiprocessing.Pool(min(jobs, len(tasks)))
+        try:
+            for (tags, fed_harvesters) in pool.imap(_parse_range, tasks):
+                if columnar:
+                    self.tags._extend_store(tags)
+                elif self._keep_tags:
+                    self.tags.extend(tags)
+                for (h, fed) in zip(worker_harvesters, fed_harvesters):
+                    h.merge(fed)
+        finally:
+            pool.close()
+            pool.join()
+        
+        if columnar:
+            for i in range(len(self.tags)):
+                for h in harvesters:
+                    h.feed_index(self.tags, i)
+        
+        self.feed_finish()
+
+    def iter_entries(self, tags, **kwargs):
+        """
+        Parses a ctags file one entry at a time, without storing the entries in self.tags.
+        Header information is still recorded in this instance as it's read.
+        
+        Example::
+        
+            names = name_lookup_harvester()
+            names.process_tag_list(ctags_file().iter_entries('tags'))
+        
+            - B{Keyword Arguments:}
+                - B{lazy_extensions:} (bool) keep each entry's extension fields as text until they're used
+                - B{encoding_errors:} (str) how to handle invalid UTF-8 in tag files, as for bytes.decode(): 'strict' (default), 'replace', 'ignore' or 'surrogateescape'
+        @param tags: Filename or sequence of tag strings to parse.
+        @type tags: sequence or str
+        @returns: generator of ctags_entry instances
+        @raises ValueError: parsing error
+        """
+        valid_kwargs = ['lazy_extensions', 'encoding_errors']
+        validator.validate(kwargs.keys(), valid_kwargs)
+        
+        lazy = False
+        if 'lazy_extensions' in kwargs:
+            lazy = kwargs['lazy_extensions']
+        if 'encoding_errors' in kwargs:
+            self._encoding_errors = kwargs['encoding_errors']
+        errors = self._encoding_errors
+        
+        strings = self._strings
+        raw_files = self._raw_files
+        for line in self.__read_lines(tags):
+            if type(line) is bytes:
+                yield ctags_entry._from_bytes(line, strings, raw_files, lazy, errors)
+            else:
+                yield ctags_entry._from_line(line, strings, lazy)
+
+    def __read_lines(self, tags):
+        """
+        Yields tag lines from a file name or sequence, processing header lines along the way.
+        @param tags: Filename or sequence of tag strings.
+        @type tags: sequence or str
+        """
+        if type(tags) == str or (not _PYTHON_3000_ and type(tags) is unicode):
+            # we can iterate over the file, it doesn't have to be in a list first
+            self._source = tags
+            self._source_offset = 0
+            self._source_tail = None
+            tags = self.__source_lines(False)
 
         for line in tags:
-            if not _PYTHON_3000_ and type(line) is not unicode:
-                line = line.decode("utf-8")
-            if line[0] == '!':
+            if line[:1] in _HEADER_MARKS_:
                 # this is part of the file information header
-                line = line.strip()
-                elements = line.split('\t')
-                try:
-                    self.__HEADER_ITEMS[elements[0]](self, elements[1:])
-                except KeyError:
-                    print ("Unknown header comment element " + elements[0] + " at line " + line_number + ".")
+                self.__parse_header(line)
+            else:
+                yield line
+
+    def _feed_lines(self, lines):
+        """
+        Passes tag lines to feed_line(), processing header lines along the way.  Used by feeders that read the lines themselves, such as L{tag_async.parse}.
+        @param lines: tag lines
+        @type lines: iterable of unicode str or bytes
+        """
+        for line in lines:
+            if line[:1] in _HEADER_MARKS_:
+                self.__parse_header(line)
             else:
                 self.feed_line(line)
 
+    def __source_lines(self, whole_lines_only):
+        """
+        Yields undecoded lines from self._source starting at self._source_offset, keeping track of the bytes consumed.
+        @param whole_lines_only: stop at a last line that has no newline yet, it may still be being written
+        @type whole_lines_only: bool
+        """
+        compressed = compression(self._source)
+        f = open_tag_file(self._source)
+        try:
+            if not compressed:
+                f.seek(self._source_offset)
+            for raw in f:
+                if whole_lines_only and raw[-1:] != b'\n':
+                    break
+                if not compressed:
+                    self._source_offset += len(raw)
+                yield raw
+            if compressed:
+                # offsets into decompressed data can't be followed, the file has been read as a whole
+                self._source_offset = os.path.getsize(self._source)
+            else:
+                self.__remember_tail(f)
+        finally:
+            f.close()
+
+    def __remember_tail(self, f):
+        """ Keeps the last bytes consumed from the tag file, so refresh() can tell if the file was rewritten."""
+        start = max(0, self._source_offset - _TAIL_SIZE_)
+        f.seek(start)
+        self._source_tail = f.read(self._source_offset - start)
+
+    def refresh(self, **kwargs):
+        """
+        Parses tag lines appended to the tag file since it was last read, for tag files that ctags updates with -a.
+        
+        The new tags go through feed_line(), so they are added to self.tags and fed to the harvesters the file was parsed with, or to the ones passed here.
+        Harvesters aren't started again with do_before(), but do_after() is called once the new lines are read.
+        
+        Run ctags with --sort=no when appending, a sorted append rewrites the whole file.
+            - B{Keyword Arguments:}
+                - B{harvesters:} (list) harvesters for the new tags, default is the list passed when the file was parsed
+        @returns: number of tag lines read
+        @rtype: int
+        @raise ValueError: no tag file has been parsed by name, the file is compressed, or the file was rewritten rather than appended to
+        """
+        valid_kwargs = ['harvesters']
+        validator.validate(kwargs.keys(), valid_kwargs)
+        
+        if self._source is None:
+            raise ValueError("No tag file to refresh.")
+        if compression(self._source):
+            raise ValueError("Compressed tag file " + self._source + " can't be refreshed, it needs to be parsed again.")
+        
+        if not self.__source_unchanged():
+            raise ValueError("Tag file " + self._source + " was rewritten, it needs to be parsed again.")
+        
+        self.__feed_harvesters = self.__source_harvesters
+        if 'harvesters' in kwargs:
+            self.__feed_harvesters = kwargs['harvesters']
+        
+        count = 0
+        for line in self.__source_lines(True):
+            if line[:1] in _HEADER_MARKS_:
+                self.__parse_header(line)
+            else:
+                self.feed_line(line)
+                count += 1
+        
         self.feed_finish()
+        return count
+
+    def __source_unchanged(self):
+        """ Checks that the bytes already consumed from the tag file are still where they were."""
+        if os.path.getsize(self._source) < self._source_offset:
+            return False
+        if self._source_tail is None:
+            return True
+        
+        f = open(self._source, 'rb')
+        try:
+            f.seek(self._source_offset - len(self._source_tail))
+            return f.read(len(self._source_tail)) == self._source_tail
+        finally:
+            f.close()
+
+    def __parse_header(self, line):
+        """ Processes a !_TAG_ header line."""
+        if type(line) is bytes:
+            line = line.decode("utf-8", self._encoding_errors)
+        line = line.strip()
+        elements = line.split('\t')
+        try:
+            self.__HEADER_ITEMS[elements[0]](self, elements[1:])
+        except KeyError:
+            print ("Unknown header comment element " + elements[0] + ".")
 
     def harvest(self, harvesters):
         """
@@ -174,27 +494,158 @@ class ctags_file:
         for h in harvesters:
             h.do_before()
         
-        for tag in self.tags:
-            # order n^2
-            for h in harvesters:
-                h.feed(tag)
+        if isinstance(self.tags, tag_store):
+            for i in range(len(self.tags)):
+                for h in harvesters:
+                    h.feed_index(self.tags, i)
+        else:
+            for tag in self.tags:
+                # order n^2
+                for h in harvesters:
+                    h.feed(tag)
             
         for h in harvesters:
             h.do_after()
             
 
+    def write(self, filename, **kwargs):
+        """
+        Writes self.tags to a tag file, with this file's program headers.  Large tag sets are sorted with an external merge sort, see L{tag_writer.write_tags}.
+            - B{Keyword Arguments:}
+                - B{sort:} (int) 0 for unsorted, 1 for sorted, 2 for sorted ignoring case.  Default is 1.
+                - B{run_size:} (int) number of tag lines sorted in memory before a run is spilled to a temporary file
+                - B{temp_dir:} (str) directory for spilled runs
+        @param filename: tag file to write
+        @type filename: str
+        @returns: number of tags written
+        @rtype: int
+        """
+        valid_kwargs = ['sort', 'run_size', 'temp_dir']
+        validator.validate(kwargs.keys(), valid_kwargs)
+        
+        return write_tags(self.tags, filename, header=self, **kwargs)
+
+    def file_tags(self, file):
+        """
+        Gets the tags of one source file.  Only partitioned storage finds them without scanning every tag.
+        @param file: source file name, as it appears in the tags
+        @type file: str
+        @returns: tags of the file
+        @rtype: list of ctags_entry
+        """
+        if isinstance(self.tags, tag_partitions):
+            return self.tags.file_tags(file)
+        if isinstance(self.tags, tag_store):
+            return [self.tags[i] for i in range(len(self.tags)) if self.tags.file(i) == file]
+        return [t for t in self.tags if t.file == file]
+
+    def remove_file(self, file):
+        """
+        Removes every tag of a source file.  With partitioned storage this takes time proportional to the file's tags, otherwise every tag is checked.
+        Harvesters that already processed the tags aren't updated.
+        @param file: source file name, as it appears in the tags
+        @type file: str
+        @returns: number of tags removed
+        @rtype: int
+        """
+        if isinstance(self.tags, tag_partitions):
+            return self.tags.remove_file(file)
+        
+        before = len(self.tags)
+        if isinstance(self.tags, tag_store):
+            self.tags._take([i for i in range(before) if self.tags.file(i) != file])
+        else:
+            self.tags = [t for t in self.tags if t.file != file]
+        return before - len(self.tags)
+
+    def replace_file(self, file, tags):
+        """
+        Replaces every tag of a source file, for instance with the output of ctags run on that file alone.
+        With partitioned storage this takes time proportional to the file's old and new tags, otherwise every tag is checked.
+        Harvesters that already processed the tags aren't updated.
+        @param file: source file name, as it appears in the tags
+        @type file: str
+        @param tags: new tags for the file, header lines are skipped
+        @type tags: sequence of tag lines or ctags_entry
+        @returns: number of tags removed
+        @rtype: int
+        @raises ValueError: a tag line can't be parsed
+        """
+        entries = list()
+        for t in tags:
+            if isinstance(t, ctags_entry):
+                entries.append(t)
+            elif not t.strip() or t[:1] in _HEADER_MARKS_:
+                continue
+            elif type(t) is bytes:
+                entries.append(ctags_entry._from_bytes(t, self._strings, self._raw_files, self._lazy_extensions, self._encoding_errors))
+            else:
+                entries.append(ctags_entry._from_line(t, self._strings, self._lazy_extensions))
+        
+        if isinstance(self.tags, tag_partitions):
+            return self.tags.replace_file(file, entries)
+        
+        removed = self.remove_file(file)
+        self.tags.extend(entries)
+        return removed
+
+    def deduplicate(self):
+        """
+        Removes repeated tags from self.tags in linear time, keeping the first of each in its original position.
+        Harvesters that already processed the tags aren't updated.
+        @returns: number of tags removed
+        @rtype: int
+        """
+        if isinstance(self.tags, (tag_store, tag_partitions)):
+            return self.tags.deduplicate()
+        
+        seen = set()
+        unique = list()
+        for tag in self.tags:
+            if tag not in seen:
+                seen.add(tag)
+                unique.append(tag)
+        
+        removed = len(self.tags) - len(unique)
+        self.tags = unique
+        return removed
+
     def feed_init(self, **kwargs):
         """
         Initializes ctags_file data members and possible data harvesters.
             - B{Keyword Arguments:}
                 - B{harvesters:} (list) list of harvester classes
-        @raises ValueError: parsing error
+                - B{columnar:} (bool) keep tags in a L{tag_store} instead of a list of ctags_entry instances
+                - B{lazy_extensions:} (bool) keep each entry's extension fields as text until they're used
+                - B{keep_tags:} (bool) if False, entries are only passed to the harvesters and self.tags stays empty, default True
+                - B{partitioned:} (bool) keep tags in a L{tag_partitions} grouped by source file, so one file's tags can be replaced quickly
+                - B{encoding_errors:} (str) how to handle invalid UTF-8 in tag files, as for bytes.decode(): 'strict' (default), 'replace', 'ignore' or 'surrogateescape'
+        @raises ValueError: parsing error, or columnar or partitioned storage requested without keeping tags
         """
 
-        valid_kwargs = ['harvesters']
+        valid_kwargs = ['harvesters', 'columnar', 'lazy_extensions', 'keep_tags', 'partitioned', 'encoding_errors']
         validator.validate(kwargs.keys(), valid_kwargs)
         
         self._clear_variables()
+        
+        if 'keep_tags' in kwargs:
+            self._keep_tags = kwargs['keep_tags']
+        
+        if 'encoding_errors' in kwargs:
+            self._encoding_errors = kwargs['encoding_errors']
+        
+        if 'columnar' in kwargs and kwargs['columnar']:
+            if not self._keep_tags:
+                raise ValueError("Columnar storage can't be used without keeping tags.")
+            self.tags = tag_store(self._strings, self._encoding_errors)
+        
+        if 'partitioned' in kwargs and kwargs['partitioned']:
+            if not self._keep_tags or isinstance(self.tags, tag_store):
+                raise ValueError("Partitioned storage needs keep_tags, and can't be combined with columnar storage.")
+            self.tags = tag_partitions()
+        
+        if 'lazy_extensions' in kwargs:
+            self._lazy_extensions = kwargs['lazy_extensions']
 
         self.__feed_harvesters = list()
         if 'harvesters' in kwargs:
@@ -206,12 +657,43 @@ class ctags_file:
     def feed_line(self, tagline):
         """
         Used to parse new ctags formatted output and new tags to the end of the tags list.
+        Undecoded lines are split as bytes.  A columnar store only decodes their file names and kinds, once each; entries decode the rest of the line, and file names once each.
         @param tagline: line from ctags output file
-        @type tagline: unicode str
+        @type tagline: unicode str or bytes
+        """
+
+        if isinstance(self.tags, tag_store):
+            if type(tagline) is bytes:
+                index = self.tags._append_raw(tagline)
+            else:
+                index = self.tags._append_line(tagline)
+            for h in self.__feed_harvesters:
+                h.feed_index(self.tags, index)
+            return
+
+        if type(tagline) is bytes:
+            entry = ctags_entry._from_bytes(tagline, self._strings, self._raw_files, self._lazy_extensions, self._encoding_errors)
+        else:
+            entry = ctags_entry._from_line(tagline, self._strings, self._lazy_extensions)
+        if self._keep_tags:
+            self.tags.append(entry)
+        for h in self.__feed_harvesters:
+            h.feed(entry)
+
+    def feed_entry(self, entry):
+        """
+        Adds an entry that was built rather than parsed from a tag line, such as one read from another ctags output format, to the end of the tags list.
+        @param entry: tag to add
+        @type entry: ctags_entry
         """
+        if isinstance(self.tags, tag_store):
+            index = self.tags.append(entry)
+            for h in self.__feed_harvesters:
+                h.feed_index(self.tags, index)
+            return
 
-        entry = ctags_entry(tagline)
-        self.tags.append(entry)
+        if self._keep_tags:
+            self.tags.append(entry)
         for h in self.__feed_harvesters:
             h.feed(entry)
 
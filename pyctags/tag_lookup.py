@@ -0,0 +1,277 @@
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not, 
+##    see <http://www.gnu.org/licenses/>.
+
+"""
+Fast name lookups in large tag files, in the style of the readtags utility that comes with exuberant ctags.
+
+The tag file is memory mapped and, if its header says it's sorted, searched with a binary search over byte offsets.  Only the matching lines are turned into ctags_entry instances.
+"""
+
+import mmap
+try:
+    # do relative imports for tests
+    # try this first in case pyctags is already installed, since we want to be testing the source bundled in the distribution
+    from kwargs_validator import the_validator as validator
+    from tag_entry import ctags_entry
+    from tag_file import ctags_file
+    from tag_compression import compression, read_tag_file
+except ImportError:
+    from pyctags.kwargs_validator import the_validator as validator
+    from pyctags.tag_entry import ctags_entry
+    from pyctags.tag_file import ctags_file
+    from pyctags.tag_compression import compression, read_tag_file
+
+_UNSORTED_ = 0
+_SORTED_ = 1
+_FOLDCASE_ = 2
+
+class ctags_lookup:
+    """
+    Looks up tags by name in a tag file without parsing the whole file.
+    
+    Files with a !_TAG_FILE_SORTED value of 1 (sorted) or 2 (foldcase) are binary searched, anything else is scanned line by line.
+    """
+    def __init__(self, filename, **kwargs):
+        """
+        Opens and memory maps a tag file, and reads its header.
+            - B{Keyword Arguments:}
+                - B{lazy_extensions:} (bool) keep each entry's extension fields as text until they're used
+        @param filename: tag file to search, decompressed into memory if it ends in .gz, .bz2 or .xz
+        @type filename: str
+        @raise IOError: the file can't be opened
+        """
+        valid_kwargs = ['lazy_extensions']
+        validator.validate(kwargs.keys(), valid_kwargs)
+        
+        self._lazy_extensions = False
+        if 'lazy_extensions' in kwargs:
+            self._lazy_extensions = kwargs['lazy_extensions']
+        
+        self._strings = dict()
+        """ Intern table shared by the entries returned from this instance."""
+        
+        self._raw_files = dict()
+        """ Undecoded file names seen so far, with their decoded names from self._strings."""
+        
+        self._file = None
+        self._map = None
+        if compression(filename):
+            # compressed files can't be mapped, they're decompressed into memory instead
+            self._data = read_tag_file(filename)
+        else:
+            self._file = open(filename, 'rb')
+            try:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._data = self._map
+            except ValueError:
+                # empty files can't be mapped
+                self._data = self._file.read()
+        
+        self._read_header()
+
+    def _read_header(self):
+        """ Parses the !_TAG_ lines at the top of the file with ctags_file and finds where the tags start."""
+        data = self._data
+        header_lines = list()
+        pos = 0
+        while data[pos:pos + 2] == b'!_':
+            end = data.find(b'\n', pos)
+            if end < 0:
+                end = len(data)
+            header_lines.append(data[pos:end].decode("utf-8"))
+            pos = end + 1
+        
+        self._data_start = min(pos, len(data))
+        """ Offset of the first tag line."""
+        
+        self.header = ctags_file(header_lines)
+        """ ctags_file holding the header information of the tag file, with no tags."""
+        
+        self.sorted = self.header.sorted
+        """ Sorting type from the !_TAG_FILE_SORTED header, 0 or None if the file isn't sorted."""
+
+    def close(self):
+        """ Releases the memory map and the file."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._data = b''
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _name_at(self, pos):
+        """ Returns the tag name of the line starting at pos, as bytes."""
+        end = self._data.find(b'\t', pos)
+        if end < 0:
+            end = len(self._data)
+        return self._data[pos:end]
+
+    def _next_line(self, pos):
+        """ Returns the offset of the line after the one starting at pos."""
+        end = self._data.find(b'\n', pos)
+        if end < 0:
+            return len(self._data)
+        return end + 1
+
+    def _entry_at(self, pos):
+        """ Builds a ctags_entry from the line starting at pos."""
+        end = self._data.find(b'\n', pos)
+        if end < 0:
+            end = len(self._data)
+        return ctags_entry._from_bytes(self._data[pos:end], self._strings, self._raw_files, self._lazy_extensions)
+
+    def _bisect(self, key, fold):
+        """
+        Binary searches the tag lines for the first name that isn't less than key.
+        @param key: name to look for, folded to upper case if fold is set
+        @type key: bytes
+        @param fold: compare names case insensitively
+        @type fold: bool
+        @returns: offset of the first line whose name is greater than or equal to key
+        @rtype: int
+        """
+        data = self._data
+        lo = self._data_start
+        hi = len(data)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            # back up to the start of the line mid falls in
+            start = data.rfind(b'\n', lo, mid) + 1
+            if start == 0:
+                start = lo
+            name = self._name_at(start)
+            if fold:
+                name = name.upper()
+            if name < key:
+                lo = self._next_line(start)
+            else:
+                hi = start
+        return lo
+
+    def _search(self, matchstr, prefix, case_sensitive, num_results):
+        key = matchstr.encode("utf-8")
+        
+        if self.sorted == _FOLDCASE_:
+            fold = True
+        elif self.sorted == _SORTED_ and case_sensitive:
+            fold = False
+        else:
+            return self._scan(key, prefix, case_sensitive, num_results)
+
+        if fold:
+            pos = self._bisect(key.upper(), True)
+        else:
+            pos = self._bisect(key, False)
+        
+        results = list()
+        end = len(self._data)
+        folded_key = key.upper()
+        while pos < end:
+            name = self._name_at(pos)
+            if prefix:
+                candidate = name[:len(key)]
+            else:
+                candidate = name
+            
+            if fold and candidate.upper() != folded_key:
+                break
+            if not fold and candidate != key:
+                break
+            
+            if not case_sensitive or candidate == key:
+                results.append(self._entry_at(pos))
+                if num_results and len(results) == num_results:
+                    break
+            pos = self._next_line(pos)
+        
+        return results
+
+    def _scan(self, key, prefix, case_sensitive, num_results):
+        """ Linear search for files that can't be binary searched with the requested case sensitivity."""
+        if not case_sensitive:
+            key = key.upper()
+        
+        results = list()
+        pos = self._data_start
+        end = len(self._data)
+        while pos < end:
+            name = self._name_at(pos)
+            if prefix:
+                name = name[:len(key)]
+            if not case_sensitive:
+                name = name.upper()
+            if name == key:
+                results.append(self._entry_at(pos))
+                if num_results and len(results) == num_results:
+                    break
+            pos = self._next_line(pos)
+        
+        return results
+
+    def find(self, name, **kwargs):
+        """
+        Finds the tags with a given name.
+            - B{Keyword Arguments:}
+                - B{num_results:} (int) maximum number of results to return, 0 for all, default
+                - B{case_sensitive:} (bool) whether to match case, default True
+        @param name: tag name to look up
+        @type name: str
+        @returns: matching tags, in file order
+        @rtype: list of ctags_entry
+        """
+        valid_kwargs = ['num_results', 'case_sensitive']
+        validator.validate(kwargs.keys(), valid_kwargs)
+        
+        (num_results, case_sensitive) = self.__search_options(kwargs)
+        return self._search(name, False, case_sensitive, num_results)
+
+    def starts_with(self, matchstr, **kwargs):
+        """
+        Finds the tags whose names begin with matchstr.
+            - B{Keyword Arguments:}
+                - B{num_results:} (int) maximum number of results to return, 0 for all, default
+                - B{case_sensitive:} (bool) whether to match case, default True
+        @param matchstr: start of the tag names to look up
+        @type matchstr: str
+        @returns: matching tags, in file order
+        @rtype: list of ctags_entry
+        """
+        valid_kwargs = ['num_results', 'case_sensitive']
+        validator.validate(kwargs.keys(), valid_kwargs)
+        
+        (num_results, case_sensitive) = self.__search_options(kwargs)
+        return self._search(matchstr, True, case_sensitive, num_results)
+
+    def __search_options(self, kwargs):
+        num_results = 0
+        if 'num_results' in kwargs:
+            num_results = int(kwargs['num_results'])
+        
+        case_sensitive = True
+        if 'case_sensitive' in kwargs:
+            case_sensitive = bool(kwargs['case_sensitive'])
+        
+        return (num_results, case_sensitive)
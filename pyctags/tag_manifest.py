@@ -0,0 +1,341 @@
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not,
+##    see <http://www.gnu.org/licenses/>.
+
+"""
+Incremental tag generation.
+
+A manifest records the size, modification time and optionally a content hash of every source file given to ctags, along with the ctags options used.  The next time tags are brought up to date, ctags only runs on the files that were added or changed since, the tags of deleted files are dropped, and the new tags are spliced into the existing ones.
+"""
+
+import os, hashlib
+try:
+    # do relative imports for tests
+    # try this first in case pyctags is already installed, since we want to be testing the source bundled in the distribution
+    from kwargs_validator import the_validator as validator
+    from tag_file import ctags_file
+    from tag_snapshot import _source_stamp
+    from exuberant import _output_sort
+except ImportError:
+    from pyctags.kwargs_validator import the_validator as validator
+    from pyctags.tag_file import ctags_file
+    from pyctags.tag_snapshot import _source_stamp
+    from pyctags.exuberant import _output_sort
+
+_MANIFEST_MARK_ = '!_PYCTAGS_MANIFEST\t1'
+""" First line of a manifest file, the last field is the format version."""
+
+_OPTIONS_MARK_ = '!_PYCTAGS_OPTIONS\t'
+
+_HASH_BLOCK_ = 1024 * 1024
+
+def _content_hash(filename):
+    """
+    @returns: SHA-1 hex digest of a file's contents
+    @rtype: str
+    """
+    h = hashlib.sha1()
+    f = open(filename, 'rb')
+    try:
+        while True:
+            block = f.read(_HASH_BLOCK_)
+            if not block:
+                break
+            h.update(block)
+    finally:
+        f.close()
+    return h.hexdigest()
+
+def _options_text(gen_opts):
+    """ Turns a generator_options dict into text that compares equal for equal options."""
+    return repr(sorted(gen_opts.items()))
+
+def _path_key(path):
+    """ @returns: the same text for different ways of writing a path, such as 'src/a.c', './src/a.c' and its absolute path."""
+    return os.path.normcase(os.path.abspath(path))
+
+def _as_given(lines, files):
+    """
+    Yields tag lines with their file names written the way the files were given to ctags, where ctags wrote them differently, such as with a ./ in front.
+    @param lines: tag lines ctags printed
+    @type lines: iterable of str
+    @param files: file names ctags was given
+    @type files: list
+    @rtype: generator of str
+    """
+    names = dict()
+    for f in files:
+        names[f] = f
+        names.setdefault(_path_key(f), f)
+    for line in lines:
+        fields = line.split('\t', 2)
+        f = fields[1]
+        if f not in names:
+            names[f] = names.get(_path_key(f), f)
+        if names[f] != f and len(fields) == 3:
+            line = '\t'.join([fields[0], names[f], fields[2]])
+        yield line
+
+class file_manifest:
+    """
+    Size, modification time and content hash of each source file tags were generated from.
+    """
+    def __init__(self, filename=None):
+        """
+        @param filename: manifest file to load
+        @type filename: str
+        @raise IOError: the manifest file can't be read
+        @raise ValueError: the file isn't a manifest
+        """
+        self.files = dict()
+        """ Source file name as key, (size, modification time in nanoseconds, SHA-1 hex digest or None) as value."""
+
+        self.options = ''
+        """ The ctags options the tags were generated with."""
+
+        if filename:
+            self.load(filename)
+
+    def load(self, filename):
+        """
+        Reads a manifest file, replacing what this manifest holds.
+        @param filename: manifest file
+        @type filename: str
+        @raise IOError: the manifest file can't be read
+        @raise ValueError: the file isn't a manifest
+        """
+        f = open(filename, 'rb')
+        try:
+            lines = f.read().decode('utf-8').split('\n')
+        finally:
+            f.close()
+
+        if lines[0] != _MANIFEST_MARK_ or len(lines) < 2 or not lines[1].startswith(_OPTIONS_MARK_):
+            raise ValueError(filename + " is not a manifest file.")
+        self.options = lines[1][len(_OPTIONS_MARK_):]
+        self.files = dict()
+        for line in lines[2:]:
+            if not line:
+                continue
+            try:
+                # the file name is last, so it can hold tabs
+                (size, mtime, digest, file) = line.split('\t', 3)
+                self.files[file] = (int(size), int(mtime), digest or None)
+            except ValueError:
+                raise ValueError("Bad manifest line in " + filename + ": " + line)
+
+    def save(self, filename):
+        """
+        Writes the manifest.
+        @param filename: manifest file, replaced as a whole so a failed run never leaves half a manifest
+        @type filename: str
+        """
+        lines = [_MANIFEST_MARK_, _OPTIONS_MARK_ + self.options]
+        for file in sorted(self.files):
+            (size, mtime, digest) = self.files[file]
+            lines.append('%d\t%d\t%s\t%s' % (size, mtime, digest or '', file))
+
+        # one temporary file per process, so processes saving the same manifest don't write into each other's
+        tmp = filename + '.' + str(os.getpid()) + '.tmp'
+        try:
+            f = open(tmp, 'wb')
+            try:
+                f.write(('\n'.join(lines) + '\n').encode('utf-8'))
+            finally:
+                f.close()
+            getattr(os, 'replace', os.rename)(tmp, filename)
+        except:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def scan(self, files, **kwargs):
+        """
+        Records the current state of source files.  Files that don't exist are left out.
+            - B{Keyword Arguments:}
+                - B{content_hash:} (bool) also hash each file's contents, so files that were touched but not changed aren't tagged again, default False
+                - B{previous:} (file_manifest) earlier manifest, whose hashes are reused for files with the same size and modification time
+        @param files: source files
+        @type files: sequence
+        """
+        valid_kwargs = ['content_hash', 'previous']
+        validator.validate(kwargs.keys(), valid_kwargs)
+
+        content_hash = kwargs.get('content_hash', False)
+        previous = kwargs.get('previous', None)
+        if previous is None:
+            previous = file_manifest()
+
+        self.files = dict()
+        for file in files:
+            try:
+                (size, mtime) = _source_stamp(file)
+            except OSError:
+                continue
+            digest = None
+            old = previous.files.get(file)
+            if old is not None and old[:2] == (size, mtime):
+                digest = old[2]
+            if content_hash and digest is None:
+                try:
+                    digest = _content_hash(file)
+                except IOError:
+                    continue
+            self.files[file] = (size, mtime, digest)
+
+    def changes(self, current):
+        """
+        Compares this manifest to a newer one.  A file whose size or modification time differs only counts as changed if its contents hash differently, when both manifests hold a hash for it.
+        @param current: newer manifest
+        @type current: file_manifest
+        @returns: sorted lists of the files (added, changed, removed)
+        @rtype: tuple
+        """
+        added = list()
+        changed = list()
+        for (file, stamp) in current.files.items():
+            old = self.files.get(file)
+            if old is None:
+                added.append(file)
+            elif old[:2] == stamp[:2]:
+                continue
+            elif old[2] is None or old[2] != stamp[2]:
+                changed.append(file)
+        removed = [f for f in self.files if f not in current.files]
+
+        added.sort()
+        changed.sort()
+        removed.sort()
+        return (added, changed, removed)
+
+def update_tags(tagfile, ctags, manifest, **kwargs):
+    """
+    Brings tags up to date with their source files.  ctags only runs on files added or changed since the manifest was written, the tags of files that no longer exist or aren't in the file list are removed, and the manifest is rewritten.
+    If the manifest is missing or was written with different generator options, every file is tagged again.
+        - B{Keyword Arguments:}
+            - B{files:} (sequence) source files, default is the file list ctags already has
+            - B{generator_options:} (dict) options to pass to ctags program
+            - B{jobs:} (int) number of ctags processes to split the files to tag between, default 1
+            - B{content_hash:} (bool) compare file contents as well as sizes and modification times, default False
+    @param tagfile: tags the manifest was written for, updated in place.  Partitioned tags, as in ctags_file(partitioned=True), are updated in time proportional to the tags that change.
+    @type tagfile: ctags_file
+    @param ctags: ctags program wrapper
+    @type ctags: exuberant_ctags
+    @param manifest: manifest file name
+    @type manifest: str
+    @returns: sorted lists of the files (added, changed, removed)
+    @rtype: tuple
+    @raise ValueError: ctags execution failed, the tags and manifest are left as they were
+    """
+    valid_kwargs = ['files', 'generator_options', 'jobs', 'content_hash']
+    validator.validate(kwargs.keys(), valid_kwargs)
+
+    (current, changes) = _splice(tagfile, ctags, manifest, kwargs)
+    current.save(manifest)
+    return changes
+
+def _splice(tagfile, ctags, manifest, kwargs):
+    """
+    Does the work of L{update_tags}, without writing the manifest.
+    @returns: (manifest of the source files as they are now, (added, changed, removed))
+    @rtype: tuple
+    """
+    files = list(kwargs.get('files', ctags._file_list))
+    gen_opts = kwargs.get('generator_options', dict())
+    options = _options_text(gen_opts)
+
+    previous = file_manifest()
+    if os.path.exists(manifest):
+        try:
+            previous.load(manifest)
+        except ValueError:
+            previous = file_manifest()
+
+    current = file_manifest()
+    current.scan(files, content_hash=kwargs.get('content_hash', False), previous=previous)
+    current.options = options
+
+    (added, changed, removed) = previous.changes(current)
+    if previous.options != options:
+        # tags made with other options can't be kept
+        changed = sorted([f for f in current.files if f in previous.files])
+
+    stale = added + changed
+    if stale:
+        # generate_tags replaces the wrapper's file list, put it back afterwards
+        file_list = ctags._file_list
+        try:
+            lines = ctags.generate_tags(files=stale, generator_options=gen_opts, jobs=kwargs.get('jobs', 1))
+        finally:
+            ctags._file_list = file_list
+
+        by_file = dict()
+        for f in stale:
+            by_file[f] = list()
+        # tags are filed under the manifest's names, so they're found again when the files change or go
+        for line in _as_given(lines, stale):
+            by_file.setdefault(line.split('\t', 2)[1], list()).append(line)
+        for f in stale:
+            tagfile.replace_file(f, by_file.pop(f))
+        # files ctags tagged that weren't asked for
+        for (f, file_lines) in by_file.items():
+            tagfile.replace_file(f, file_lines)
+
+    for f in removed:
+        tagfile.remove_file(f)
+
+    return (current, (added, changed, removed))
+
+def update_tagfile(ctags, filename, manifest, **kwargs):
+    """
+    Brings a tag file up to date with its source files, as L{update_tags} does, and writes it back.  If the tag file doesn't exist, every file is tagged.
+        - B{Keyword Arguments:}
+            - B{files:} (sequence) source files, default is the file list ctags already has
+            - B{generator_options:} (dict) options to pass to ctags program
+            - B{jobs:} (int) number of ctags processes to split the files to tag between, default 1
+            - B{content_hash:} (bool) compare file contents as well as sizes and modification times, default False
+    @param ctags: ctags program wrapper
+    @type ctags: exuberant_ctags
+    @param filename: tag file
+    @type filename: str
+    @param manifest: manifest file name
+    @type manifest: str
+    @returns: sorted lists of the files (added, changed, removed)
+    @rtype: tuple
+    @raise ValueError: ctags execution failed, or the generator options don't make a ctags format tag file
+    """
+    valid_kwargs = ['files', 'generator_options', 'jobs', 'content_hash']
+    validator.validate(kwargs.keys(), valid_kwargs)
+
+    sort = _output_sort(kwargs.get('generator_options', dict()))
+    if sort is None:
+        raise ValueError("Only ctags format tag files can be updated.")
+
+    if os.path.exists(filename):
+        tagfile = ctags_file(filename, partitioned=True)
+    else:
+        tagfile = ctags_file(partitioned=True)
+        # the manifest says nothing about tags that aren't there
+        if os.path.exists(manifest):
+            os.remove(manifest)
+
+    (current, changes) = _splice(tagfile, ctags, manifest, kwargs)
+    if len([x for x in changes if x]) or not os.path.exists(filename):
+        tagfile.write(filename, sort=sort)
+    # only once the tags are written, so the manifest never describes tags that aren't there
+    current.save(manifest)
+    return changes
@@ -0,0 +1,286 @@
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not,
+##    see <http://www.gnu.org/licenses/>.
+
+"""
+Binary snapshots of parsed tag files.
+
+A snapshot holds the headers and the tag_store columns of a ctags_file, so loading one only reads a few large blocks of UTF-8 instead of parsing every tag line.  Snapshots record the size and modification time of the tag file they were made from, and aren't used once it changes.
+"""
+
+import os, sys, struct
+from array import array
+try:
+    # do relative imports for tests
+    # try this first in case pyctags is already installed, since we want to be testing the source bundled in the distribution
+    from kwargs_validator import the_validator as validator
+    from tag_file import ctags_file
+    from tag_store import tag_store, _text_column
+except ImportError:
+    from pyctags.kwargs_validator import the_validator as validator
+    from pyctags.tag_file import ctags_file
+    from pyctags.tag_store import tag_store, _text_column
+
+_MAGIC_ = b'PYCTAGS\x02'
+""" Marks a snapshot file, the last byte is the format version."""
+
+_HEADER_FIELDS_ = ['format', 'format_comment', 'sorted', 'sorted_comment', 'author', 'author_comment',
+    'name', 'name_comment', 'url', 'url_comment', 'version', 'version_comment']
+""" ctags_file header attributes kept in a snapshot."""
+
+_INT_HEADER_FIELDS_ = ['format', 'sorted']
+
+def _source_stamp(filename):
+    """
+    @returns: (size, modification time in nanoseconds) of a file
+    @rtype: tuple
+    """
+    st = os.stat(filename)
+    mtime = getattr(st, 'st_mtime_ns', None)
+    if mtime is None:
+        mtime = int(st.st_mtime * 1000000000)
+    return (st.st_size, mtime)
+
+def _platform():
+    """ Snapshots store native arrays, so they're only read back on a machine with the same layout."""
+    return struct.pack('<BB', array('l').itemsize, sys.byteorder == 'little')
+
+def _write_chunk(f, data):
+    f.write(struct.pack('<Q', len(data)))
+    f.write(data)
+
+def _write_strings(f, strings):
+    f.write(struct.pack('<Q', len(strings)))
+    _write_chunk(f, '\n'.join(strings).encode('utf-8'))
+
+def _write_column(f, column):
+    # blocks are already UTF-8, and the offsets count bytes
+    (starts, offsets, blocks) = column._dump()
+    _write_chunk(f, starts.tobytes())
+    _write_chunk(f, offsets.tobytes())
+    _write_chunk(f, array('l', [len(b) for b in blocks]).tobytes())
+    _write_chunk(f, b''.join(blocks))
+
+class _snapshot_reader:
+    """
+    Reads back the chunks written by save_snapshot().
+    """
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def unpack(self, fmt):
+        size = struct.calcsize(fmt)
+        if self.pos + size > len(self.data):
+            raise ValueError("Snapshot is truncated.")
+        values = struct.unpack(fmt, self.data[self.pos:self.pos + size])
+        self.pos += size
+        return values
+
+    def chunk(self):
+        (size,) = self.unpack('<Q')
+        if self.pos + size > len(self.data):
+            raise ValueError("Snapshot is truncated.")
+        data = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return data
+
+    def strings(self):
+        (count,) = self.unpack('<Q')
+        text = self.chunk().decode('utf-8')
+        if not count:
+            return list()
+        return text.split('\n')
+
+    def array(self, typecode):
+        a = array(typecode)
+        a.frombytes(self.chunk())
+        return a
+
+    def column(self):
+        starts = self.array('l')
+        offsets = self.array('I')
+        lengths = self.array('l')
+        data = self.chunk()
+        blocks = list()
+        pos = 0
+        for length in lengths:
+            blocks.append(data[pos:pos + length])
+            pos += length
+        return _text_column._load(starts, offsets, blocks)
+
+def save_snapshot(tagfile, filename):
+    """
+    Writes a parsed ctags_file to a binary snapshot.
+
+    If the ctags_file was parsed from a tag file by name, the snapshot is tied to that file's current size and modification time.
+    @param tagfile: parsed tags
+    @type tagfile: ctags_file
+    @param filename: snapshot file to write, replaced as a whole so readers never see a partial snapshot
+    @type filename: str
+    """
+    tags = tagfile.tags
+    if not isinstance(tags, tag_store):
+        tags = tag_store(dict(), tagfile._encoding_errors)
+        tags.extend(tagfile.tags)
+
+    source = tagfile._source
+    (size, mtime) = (-1, -1)
+    if source is not None:
+        (size, mtime) = _source_stamp(source)
+        if size != tagfile._source_offset:
+            # the tag file has changed since it was parsed, the snapshot is out of date already
+            (size, mtime) = (-1, -1)
+
+    headers = list()
+    missing = array('b')
+    for field in _HEADER_FIELDS_:
+        value = getattr(tagfile, field)
+        missing.append(value is None)
+        if value is None:
+            value = ''
+        headers.append(str(value))
+
+    # one temporary file per process, so processes saving the same snapshot don't write into each other's
+    tmp = filename + '.' + str(os.getpid()) + '.tmp'
+    try:
+        f = open(tmp, 'wb')
+        try:
+            f.write(_MAGIC_)
+            f.write(_platform())
+            _write_chunk(f, (source or '').encode('utf-8'))
+            f.write(struct.pack('<qq', size, mtime))
+            _write_chunk(f, tagfile._source_tail or b'')
+            _write_chunk(f, tags._errors.encode('utf-8'))
+
+            _write_strings(f, headers)
+            _write_chunk(f, missing.tobytes())
+
+            _write_strings(f, tags.files)
+            _write_strings(f, tags.kinds)
+            _write_chunk(f, tags.file_ids.tobytes())
+            _write_chunk(f, tags.line_numbers.tobytes())
+            _write_chunk(f, tags.kind_ids.tobytes())
+            _write_column(f, tags.names)
+            _write_column(f, tags.patterns)
+            _write_column(f, tags.extension_text)
+        finally:
+            f.close()
+
+        getattr(os, 'replace', os.rename)(tmp, filename)
+    except:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def load_snapshot(filename, source=None):
+    """
+    Reads a snapshot written by save_snapshot().
+    @param filename: snapshot file
+    @type filename: str
+    @param source: tag file the snapshot has to match, default is the one it was saved from
+    @type source: str
+    @returns: a columnar ctags_file, or None if the tag file has changed since the snapshot was made
+    @rtype: ctags_file
+    @raise ValueError: the file isn't a snapshot or is damaged
+    """
+    f = open(filename, 'rb')
+    try:
+        data = f.read()
+    finally:
+        f.close()
+
+    if data[:len(_MAGIC_)] != _MAGIC_:
+        raise ValueError(filename + " is not a pyctags snapshot.")
+
+    reader = _snapshot_reader(data)
+    reader.pos = len(_MAGIC_)
+    if reader.unpack('<2s')[0] != _platform():
+        # written on a machine with different native arrays
+        return None
+
+    saved_source = reader.chunk().decode('utf-8') or None
+    (size, mtime) = reader.unpack('<qq')
+    tail = reader.chunk()
+    errors = reader.chunk().decode('utf-8')
+
+    if source is None:
+        source = saved_source
+    if source is not None:
+        if size < 0 or not os.path.exists(source) or _source_stamp(source) != (size, mtime):
+            return None
+
+    tagfile = ctags_file()
+
+    headers = reader.strings()
+    missing = reader.array('b')
+    for (field, value, is_missing) in zip(_HEADER_FIELDS_, headers, missing):
+        if is_missing:
+            value = None
+        elif field in _INT_HEADER_FIELDS_:
+            value = int(value)
+        setattr(tagfile, field, value)
+
+    files = reader.strings()
+    kinds = reader.strings()
+    file_ids = reader.array('l')
+    line_numbers = reader.array('l')
+    kind_ids = reader.array('l')
+    names = reader.column()
+    patterns = reader.column()
+    extension_text = reader.column()
+
+    tagfile.tags = tag_store._from_columns(tagfile._strings, errors, files, kinds, names, file_ids, line_numbers, kind_ids, patterns, extension_text)
+
+    if source is not None:
+        # refresh() carries on from the end of the snapshot
+        tagfile._source = source
+        tagfile._source_offset = size
+        tagfile._source_tail = tail or None
+
+    return tagfile
+
+def cached_ctags_file(tags, snapshot, **kwargs):
+    """
+    Loads a tag file from its snapshot if the snapshot is up to date, otherwise parses it in columnar mode and saves a new snapshot.
+        - B{Keyword Arguments:}
+            - B{harvesters:} (list) harvesters to run over the tags, whether they were parsed or loaded
+            - B{jobs:} (int) number of worker processes used if the tag file has to be parsed
+    @param tags: tag file name
+    @type tags: str
+    @param snapshot: snapshot file name
+    @type snapshot: str
+    @returns: columnar ctags_file
+    @rtype: ctags_file
+    """
+    valid_kwargs = ['harvesters', 'jobs']
+    validator.validate(kwargs.keys(), valid_kwargs)
+
+    tagfile = None
+    if os.path.exists(snapshot):
+        try:
+            tagfile = load_snapshot(snapshot, tags)
+        except ValueError:
+            tagfile = None
+
+    if tagfile is None:
+        tagfile = ctags_file(tags, columnar=True, **kwargs)
+        save_snapshot(tagfile, snapshot)
+    elif kwargs.get('harvesters') and len(tagfile.tags):
+        tagfile.harvest(kwargs['harvesters'])
+
+    return tagfile
@@ -0,0 +1,715 @@
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not, 
+##    see <http://www.gnu.org/licenses/>.
+
+"""
+Storage for tag data.
+
+A tag_store keeps tags as parallel arrays instead of a list of ctags_entry objects.  Entries are only built when the store is indexed or iterated, and names, patterns and extension fields are kept as undecoded UTF-8 until they're read.
+
+A tag_partitions keeps a list of ctags_entry objects per source file, so the tags of one file can be replaced without touching the others.
+"""
+
+from array import array
+from bisect import bisect_right
+try:
+    # do relative imports for tests
+    # try this first in case pyctags is already installed, since we want to be testing the source bundled in the distribution
+    from tag_entry import ctags_entry, extension_fields, _find_extension, _format_extensions, _format_line, _COMMENT_BEGIN_
+except ImportError:
+    from pyctags.tag_entry import ctags_entry, extension_fields, _find_extension, _format_extensions, _format_line, _COMMENT_BEGIN_
+
+_BLOCK_SIZE_ = 1024
+
+_RAW_COMMENT_BEGIN_ = _COMMENT_BEGIN_.encode("utf-8")
+
+class _text_column(object):
+    """
+    Append-only sequence of strings packed into large blocks.
+    
+    Every _BLOCK_SIZE_ strings are joined into one block, so the column holds a handful of large strings and an array of offsets rather than one string object per tag.
+    """
+    __slots__ = ('_blocks', '_starts', '_offsets', '_committed', '_pending', '_pending_len')
+
+    def __init__(self):
+        self._blocks = list()
+        """ Joined blocks of strings."""
+        self._starts = list()
+        """ Index of the first string in each block."""
+        self._offsets = array('I')
+        """ Start of each string, relative to its block."""
+        self._committed = 0
+        """ Number of strings held in self._blocks."""
+        self._pending = list()
+        """ Strings in the block being filled."""
+        self._pending_len = 0
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def _flush(self):
+        """ Joins the pending strings into a block."""
+        if self._pending:
+            self._blocks.append(self._pending[0][:0].join(self._pending))
+            self._starts.append(self._committed)
+            self._committed += len(self._pending)
+            self._pending = list()
+            self._pending_len = 0
+
+    def append(self, s):
+        self._offsets.append(self._pending_len)
+        self._pending.append(s)
+        self._pending_len += len(s)
+        if len(self._pending) == _BLOCK_SIZE_:
+            self._flush()
+
+    def extend_column(self, other):
+        """
+        Appends every string from another column, taking over its blocks instead of copying strings one at a time.
+        @param other: column to copy
+        @type other: _text_column
+        """
+        self._flush()
+        for (start, block) in zip(other._starts, other._blocks):
+            self._starts.append(self._committed + start)
+            self._blocks.append(block)
+        # the offsets of other's pending strings are relative to its pending block, which is copied as is
+        self._offsets.extend(other._offsets)
+        self._committed += other._committed
+        self._pending = list(other._pending)
+        self._pending_len = other._pending_len
+
+    def _dump(self):
+        """
+        @returns: (index of the first string in each block, string offsets, blocks), including the block being filled
+        @rtype: tuple
+        """
+        starts = array('l', self._starts)
+        blocks = list(self._blocks)
+        if self._pending:
+            starts.append(self._committed)
+            blocks.append(self._pending[0][:0].join(self._pending))
+        return (starts, self._offsets, blocks)
+
+    @classmethod
+    def _load(cls, starts, offsets, blocks):
+        """
+        Builds a column from the output of _dump().
+        """
+        column = cls()
+        column._starts = list(starts)
+        column._offsets = offsets
+        column._blocks = blocks
+        column._committed = len(offsets)
+        return column
+
+    def __getitem__(self, i):
+        if i >= self._committed:
+            return self._pending[i - self._committed]
+        b = bisect_right(self._starts, i) - 1
+        block = self._blocks[b]
+        if b + 1 < len(self._starts):
+            next_start = self._starts[b + 1]
+        else:
+            next_start = self._committed
+        if i + 1 == next_start:
+            return block[self._offsets[i]:]
+        return block[self._offsets[i]:self._offsets[i + 1]]
+
+class tag_store_view(object):
+    """
+    Sequence of entries selected from a tag_store by index.
+    
+    Harvesters fed from a tag_store use these to group tags by integer index instead of holding ctags_entry references.
+    """
+    __slots__ = ('store', 'indices')
+
+    def __init__(self, store, indices=None):
+        """
+        @param store: tag store the indices refer to
+        @type store: tag_store
+        @param indices: indices of entries in store
+        @type indices: array
+        """
+        self.store = store
+        """ The tag_store holding the data."""
+        if indices is None:
+            indices = array('l')
+        self.indices = indices
+        """ Indices into self.store."""
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        if type(i) is slice:
+            return [self.store[x] for x in self.indices[i]]
+        return self.store[self.indices[i]]
+
+    def __iter__(self):
+        store = self.store
+        for i in self.indices:
+            yield store[i]
+
+    def append_index(self, index):
+        """
+        Adds a tag to the view.
+        @param index: index of the tag in self.store
+        @type index: int
+        """
+        self.indices.append(index)
+
+class tag_store(object):
+    """
+    Keeps tags as parallel columns: names, file ids, line numbers, kind ids, patterns and raw extension text.
+    
+    Indexing or iterating over a tag_store builds ctags_entry instances on demand, so it can stand in for the ctags_file.tags list.
+    Names, patterns and extension text are stored as UTF-8 bytes and decoded when they're read; file names and kinds are decoded once each.
+    """
+    def __init__(self, strings=None, errors='strict'):
+        """
+        @param strings: intern table shared with the owning ctags_file
+        @type strings: dict
+        @param errors: error handler for invalid UTF-8, as for bytes.decode()
+        @type errors: str
+        """
+        if strings is None:
+            strings = dict()
+        self._strings = strings
+        self._errors = errors
+        
+        self.files = list()
+        """ Source file names, indexed by file id."""
+        self.kinds = list()
+        """ Tag kinds, indexed by kind id."""
+        
+        self._file_ids = dict()
+        self._kind_ids = dict()
+        self._raw_file_ids = dict()
+        self._raw_kind_ids = dict()
+        
+        self.names = _text_column()
+        """ Tag names, as UTF-8."""
+        self.file_ids = array('l')
+        """ Index into self.files for each tag."""
+        self.line_numbers = array('l')
+        """ Line number of each tag, 0 if it has none."""
+        self.kind_ids = array('l')
+        """ Index into self.kinds for each tag, -1 if it has no kind."""
+        self.patterns = _text_column()
+        """ Locator pattern of each tag as UTF-8, empty if it has none."""
+        self.extension_text = _text_column()
+        """ Raw, tab separated extension fields of each tag, as UTF-8."""
+
+    def __len__(self):
+        return len(self.file_ids)
+
+    @classmethod
+    def _from_columns(cls, strings, errors, files, kinds, names, file_ids, line_numbers, kind_ids, patterns, extension_text):
+        """
+        Builds a store around existing columns, as read back from a snapshot.
+        @param strings: intern table shared with the owning ctags_file
+        @type strings: dict
+        """
+        store = cls(strings, errors)
+        for f in files:
+            store._file_id(f)
+        for k in kinds:
+            store._kind_id(k)
+        store.names = names
+        store.file_ids = file_ids
+        store.line_numbers = line_numbers
+        store.kind_ids = kind_ids
+        store.patterns = patterns
+        store.extension_text = extension_text
+        return store
+
+    def _file_id(self, file):
+        try:
+            return self._file_ids[file]
+        except KeyError:
+            file = self._strings.setdefault(file, file)
+            self._file_ids[file] = len(self.files)
+            self.files.append(file)
+            return self._file_ids[file]
+
+    def _kind_id(self, kind):
+        if kind is None:
+            return -1
+        try:
+            return self._kind_ids[kind]
+        except KeyError:
+            kind = self._strings.setdefault(kind, kind)
+            self._kind_ids[kind] = len(self.kinds)
+            self.kinds.append(kind)
+            return self._kind_ids[kind]
+
+    def _raw_file_id(self, file):
+        """ Looks up an undecoded file name, decoding it the first time it's seen."""
+        try:
+            return self._raw_file_ids[file]
+        except KeyError:
+            file_id = self._file_id(file.decode("utf-8", self._errors))
+            self._raw_file_ids[file] = file_id
+            return file_id
+
+    def _raw_kind_id(self, kind):
+        """ Looks up an undecoded kind, decoding it the first time it's seen."""
+        if kind is None:
+            return -1
+        try:
+            return self._raw_kind_ids[kind]
+        except KeyError:
+            kind_id = self._kind_id(kind.decode("utf-8", self._errors))
+            self._raw_kind_ids[kind] = kind_id
+            return kind_id
+
+    def _text(self, raw):
+        """ Decodes a value read from one of the UTF-8 columns."""
+        return raw.decode("utf-8", self._errors)
+
+    def _append_columns(self, name, file_id, pattern, line_number, kind_id, ext):
+        self.names.append(name)
+        self.file_ids.append(file_id)
+        self.line_numbers.append(line_number or 0)
+        self.kind_ids.append(kind_id)
+        self.patterns.append(pattern or b'')
+        self.extension_text.append(ext)
+        return len(self.file_ids) - 1
+
+    def append(self, entry):
+        """
+        Adds a tag to the end of the store.
+        @param entry: tag to add
+        @type entry: ctags_entry
+        @returns: index of the new tag
+        @rtype: int
+        """
+        ext = ''
+        kind = None
+        if entry.extensions:
+            ext = _format_extensions(entry.extensions)
+            kind = entry.extensions.get('kind')
+        pattern = entry.pattern or ''
+        return self._append_columns(entry.name.encode("utf-8"), self._file_id(entry.file), pattern.encode("utf-8"),
+            entry.line_number, self._kind_id(kind), ext.encode("utf-8"))
+
+    def extend(self, entries):
+        """
+        Adds tags to the end of the store.
+        @param entries: tags to add
+        @type entries: iterable of ctags_entry
+        """
+        for e in entries:
+            self.append(e)
+
+    def _extend_store(self, other):
+        """
+        Adds every tag from another store to the end of this one, without building entries.
+        @param other: store to copy tags from
+        @type other: tag_store
+        """
+        file_map = [self._file_id(f) for f in other.files]
+        # kind id -1 means no kind, and indexes the -1 kept at the end of kind_map
+        kind_map = [self._kind_id(k) for k in other.kinds] + [-1]
+        
+        self.names.extend_column(other.names)
+        self.patterns.extend_column(other.patterns)
+        self.extension_text.extend_column(other.extension_text)
+        self.file_ids.extend(array('l', [file_map[i] for i in other.file_ids]))
+        self.line_numbers.extend(other.line_numbers)
+        self.kind_ids.extend(array('l', [kind_map[i] for i in other.kind_ids]))
+
+    def _append_line(self, line):
+        """
+        Adds a tag straight from a tag file line, without building a ctags_entry.
+        @param line: line from a tag file
+        @type line: unicode str
+        @returns: index of the new tag
+        @rtype: int
+        @raise ValueError: the line can't be parsed
+        """
+        return self._append_raw(line.encode("utf-8"))
+
+    def _append_raw(self, line):
+        """
+        Adds a tag from an undecoded tag file line.  Only the file name and kind are decoded, the first time each is seen.
+        @param line: line from a tag file
+        @type line: bytes
+        @returns: index of the new tag
+        @rtype: int
+        @raise ValueError: the line can't be parsed
+        """
+        (name, file, the_rest) = line.strip().split(b'\t', 2)
+        
+        ext = b''
+        if the_rest.find(_RAW_COMMENT_BEGIN_) > 0:
+            (locator, junk, ext) = the_rest.rpartition(_RAW_COMMENT_BEGIN_)
+            if ext[:1] == b'\t':
+                ext = ext[1:]
+            else:
+                ext = b''
+        else:
+            locator = the_rest
+        
+        line_number = None
+        pattern = None
+        if locator.isdigit():
+            line_number = int(locator)
+        else:
+            pattern = locator
+        
+        kind = None
+        if ext:
+            # the common layouts are checked inline, this runs once per tag
+            end = ext.find(b'\t')
+            if end < 0:
+                first = ext
+            else:
+                first = ext[:end]
+            if b':' not in first:
+                kind = first
+            else:
+                kind = _find_extension(ext, 'kind')
+            if line_number is None:
+                if ext.startswith(b'line:'):
+                    start = 5
+                else:
+                    start = ext.find(b'\tline:')
+                    if start >= 0:
+                        start += 6
+                if start >= 0:
+                    end = ext.find(b'\t', start)
+                    if end < 0:
+                        end = len(ext)
+                    try:
+                        line_number = int(ext[start:end])
+                    except ValueError:
+                        raise ValueError("Extended tag 'line' found but can't be converted to integer.")
+
+        if not line_number and not pattern:
+            raise ValueError("No valid locator for this tag.")
+        
+        return self._append_columns(name, self._raw_file_id(file), pattern, line_number, self._raw_kind_id(kind), ext)
+
+    def name(self, index):
+        """
+        @returns: name of the tag at index, without building an entry
+        @rtype: unicode str
+        """
+        return self.names[index].decode("utf-8", self._errors)
+
+    def file(self, index):
+        """
+        @returns: source file of the tag at index, without building an entry
+        @rtype: unicode str
+        """
+        return self.files[self.file_ids[index]]
+
+    def kind(self, index):
+        """
+        @returns: kind of the tag at index, without building an entry
+        @rtype: unicode str or None
+        """
+        kind_id = self.kind_ids[index]
+        if kind_id < 0:
+            return None
+        return self.kinds[kind_id]
+
+    def _line(self, index):
+        """
+        @returns: the tag at index as a tag file line, without building an entry
+        @rtype: unicode str
+        """
+        return _format_line(self._text(self.names[index]), self.files[self.file_ids[index]], self._text(self.patterns[index]),
+            self.line_numbers[index], self._text(self.extension_text[index]))
+
+    def _take(self, indices):
+        """
+        Keeps only the tags at the given indices, in the order given.
+        @param indices: indices of tags to keep
+        @type indices: iterable of int
+        """
+        names = _text_column()
+        patterns = _text_column()
+        extension_text = _text_column()
+        file_ids = array('l')
+        line_numbers = array('l')
+        kind_ids = array('l')
+        for i in indices:
+            names.append(self.names[i])
+            patterns.append(self.patterns[i])
+            extension_text.append(self.extension_text[i])
+            file_ids.append(self.file_ids[i])
+            line_numbers.append(self.line_numbers[i])
+            kind_ids.append(self.kind_ids[i])
+        
+        self.names = names
+        self.patterns = patterns
+        self.extension_text = extension_text
+        self.file_ids = file_ids
+        self.line_numbers = line_numbers
+        self.kind_ids = kind_ids
+
+    def deduplicate(self):
+        """
+        Removes repeated tags, keeping the first of each.  Tags are compared by name, file, locator and raw extension text, without building entries.
+        @returns: number of tags removed
+        @rtype: int
+        """
+        seen = set()
+        keep = array('l')
+        for i in range(len(self)):
+            key = (self.names[i], self.file_ids[i], self.patterns[i], self.line_numbers[i], self.extension_text[i])
+            if key not in seen:
+                seen.add(key)
+                keep.append(i)
+        
+        removed = len(self) - len(keep)
+        if removed:
+            self._take(keep)
+        return removed
+
+    def view(self, indices=None):
+        """
+        @param indices: indices of tags in this store
+        @type indices: array
+        @returns: a lazy sequence of the selected tags
+        @rtype: tag_store_view
+        """
+        return tag_store_view(self, indices)
+
+    def group_by_kind(self):
+        """
+        Groups tags by their kind id, without building entries.
+        @returns: kind as key, tag_store_view of the tags with that kind as value
+        @rtype: dict
+        """
+        groups = dict()
+        kinds = self.kinds
+        for (i, kind_id) in enumerate(self.kind_ids):
+            if kind_id >= 0:
+                kind = kinds[kind_id]
+                if kind not in groups:
+                    groups[kind] = self.view()
+                groups[kind].indices.append(i)
+        return groups
+
+    def group_by_file(self):
+        """
+        Groups tags by their file id, without building entries.
+        @returns: file name as key, tag_store_view of the tags in that file as value
+        @rtype: dict
+        """
+        groups = dict()
+        files = self.files
+        for (i, file_id) in enumerate(self.file_ids):
+            file = files[file_id]
+            if file not in groups:
+                groups[file] = self.view()
+            groups[file].indices.append(i)
+        return groups
+
+    def __getitem__(self, index):
+        if type(index) is slice:
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("tag_store index out of range")
+        
+        # entries from the store decode their extension fields lazily
+        extensions = self.extension_text[index]
+        if extensions:
+            extensions = self._text(extensions)
+        else:
+            extensions = extension_fields()
+        
+        return ctags_entry._from_fields(self._text(self.names[index]), self.files[self.file_ids[index]], 
+            self._text(self.patterns[index]) or None, self.line_numbers[index] or None, extensions)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+class tag_partitions(object):
+    """
+    Sequence of ctags_entry objects grouped by source file.
+    
+    Tags iterate in the order their files were first added, and in the order they were added within each file.  Removing or replacing the tags of a file takes time proportional to that file's tags, rather than to all tags.
+    """
+    def __init__(self):
+        self._files = dict()
+        """ Source file name as key, list of its ctags_entry as value."""
+        self._order = list()
+        """ Source files in the order they were added, may still hold removed files."""
+        self._ordered = set()
+        """ Files in self._order."""
+        self._len = 0
+        self._starts = None
+        """ (index of each file's first tag, file), built when tags are looked up by index."""
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        files = self._files
+        for file in self._order:
+            if file in files:
+                for entry in files[file]:
+                    yield entry
+
+    def __getitem__(self, index):
+        if type(index) is slice:
+            return list(self)[index]
+        if index < 0:
+            index += self._len
+        if index < 0 or index >= self._len:
+            raise IndexError("tag_partitions index out of range")
+        
+        if self._starts is None:
+            starts = list()
+            files = list()
+            start = 0
+            for file in self._order:
+                if file not in self._files:
+                    continue
+                starts.append(start)
+                files.append(file)
+                start += len(self._files[file])
+            self._starts = (starts, files)
+        (starts, files) = self._starts
+        i = bisect_right(starts, index) - 1
+        return self._files[files[i]][index - starts[i]]
+
+    def _add_file(self, file):
+        """
+        Starts an empty tag list for a file.
+        A file that was removed gets its old place back, unless remove_file() has compacted the order since, in which case it goes at the end.
+        """
+        self._files[file] = list()
+        if file not in self._ordered:
+            self._ordered.add(file)
+            self._order.append(file)
+        return self._files[file]
+
+    def _compact(self):
+        """ Drops removed files from self._order, so they lose their places."""
+        self._order = [f for f in self._order if f in self._files]
+        self._ordered = set(self._order)
+
+    def append(self, entry):
+        """
+        Adds a tag to the end of its file's tags.
+        @param entry: tag to add
+        @type entry: ctags_entry
+        """
+        try:
+            self._files[entry.file].append(entry)
+        except KeyError:
+            self._add_file(entry.file).append(entry)
+        self._len += 1
+        self._starts = None
+
+    def extend(self, entries):
+        """
+        Adds tags to the end of their files' tags.
+        @param entries: tags to add
+        @type entries: iterable of ctags_entry
+        """
+        for e in entries:
+            self.append(e)
+
+    def files(self):
+        """
+        @returns: source files that have tags, in the order they were added
+        @rtype: list
+        """
+        return [f for f in self._order if f in self._files]
+
+    def file_tags(self, file):
+        """
+        @param file: source file name, as it appears in the tags
+        @type file: str
+        @returns: tags of a source file
+        @rtype: list
+        """
+        return list(self._files.get(file, ()))
+
+    def remove_file(self, file):
+        """
+        Removes every tag of a source file.
+        @param file: source file name, as it appears in the tags
+        @type file: str
+        @returns: number of tags removed
+        @rtype: int
+        """
+        entries = self._files.pop(file, None)
+        if not entries:
+            return 0
+        self._len -= len(entries)
+        self._starts = None
+        if len(self._order) > 2 * len(self._files) + 16:
+            # don't let removed files pile up in the order
+            self._compact()
+        return len(entries)
+
+    def replace_file(self, file, entries):
+        """
+        Replaces every tag of a source file, keeping the file's place in the order.  With no new tags the file is removed.
+        @param file: source file name, as it appears in the tags
+        @type file: str
+        @param entries: new tags for the file
+        @type entries: iterable of ctags_entry
+        @returns: number of tags removed
+        @rtype: int
+        """
+        entries = list(entries)
+        own = [e for e in entries if e.file == file]
+        if not own:
+            # a file without tags isn't kept, the same as after remove_file()
+            removed = self.remove_file(file)
+        else:
+            removed = len(self._files.get(file, ()))
+            self._len += len(own) - removed
+            self._starts = None
+            self._add_file(file).extend(own)
+        for e in entries:
+            if e.file != file:
+                self.append(e)
+        return removed
+
+    def deduplicate(self):
+        """
+        Removes repeated tags, keeping the first of each.  Repeated tags always share a source file, so each file is checked on its own.
+        @returns: number of tags removed
+        @rtype: int
+        """
+        removed = 0
+        for (file, entries) in list(self._files.items()):
+            seen = set()
+            unique = list()
+            for tag in entries:
+                if tag not in seen:
+                    seen.add(tag)
+                    unique.append(tag)
+            if len(unique) != len(entries):
+                removed += len(entries) - len(unique)
+                self._files[file] = unique
+        self._len -= removed
+        self._starts = None
+        return removed
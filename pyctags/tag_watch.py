@@ -0,0 +1,538 @@
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not,
+##    see <http://www.gnu.org/licenses/>.
+
+"""
+Keeps tags up to date while source files are edited.
+
+A L{tag_watcher} tags a source tree once and then watches it.  On Linux it's told about changes by inotify, elsewhere it polls the directories.  Bursts of changes, such as an editor saving through a temporary file, are collected until the tree has been quiet for a moment.  Then ctags runs once on the files that were touched.  Their tags are swapped into the watched ctags_file, and taken out of and fed to the harvesters, so lookups see fresh tags without the rest of the tree being tagged again.
+"""
+
+import os, sys, time, threading, struct, select
+try:
+    import ctypes, ctypes.util
+except ImportError:
+    ctypes = None
+
+try:
+    # do relative imports for tests
+    # try this first in case pyctags is already installed, since we want to be testing the source bundled in the distribution
+    from kwargs_validator import the_validator as validator
+    from tag_file import ctags_file
+    from tag_entry import ctags_entry
+    from tag_store import tag_store, tag_partitions
+    from harvesters import _supports
+    from source_files import _make_scanner, _walk, _WORKERS_
+    from tag_manifest import _as_given
+except ImportError:
+    from pyctags.kwargs_validator import the_validator as validator
+    from pyctags.tag_file import ctags_file
+    from pyctags.tag_entry import ctags_entry
+    from pyctags.tag_store import tag_store, tag_partitions
+    from pyctags.harvesters import _supports
+    from pyctags.source_files import _make_scanner, _walk, _WORKERS_
+    from pyctags.tag_manifest import _as_given
+
+_IN_MODIFY_ = 0x2
+_IN_CLOSE_WRITE_ = 0x8
+_IN_MOVED_FROM_ = 0x40
+_IN_MOVED_TO_ = 0x80
+_IN_CREATE_ = 0x100
+_IN_DELETE_ = 0x200
+_IN_DELETE_SELF_ = 0x400
+_IN_MOVE_SELF_ = 0x800
+_IN_Q_OVERFLOW_ = 0x4000
+_IN_IGNORED_ = 0x8000
+_IN_CLOEXEC_ = 0o2000000
+
+_WATCH_MASK_ = _IN_MODIFY_ | _IN_CLOSE_WRITE_ | _IN_MOVED_FROM_ | _IN_MOVED_TO_ | _IN_CREATE_ | _IN_DELETE_ | _IN_DELETE_SELF_ | _IN_MOVE_SELF_
+""" Events that can change which files a directory holds or what's in them."""
+
+_EVENT_HEADER_ = struct.Struct('iIII')
+""" struct inotify_event without its name: watch descriptor, mask, cookie, name length."""
+
+_EVENT_BUFFER_ = 64 * 1024
+
+_STOP_CHECK_ = 0.5
+""" Seconds the watching thread waits for events before checking if it's been stopped."""
+
+class _inotify:
+    """
+    Watches directories with Linux inotify, called through ctypes.
+    """
+    def __init__(self):
+        """
+        @raise OSError: inotify isn't available
+        """
+        if ctypes is None or not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux.")
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("The C library has no inotify.")
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._libc = libc
+        self.fd = libc.inotify_init1(_IN_CLOEXEC_)
+        if self.fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e))
+        self.dirs = dict()
+        """ Watch descriptor as key, directory as value."""
+
+    def add(self, path):
+        """
+        Starts watching a directory.
+        @raise OSError: the directory can't be watched, for instance because the user's watch limit is reached
+        """
+        if isinstance(path, bytes):
+            name = path
+        else:
+            name = path.encode(sys.getfilesystemencoding())
+        wd = self._libc.inotify_add_watch(self.fd, name, _WATCH_MASK_)
+        if wd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e), path)
+        self.dirs[wd] = path
+
+    def read(self, timeout):
+        """
+        Waits for events.
+        @param timeout: most seconds to wait
+        @type timeout: float
+        @returns: directories with changes, empty if there were none, None if the kernel dropped events and every directory has to be checked
+        @rtype: set
+        """
+        (ready, w, x) = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, _EVENT_BUFFER_)
+        touched = set()
+        pos = 0
+        while pos + _EVENT_HEADER_.size <= len(data):
+            (wd, mask, cookie, length) = _EVENT_HEADER_.unpack_from(data, pos)
+            pos += _EVENT_HEADER_.size + length
+            if mask & _IN_Q_OVERFLOW_:
+                return None
+            path = self.dirs.get(wd)
+            if mask & _IN_IGNORED_:
+                # the directory is gone, or was moved out of the tree
+                self.dirs.pop(wd, None)
+            if path is not None:
+                touched.add(path)
+        return touched
+
+    def close(self):
+        os.close(self.fd)
+
+def _stamp(path):
+    """
+    @returns: (size, modification time in nanoseconds) of a file, None if it's gone
+    @rtype: tuple
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    mtime = getattr(st, 'st_mtime_ns', None)
+    if mtime is None:
+        mtime = int(st.st_mtime * 1000000000)
+    return (st.st_size, mtime)
+
+class tag_watcher:
+    """
+    Keeps the tags of a source tree up to date as files are saved, added and deleted.
+    
+    Updates happen on a thread of their own.  Hold L{lock} while reading the tags or harvester data, so an update isn't applied half way through a lookup.
+    """
+    def __init__(self, ctags, roots, **kwargs):
+        """
+        Sets up watching.  Nothing is tagged or watched until L{start} is called.
+            - B{Keyword Arguments:}
+                - B{tagfile:} (ctags_file) tags to keep up to date.  If it has tags, they're taken to match the tree as it is, and the harvesters to have been fed them.  Default is a new partitioned ctags_file, tagged from scratch by start().
+                - B{harvesters:} (list) harvesters to keep up to date along with the tags, they need to support L{remove<harvesters.base_harvester.remove>}
+                - B{generator_options:} (dict) options to pass to ctags
+                - B{jobs:} (int) number of ctags processes for the first tagging of the tree, default 1
+                - B{extensions:} (sequence) extensions, file names and globs of the files to tag, default is the ctags wrapper's language maps
+                - B{exclude:} (sequence) glob patterns for files and directories to skip, as for L{find_sources<source_files.find_sources>}
+                - B{gitignore:} (bool) follow the .gitignore files in the tree, default False
+                - B{workers:} (int) number of threads scanning directories, default 8
+                - B{debounce:} (float) seconds without new changes before the touched files are tagged, default 0.1
+                - B{max_delay:} (float) most seconds a steady stream of changes is collected before its files are tagged, default 0.5
+                - B{poll_interval:} (float) seconds between checks of the tree when polling, default 0.5
+                - B{polling:} (bool) poll even where inotify is available, default False
+                - B{on_update:} (callable) called with the lists of files (changed, removed) after their tags are updated, from the thread doing the update
+        @param ctags: ctags program wrapper, only used by the watcher once it's started
+        @type ctags: exuberant_ctags
+        @param roots: directory or list of directories to watch
+        @type roots: str or sequence
+        @raise ValueError: the tag file uses columnar storage, a harvester doesn't support remove(), or the ctags wrapper hasn't found out its language maps
+        """
+        valid_kwargs = ['tagfile', 'harvesters', 'generator_options', 'jobs', 'extensions', 'exclude', 'gitignore', 'workers',
+            'debounce', 'max_delay', 'poll_interval', 'polling', 'on_update']
+        validator.validate(kwargs.keys(), valid_kwargs)
+
+        if isinstance(roots, str):
+            roots = [roots]
+        self.roots = list(roots)
+        """ Directories watched."""
+
+        self.ctags = ctags
+        self.tagfile = kwargs.get('tagfile')
+        """ The ctags_file kept up to date."""
+        if self.tagfile is None:
+            self.tagfile = ctags_file(partitioned=True)
+        if isinstance(self.tagfile.tags, tag_store):
+            raise ValueError("Columnar tags can't be updated in place, use a partitioned ctags_file.")
+
+        self.harvesters = kwargs.get('harvesters', list())
+        for h in self.harvesters:
+            if not _supports(h, 'remove'):
+                raise ValueError(h.__class__.__name__ + " can't remove tags, so it can't be kept up to date.")
+        self.generator_options = kwargs.get('generator_options', dict())
+        self.debounce = kwargs.get('debounce', 0.1)
+        self.max_delay = kwargs.get('max_delay', 0.5)
+        self.poll_interval = kwargs.get('poll_interval', 0.5)
+        self.on_update = kwargs.get('on_update')
+        self._jobs = kwargs.get('jobs', 1)
+        self._workers = kwargs.get('workers', _WORKERS_)
+        self._polling = kwargs.get('polling', False)
+
+        scan_options = dict()
+        for k in ['extensions', 'exclude', 'gitignore']:
+            if k in kwargs:
+                scan_options[k] = kwargs[k]
+        if 'extensions' not in scan_options:
+            scan_options['ctags'] = ctags
+        self._scanner = _make_scanner(scan_options)
+
+        self.lock = threading.RLock()
+        """ Held while tags and harvesters are updated."""
+
+        self.mode = None
+        """ 'inotify' or 'poll' once started."""
+
+        self.errors = list()
+        """ Exceptions raised while updating on the watching thread.  Files ctags failed on are tried again when they next change."""
+
+        self._update_lock = threading.Lock()
+        self._dirs = dict()
+        """ Directory as key, (path relative to its root, .gitignore rules from its parents) as value."""
+        self._dir_files = dict()
+        """ Directory as key, set of its source files as value."""
+        self._children = dict()
+        """ Directory as key, set of its subdirectories as value."""
+        self._stamps = dict()
+        """ Source file as key, (size, modification time) when it was last tagged as value."""
+
+        self._inotify = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self._built = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def _watch(self, path):
+        """ Starts watching a directory, falling back to polling if inotify can't take more watches."""
+        if self._inotify is None:
+            return
+        try:
+            self._inotify.add(path)
+        except OSError:
+            self._inotify.close()
+            self._inotify = None
+            self.mode = 'poll'
+
+    def _add_dirs(self, scanned):
+        """
+        Records and watches directories scanned by _walk().
+        @returns: source files in the directories
+        @rtype: list
+        """
+        files = list()
+        for ((path, rel, rules), dir_files, subdirs) in scanned:
+            self._dirs[path] = (rel, rules)
+            self._dir_files[path] = set(dir_files)
+            self._children[path] = set([d[0] for d in subdirs])
+            self._watch(path)
+            for f in dir_files:
+                stamp = _stamp(f)
+                if stamp is not None:
+                    self._stamps[f] = stamp
+                    files.append(f)
+        return files
+
+    def _drop_dir(self, path):
+        """
+        Forgets a directory that's gone, and everything under it.
+        @returns: source files that were in it
+        @rtype: list
+        """
+        if path not in self._dirs:
+            return list()
+        del self._dirs[path]
+        files = list(self._dir_files.pop(path))
+        for f in files:
+            self._stamps.pop(f, None)
+        for child in self._children.pop(path):
+            files.extend(self._drop_dir(child))
+        return files
+
+    def _build(self):
+        """ Scans the tree and starts watching it, tagging it if the tag file has no tags yet."""
+        dirs = list()
+        for root in self.roots:
+            if not os.path.isdir(root):
+                raise ValueError("Can't watch " + root + ", it isn't a directory.")
+            dirs.append((root, '', list()))
+        scanned = list()
+        _walk(self._scanner, dirs, self._workers, scanned)
+        files = sorted(self._add_dirs(scanned))
+
+        if not len(self.tagfile.tags) and files:
+            lines = self._generate(files, self._jobs)
+            self.tagfile.feed_init(harvesters=self.harvesters, partitioned=isinstance(self.tagfile.tags, tag_partitions),
+                lazy_extensions=self.tagfile._lazy_extensions, encoding_errors=self.tagfile._encoding_errors)
+            for line in lines:
+                self.tagfile.feed_line(line)
+            self.tagfile.feed_finish()
+        self._built = True
+
+    def _generate(self, files, jobs=1):
+        """
+        Runs ctags on some files, leaving the wrapper's own file list alone.
+        Tags are named after the files as they were scanned, so they're found again when the files change or go.
+        """
+        file_list = self.ctags._file_list
+        try:
+            lines = self.ctags.generate_tags(files=files, generator_options=self.generator_options, jobs=jobs)
+        finally:
+            self.ctags._file_list = file_list
+        return list(_as_given(lines, files))
+
+    def _changes(self, dirs):
+        """
+        Rescans directories, one level deep, for source files that were added, changed or removed.  New subdirectories are scanned and watched.
+        @param dirs: directories to rescan
+        @type dirs: iterable
+        @returns: (files added or changed, files removed)
+        @rtype: tuple
+        """
+        changed = list()
+        removed = list()
+        fresh = list()
+        for d in dirs:
+            if d not in self._dirs:
+                # dropped along with a parent, or no longer part of the tree
+                continue
+            (rel, rules) = self._dirs[d]
+            (files, subdirs) = self._scanner.scan(d, rel, rules)
+
+            current = set()
+            for f in files:
+                stamp = _stamp(f)
+                if stamp is None:
+                    continue
+                current.add(f)
+                if self._stamps.get(f) != stamp:
+                    self._stamps[f] = stamp
+                    changed.append(f)
+            for f in self._dir_files[d] - current:
+                self._stamps.pop(f, None)
+                removed.append(f)
+            self._dir_files[d] = current
+
+            present = set()
+            for sub in subdirs:
+                present.add(sub[0])
+                if sub[0] in self._dirs:
+                    # a .gitignore here may have changed
+                    self._dirs[sub[0]] = (sub[1], sub[2])
+                else:
+                    fresh.append(sub)
+            for gone in self._children[d] - present:
+                removed.extend(self._drop_dir(gone))
+            self._children[d] = present
+
+        if fresh:
+            scanned = list()
+            _walk(self._scanner, fresh, self._workers, scanned)
+            changed.extend(self._add_dirs(scanned))
+            # files written while the new directories were scanned, before they were watched
+            (more_changed, more_removed) = self._changes([d[0][0] for d in scanned])
+            changed.extend([f for f in more_changed if f not in changed])
+            removed.extend(more_removed)
+
+        return (sorted(changed), sorted(removed))
+
+    def _retag(self, changed, removed):
+        """
+        Runs ctags on changed files and swaps their tags into the tag file and harvesters.  Tags of removed files are dropped.
+        @raise ValueError: ctags failed, the changed files are tried again when they next change
+        """
+        by_file = dict()
+        failure = None
+        if changed:
+            try:
+                lines = self._generate(changed)
+            except ValueError:
+                failure = sys.exc_info()[1]
+                for f in changed:
+                    self._stamps.pop(f, None)
+                lines = list()
+                changed = list()
+            for f in changed:
+                by_file[f] = list()
+            tagfile = self.tagfile
+            for line in lines:
+                entry = ctags_entry._from_line(line, tagfile._strings, tagfile._lazy_extensions)
+                by_file.setdefault(entry.file, list()).append(entry)
+
+        self.lock.acquire()
+        try:
+            for f in removed + list(by_file.keys()):
+                old = self.tagfile.file_tags(f)
+                for h in self.harvesters:
+                    for entry in old:
+                        h.remove(entry)
+            for f in removed:
+                self.tagfile.remove_file(f)
+            for (f, entries) in by_file.items():
+                self.tagfile.replace_file(f, entries)
+                for h in self.harvesters:
+                    for entry in entries:
+                        h.feed(entry)
+            for h in self.harvesters:
+                h.do_after()
+        finally:
+            self.lock.release()
+
+        if failure is not None:
+            raise failure
+        if self.on_update is not None:
+            self.on_update(changed, removed)
+
+    def _update(self, dirs=None):
+        """
+        Brings the tags up to date with some directories, or every directory.
+        @returns: (files added or changed, files removed)
+        @rtype: tuple
+        """
+        self._update_lock.acquire()
+        try:
+            if dirs is None:
+                dirs = list(self._dirs.keys())
+            (changed, removed) = self._changes(dirs)
+            if changed or removed:
+                self._retag(changed, removed)
+            return (changed, removed)
+        finally:
+            self._update_lock.release()
+
+    def check(self):
+        """
+        Checks the whole tree for changes now, and updates the tags.  Works whether or not the watcher has been started, tagging the tree first if it hasn't been.
+        @returns: lists of files (added or changed, removed)
+        @rtype: tuple
+        @raise ValueError: ctags failed
+        """
+        if not self._built:
+            self._build()
+        return self._update()
+
+    def start(self):
+        """
+        Tags the tree if the tag file has no tags, and starts watching it on a thread.
+        @raise ValueError: a root isn't a directory, or ctags failed
+        """
+        if self._thread is not None:
+            return
+        self.mode = 'poll'
+        if not self._polling:
+            try:
+                self._inotify = _inotify()
+                self.mode = 'inotify'
+            except OSError:
+                self._inotify = None
+        if not self._built:
+            self._build()
+        else:
+            for d in self._dirs:
+                self._watch(d)
+            # anything that changed while nothing was watching
+            self._update()
+
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="pyctags watcher")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """ Stops watching.  The tags stay as they were last updated."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def _run(self):
+        """ Watching thread: collects touched directories until the tree is quiet, then updates their tags."""
+        touched = set()
+        first = last = 0
+        while not self._stopping.is_set():
+            inotify = self._inotify
+            if inotify is None:
+                if self._stopping.wait(self.poll_interval):
+                    break
+                self._guarded_update(None)
+                continue
+
+            timeout = _STOP_CHECK_
+            if touched:
+                timeout = max(0.0, min(last + self.debounce, first + self.max_delay) - time.time())
+            try:
+                events = inotify.read(timeout)
+            except (OSError, ValueError, select.error):
+                # closed by a failed watch, polling takes over
+                continue
+            now = time.time()
+            if events is None or events:
+                if not touched:
+                    first = now
+                last = now
+                if events is None:
+                    touched.update(self._dirs.keys())
+                else:
+                    touched.update(events)
+            if touched and (now >= last + self.debounce or now >= first + self.max_delay):
+                (dirs, touched) = (touched, set())
+                self._guarded_update(dirs)
+
+    def _guarded_update(self, dirs):
+        """ Updates from the watching thread, keeping errors in self.errors so watching goes on."""
+        try:
+            self._update(dirs)
+        except Exception:
+            # includes errors from harvesters and the on_update callback, which would otherwise end the thread unnoticed
+            self.errors.append(sys.exc_info()[1])
@@ -0,0 +1,323 @@
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not,
+##    see <http://www.gnu.org/licenses/>.
+
+"""
+Writes tags back out as a tag file.
+
+Sorting is done as an external merge sort: tag lines are sorted in runs of a fixed size, runs that don't fit are spilled to temporary files, and the runs are merged as the file is written.  Only one run is held in memory at a time.
+
+Tag files that are already sorted are merged the same way, streaming each file instead of sorting it again.
+"""
+
+import heapq, tempfile
+try:
+    # do relative imports for tests
+    # try this first in case pyctags is already installed, since we want to be testing the source bundled in the distribution
+    from kwargs_validator import the_validator as validator
+    from tag_store import tag_store
+    from tag_entry import _COMMENT_BEGIN_, _TEXT_TYPES_
+    from tag_compression import open_tag_file
+except ImportError:
+    from pyctags.kwargs_validator import the_validator as validator
+    from pyctags.tag_store import tag_store
+    from pyctags.tag_entry import _COMMENT_BEGIN_, _TEXT_TYPES_
+    from pyctags.tag_compression import open_tag_file
+
+_UNSORTED_ = 0
+_SORTED_ = 1
+_FOLDCASE_ = 2
+
+_RUN_SIZE_ = 200000
+""" Default number of tag lines sorted in memory at a time."""
+
+_SORT_COMMENT_ = "0=unsorted, 1=sorted, 2=foldcase"
+
+def _fold(line):
+    # same folding as ctags and ctags_lookup use for foldcase files, only ASCII letters are folded,
+    # where str.upper() would fold others too, such as u'\xdf' to 'SS'
+    if not isinstance(line, bytes):
+        line = line.encode('utf-8')
+    return line.upper()
+
+def _sort_key(sort):
+    """
+    @returns: key function for a sort type, or None to sort lines as they are
+    """
+    if sort == _FOLDCASE_:
+        return _fold
+    return None
+
+def _sort_run(lines, key):
+    """ Sorts lines in place by key, breaking ties by the lines themselves so runs merge in the same order."""
+    lines.sort()
+    if key:
+        lines.sort(key=key)
+
+def _merge_sorted(runs, key=None):
+    """
+    Merges sorted iterables of tag lines.
+    @param runs: sorted iterables of lines
+    @type runs: list
+    @param key: sort key function, None to compare lines as they are
+    @returns: merged lines
+    @rtype: generator
+    """
+    if key is None:
+        return heapq.merge(*runs)
+    return _undecorate(heapq.merge(*[_decorate(r, key) for r in runs]))
+
+def _decorate(lines, key):
+    for line in lines:
+        yield (key(line), line)
+
+def _undecorate(pairs):
+    for (k, line) in pairs:
+        yield line
+
+def _spill(lines, temp_dir):
+    """
+    Writes a sorted run to a temporary file.
+    @returns: open temporary file, positioned at its start
+    """
+    f = tempfile.TemporaryFile(dir=temp_dir)
+    f.write('\n'.join(lines).encode('utf-8'))
+    f.write(b'\n')
+    f.seek(0)
+    return f
+
+def _read_run(f):
+    """ Yields the lines of a spilled run."""
+    for raw in f:
+        yield raw.decode('utf-8').rstrip('\n')
+
+def _tag_lines(tags):
+    """
+    Yields tag file lines for a tag_store or a sequence of ctags_entry, without the newlines.
+    """
+    if isinstance(tags, tag_store):
+        for i in range(len(tags)):
+            yield tags._line(i)
+    else:
+        for entry in tags:
+            yield entry._to_line()
+
+def _header_lines(sort, header=None):
+    """
+    Formats the !_TAG_ header lines of a tag file.
+    @param sort: sort type written to !_TAG_FILE_SORTED
+    @type sort: int
+    @param header: tag file to copy the program headers from
+    @type header: ctags_file
+    @rtype: list
+    """
+    lines = ['!_TAG_FILE_FORMAT\t2\t/extended format; --format=1 will not append ;" to lines/',
+        '!_TAG_FILE_SORTED\t' + str(sort) + '\t/' + _SORT_COMMENT_ + '/']
+    if header is not None:
+        for (tag, value, comment) in [('!_TAG_PROGRAM_AUTHOR', header.author, header.author_comment),
+                ('!_TAG_PROGRAM_NAME', header.name, header.name_comment),
+                ('!_TAG_PROGRAM_URL', header.url, header.url_comment),
+                ('!_TAG_PROGRAM_VERSION', header.version, header.version_comment)]:
+            if value is not None:
+                lines.append(tag + '\t' + value + '\t/' + (comment or '') + '/')
+    return lines
+
+def _write_lines(filename, lines, sort, header):
+    """
+    Writes the headers and tag lines of a tag file.
+    @returns: number of tag lines written
+    @rtype: int
+    """
+    count = 0
+    out = open(filename, 'wb')
+    try:
+        out.write(('\n'.join(_header_lines(sort, header)) + '\n').encode('utf-8'))
+        for line in lines:
+            out.write((line + '\n').encode('utf-8'))
+            count += 1
+    finally:
+        out.close()
+    return count
+
+def write_tags(tags, filename, **kwargs):
+    """
+    Writes tags to a tag file, with headers.
+        - B{Keyword Arguments:}
+            - B{sort:} (int) 0 for unsorted, 1 for sorted, 2 for sorted ignoring case.  Default is 1.
+            - B{header:} (ctags_file) tag file to copy the !_TAG_PROGRAM_ headers from
+            - B{run_size:} (int) number of tag lines sorted in memory before a run is spilled to a temporary file
+            - B{temp_dir:} (str) directory for spilled runs, default is the system temporary directory
+    @param tags: tags to write, which can be a generator such as ctags_file.iter_entries()
+    @type tags: tag_store or iterable of ctags_entry
+    @param filename: tag file to write
+    @type filename: str
+    @returns: number of tags written
+    @rtype: int
+    @raise ValueError: unknown sort type
+    """
+    valid_kwargs = ['sort', 'header', 'run_size', 'temp_dir']
+    validator.validate(kwargs.keys(), valid_kwargs)
+
+    sort = kwargs.get('sort', _SORTED_)
+    if sort not in (_UNSORTED_, _SORTED_, _FOLDCASE_):
+        raise ValueError("Unknown sort type " + str(sort) + ".")
+    run_size = kwargs.get('run_size', _RUN_SIZE_)
+    temp_dir = kwargs.get('temp_dir', None)
+    key = _sort_key(sort)
+
+    spilled = list()
+    try:
+        if sort == _UNSORTED_:
+            lines = _tag_lines(tags)
+        else:
+            run = list()
+            for line in _tag_lines(tags):
+                run.append(line)
+                if len(run) >= run_size:
+                    _sort_run(run, key)
+                    spilled.append(_spill(run, temp_dir))
+                    run = list()
+            _sort_run(run, key)
+
+            if spilled:
+                lines = _merge_sorted([_read_run(f) for f in spilled] + [run], key)
+            else:
+                lines = run
+
+        count = _write_lines(filename, lines, sort, kwargs.get('header'))
+    finally:
+        for f in spilled:
+            f.close()
+
+    return count
+
+def _open_sorted(filename):
+    """
+    Opens a sorted tag file for merging, reading its headers.
+    @returns: (open file, sort type from the headers or None, generator of its tag lines)
+    @rtype: tuple
+    """
+    f = open_tag_file(filename)
+    sort = None
+    first = None
+    for raw in f:
+        line = raw.decode('utf-8').rstrip('\r\n')
+        if line[:1] != '!':
+            first = line
+            break
+        if line.startswith('!_TAG_FILE_SORTED\t'):
+            sort = int(line.split('\t')[1])
+    return (f, sort, _file_lines(f, first))
+
+def _file_lines(f, first):
+    """ Yields the rest of the tag lines of a file opened by _open_sorted()."""
+    if first:
+        yield first
+    for raw in f:
+        line = raw.decode('utf-8').rstrip('\r\n')
+        if line:
+            yield line
+
+def _line_identity(line):
+    """
+    @returns: (name, file, locator) of a tag line
+    @rtype: tuple
+    """
+    (name, file, the_rest) = line.split('\t', 2)
+    if the_rest.find(_COMMENT_BEGIN_) > 0:
+        the_rest = the_rest.rpartition(_COMMENT_BEGIN_)[0]
+    return (name, file, the_rest)
+
+def _unique_lines(lines, key):
+    """
+    Drops tag lines with the same name, file and locator as an earlier line.
+    
+    Sorted lines come grouped by name, so only the identities seen for the current name are kept.
+    """
+    group = None
+    seen = set()
+    for line in lines:
+        identity = _line_identity(line)
+        name = identity[0]
+        if key:
+            name = key(name)
+        if name != group:
+            group = name
+            seen = set()
+        if identity not in seen:
+            seen.add(identity)
+            yield line
+
+def merge_tags(inputs, filename, **kwargs):
+    """
+    Merges sorted tag files into one sorted tag file with a k-way merge.  Tag files are streamed, only one line from each is held in memory at a time.
+        - B{Keyword Arguments:}
+            - B{sort:} (int) 1 for sorted, 2 for sorted ignoring case.  Default is the sort type of the first tag file.
+            - B{deduplicate:} (bool) keep only the first tag with a given name, file and locator, default False
+            - B{header:} (ctags_file) tag file to copy the !_TAG_PROGRAM_ headers from, default is the first ctags_file in inputs
+    @param inputs: tag file names, which must be sorted the same way as the output and may be compressed, or ctags_file instances, which are sorted in memory
+    @type inputs: list
+    @param filename: tag file to write
+    @type filename: str
+    @returns: number of tags written
+    @rtype: int
+    @raise ValueError: a tag file isn't sorted the same way as the output
+    """
+    valid_kwargs = ['sort', 'deduplicate', 'header']
+    validator.validate(kwargs.keys(), valid_kwargs)
+
+    sort = kwargs.get('sort', None)
+    header = kwargs.get('header', None)
+
+    opened = list()
+    try:
+        sources = list()
+        for source in inputs:
+            if isinstance(source, _TEXT_TYPES_):
+                (f, file_sort, lines) = _open_sorted(source)
+                opened.append(f)
+                if sort is None:
+                    sort = file_sort
+                if file_sort != sort:
+                    raise ValueError("Tag file " + source + " is not sorted with sort type " + str(sort) + ".")
+                sources.append(lines)
+            else:
+                if header is None:
+                    header = source
+                sources.append(source)
+
+        if sort is None:
+            sort = _SORTED_
+        if sort not in (_SORTED_, _FOLDCASE_):
+            raise ValueError("Unknown sort type " + str(sort) + ".")
+        key = _sort_key(sort)
+
+        runs = list()
+        for source in sources:
+            if hasattr(source, 'tags'):
+                run = list(_tag_lines(source.tags))
+                _sort_run(run, key)
+                source = run
+            runs.append(source)
+
+        lines = _merge_sorted(runs, key)
+        if kwargs.get('deduplicate', False):
+            lines = _unique_lines(lines, key)
+        return _write_lines(filename, lines, sort, header)
+    finally:
+        for f in opened:
+            f.close()
@@ -0,0 +1,645 @@
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not, 
+##    see <http://www.gnu.org/licenses/>.
+
+"""
+Universal Ctags (U{https://ctags.io}) wrapper.
+
+Besides the classic tags format, Universal Ctags can write tags as JSON lines, or as cross reference lines with fields chosen on the command line.  Both have fixed fields, so entries are built straight from them instead of splitting tag lines on ;" and tabs, and patterns containing tabs can't be misread.  The cheapest format the installed ctags supports that keeps the fields asked for with --fields is used, unless another is asked for.  Kinds come out as letters, or as names when the K field is on, the same as in the classic format.
+
+Ctags is started from an argument list with subprocess.Popen, never through a shell, but users of this module can still run any program as the ctags executable.
+"""
+import subprocess, json, tempfile, shutil
+from copy import copy
+
+try:
+    # do relative imports for tests
+    # try this first in case pyctags is already installed, since we want to be testing the source bundled in the distribution
+    from tag_base import ctags_base, _file_list_chunks, _write_buffers
+    from kwargs_validator import the_validator as validator
+    from tag_file import ctags_file
+    from tag_entry import ctags_entry, extension_fields
+    from exuberant import _pipeline, _buffer_lines
+except ImportError:
+    from pyctags.tag_base import ctags_base, _file_list_chunks, _write_buffers
+    from pyctags.kwargs_validator import the_validator as validator
+    from pyctags import ctags_file
+    from pyctags.tag_entry import ctags_entry, extension_fields
+    from pyctags.exuberant import _pipeline, _buffer_lines
+
+_FORMAT_COSTS_ = ['xref', 'json', 'ctags']
+""" Output formats from cheapest to most expensive to parse.  Splitting a cross reference line costs about a tenth of decoding the same tag as JSON."""
+
+_XREF_FIELDS_ = '%N\t%F\t%n\t%K\t%p\t%s\t%P'
+""" Cross reference fields: name, input file, line, kind, scope kind, scope and pattern.  The pattern is last, so tabs in it are kept.  %K is swapped for %k when kinds are written as letters."""
+
+_XREF_KEEPS_ = 'NFPnkKsp'
+""" The --fields letters of the fields cross reference output keeps."""
+
+_DEFAULT_FIELDS_ = 'NFPfkst'
+""" The --fields letters of the fields Universal Ctags writes unless told otherwise."""
+
+_NO_VALUE_ = ('', '-')
+""" What an empty cross reference field is written as."""
+
+def _xref_entry(line, strings):
+    """
+    Builds an entry from a cross reference line written with the _XREF_FIELDS_ format.
+    @param line: line without its line ending
+    @type line: unicode str
+    @param strings: intern table for file names, field names and layouts
+    @type strings: dict
+    @rtype: ctags_entry
+    @raise ValueError: the line doesn't have the expected fields, or no locator
+    """
+    fields = line.split('\t', 6)
+    if len(fields) != 7:
+        raise ValueError("Unexpected cross reference line: " + line)
+    (name, file, line_number, kind, scope_kind, scope, pattern) = fields
+    intern = strings.setdefault
+
+    keys = list()
+    values = list()
+    if kind not in _NO_VALUE_:
+        keys.append('kind')
+        values.append(intern(kind, kind))
+    if line_number.isdigit():
+        line_number = int(line_number)
+        keys.append('line')
+        values.append(fields[2])
+    else:
+        line_number = None
+    if scope_kind not in _NO_VALUE_ and scope not in _NO_VALUE_:
+        keys.append(intern(scope_kind, scope_kind))
+        values.append(scope)
+    if pattern in _NO_VALUE_:
+        pattern = None
+    if pattern is None and line_number is None:
+        raise ValueError("No valid locator for this tag.")
+
+    keys = tuple(keys)
+    return ctags_entry._from_fields(name, intern(file, file), pattern, line_number, extension_fields(intern(keys, keys), tuple(values)))
+
+def _json_entry(line, strings, kind_letters=None, language=True):
+    """
+    Builds an entry from a line of JSON output.
+    The scopeKind and scope fields become one extension field as in the classic format, true flags become fields with empty values.
+    @param line: line without its line ending
+    @type line: unicode str
+    @param strings: intern table for file names, field names and layouts
+    @type strings: dict
+    @param kind_letters: language as key, dict of kind letters by kind name as value, to write kinds as letters.  JSON output names kinds, so the line needs the language field.
+    @type kind_letters: dict
+    @param language: keep the language field
+    @type language: bool
+    @returns: the entry, or None for pseudo tags
+    @rtype: ctags_entry
+    @raise ValueError: the line isn't a JSON tag, or has no locator
+    """
+    fields = json.loads(line)
+    if fields.pop('_type', 'tag') != 'tag':
+        return None
+    intern = strings.setdefault
+    try:
+        name = fields.pop('name')
+        file = fields.pop('path')
+    except KeyError:
+        raise ValueError("JSON tag without a name or path: " + line)
+    pattern = fields.pop('pattern', None)
+    if not isinstance(pattern, type(name)):
+        pattern = None
+    line_number = fields.get('line')
+    if not isinstance(line_number, int):
+        line_number = None
+    if pattern is None and line_number is None:
+        raise ValueError("No valid locator for this tag.")
+    scope_kind = fields.pop('scopeKind', None)
+    scope = fields.pop('scope', None)
+    tag_language = fields.get('language')
+    if not language:
+        fields.pop('language', None)
+
+    keys = list()
+    values = list()
+    if 'kind' in fields:
+        kind = str(fields.pop('kind'))
+        if kind_letters is not None and tag_language:
+            kind = _kind_letter(kind_letters, tag_language, kind)
+        keys.append('kind')
+        values.append(intern(kind, kind))
+    if line_number is not None:
+        del fields['line']
+        keys.append('line')
+        values.append(str(line_number))
+    if scope_kind and scope:
+        keys.append(intern(scope_kind, scope_kind))
+        values.append(scope)
+    for (k, v) in fields.items():
+        if v is False or v is None:
+            continue
+        if v is True:
+            v = ''
+        keys.append(intern(k, k))
+        values.append(str(v))
+
+    keys = tuple(keys)
+    return ctags_entry._from_fields(name, intern(file, file), pattern, line_number, extension_fields(intern(keys, keys), tuple(values)))
+
+def _enabled_fields(gen_opts):
+    """
+    Works out which fields ctags writes from the --fields option.
+    @param gen_opts: command line options
+    @type gen_opts: dict
+    @returns: field letters, fields given by long name as '{name}', '*' for all fields
+    @rtype: set
+    """
+    fields = set(_DEFAULT_FIELDS_)
+    spec = gen_opts.get('--fields')
+    if not spec:
+        return fields
+    if spec[0] not in '+-':
+        # without a leading + or -, the fields replace the defaults
+        fields = set()
+    add = True
+    i = 0
+    while i < len(spec):
+        field = spec[i]
+        if field == '{':
+            end = spec.find('}', i)
+            if end < 0:
+                end = len(spec)
+            field = spec[i:end + 1]
+            i = end
+        i += 1
+        if field == '+':
+            add = True
+        elif field == '-':
+            add = False
+        elif add:
+            fields.add(field)
+        else:
+            fields.discard(field)
+    return fields
+
+def _fits_xref(gen_opts):
+    """
+    @returns: cross reference output keeps every field ctags is asked for
+    @rtype: bool
+    """
+    for k in gen_opts:
+        if k.startswith('--fields-'):
+            # fields of a single language
+            return False
+    return _enabled_fields(gen_opts) <= set(_XREF_KEEPS_)
+
+def _kind_letter(kind_letters, language, kind):
+    """
+    @returns: the letter of a kind given by name, or kind itself if the language or kind isn't known
+    @rtype: unicode str
+    """
+    return kind_letters.get(language.lower(), dict()).get(kind, kind)
+
+def _interactive_requests(buffers):
+    """
+    Encodes buffers as --_interactive generate-tags commands, each a JSON line followed by the buffer's bytes.
+    @param buffers: (virtual path, text) pairs, text as unicode str or bytes
+    @type buffers: sequence
+    @rtype: generator of bytes
+    """
+    for (path, text) in buffers:
+        if not isinstance(text, bytes):
+            text = text.encode('utf-8')
+        command = json.dumps({'command' : 'generate-tags', 'filename' : path, 'size' : len(text)})
+        yield command.encode('utf-8') + b'\n' + text
+
+def _machinable_rows(text):
+    """
+    Splits the output of a --list-... --machinable command.
+    @returns: list of dicts, column name from the header line as key
+    @rtype: list
+    """
+    lines = [l for l in text.splitlines() if l.strip()]
+    if not lines or not lines[0].startswith('#'):
+        return list()
+    header = lines[0][1:].split('\t')
+    return [dict(zip(header, l.split('\t'))) for l in lines[1:]]
+
+class universal_ctags(ctags_base):
+    """
+    Wraps the Universal Ctags program.  U{https://ctags.io}
+    
+    The B{generate_*} methods accept custom command line parameters for universal ctags via the generator_options keyword dict, with None as the value of options that take no argument.
+    The output options are reserved for internal use and will trigger an exception.
+    """
+    __universal_id = "universal ctags"
+    __reserved_opts = ['-f', '-o', '-x', '--output-format', '--xformat', '--_xformat']
+    __default_opts = {"-L" : "-", "-f" : "-"}
+    __default_programs = ['ctags', 'universal-ctags', 'uctags']
+    _probe_fields = ['version', 'features', 'xformat_option', 'output_formats', 'language_info', 'kind_letters', 'language_extensions', 'all_extensions']
+
+    def __init__(self, *args, **kwargs):
+        """
+        Wraps the Universal Ctags program.
+            - B{Keyword Arguments:}
+                - B{tag_program:} (str) path to ctags executable, or name of a ctags program in path
+                - B{files:} (sequence) files to process with ctags
+        @raise TypeError: tag_program isn't Universal Ctags
+        """
+        valid_kwargs = ['tag_program', 'files']
+        validator.validate(kwargs.keys(), valid_kwargs)
+
+        self.version = None
+        """ Universal ctags version number."""
+        self.features = None
+        """ Optional features compiled into this ctags, such as 'json'."""
+        self.xformat_option = None
+        """ Option that sets the cross reference fields, None if it isn't supported."""
+        self.output_formats = None
+        """ Output formats this ctags can write that can be parsed, cheapest first."""
+        self.language_info = None
+        """ Universal ctags supported language parsing features. None or dict.  Language name as key, value is a dict of kind letters and descriptions."""
+        self.kind_letters = None
+        """ Kind letters by kind name.  None or dict.  Lower case language name as key, value is a dict with kind names as keys and letters as values."""
+        self.language_extensions = None
+        """ File extensions and name patterns mapped to each language parser.  None or dict.  Language name as key."""
+        self.all_extensions = None
+        """ List of files and extensions that Universal Ctags knows how to map to a parser."""
+
+        ctags_base.__init__(self, *args, **kwargs)
+
+    def __output(self, path, *args):
+        """ @returns: stdout of a ctags run that doesn't read files, decoded."""
+        p = subprocess.Popen([path] + list(args), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        (out, err) = p.communicate()
+        return out.decode("utf-8", "replace")
+
+    def _query_tag_generator(self, path):
+        """
+        Gets Universal Ctags program information.
+        @raise TypeError: Executable is not Universal Ctags.
+        """
+        try:
+            version = self.__output(path, '--version')
+        except OSError:
+            version = ''
+        if version.lower().find(self.__universal_id) < 0:
+            raise TypeError("Executable file " + path + " is not Universal Ctags")
+
+        first = version.splitlines()[0]
+        self.version = first[len(self.__universal_id):].split('(')[0].split(',')[0].strip()
+
+        self.features = list()
+        for line in version.splitlines():
+            if line.lower().startswith('optional compiled features:'):
+                self.features = [f.strip().lstrip('+') for f in line.split(':', 1)[1].split(',') if f.strip()]
+
+        # the cross reference format option lost its underscore once it stopped being experimental
+        help_text = self.__output(path, '--help')
+        self.xformat_option = None
+        for opt in ['--xformat', '--_xformat']:
+            if help_text.find(opt + '=') >= 0:
+                self.xformat_option = opt
+                break
+
+        self.output_formats = list()
+        for fmt in _FORMAT_COSTS_:
+            if (fmt == 'xref' and self.xformat_option) or (fmt == 'json' and 'json' in self.features) or fmt == 'ctags':
+                self.output_formats.append(fmt)
+
+        self.language_info = dict()
+        self.kind_letters = dict()
+        for row in _machinable_rows(self.__output(path, '--list-kinds-full', '--machinable')):
+            if 'LANGUAGE' in row and 'LETTER' in row:
+                self.language_info.setdefault(row['LANGUAGE'].lower(), dict())[row['LETTER']] = row.get('DESCRIPTION', row.get('NAME', ''))
+                if 'NAME' in row:
+                    self.kind_letters.setdefault(row['LANGUAGE'].lower(), dict())[row['NAME']] = row['LETTER']
+
+        self.language_extensions = dict()
+        for row in _machinable_rows(self.__output(path, '--list-map-extensions', '--machinable')):
+            if 'LANGUAGE' in row and 'EXTENSION' in row:
+                self.language_extensions.setdefault(row['LANGUAGE'], list()).append('.' + row['EXTENSION'])
+        for row in _machinable_rows(self.__output(path, '--list-map-patterns', '--machinable')):
+            if 'LANGUAGE' in row and 'PATTERN' in row:
+                self.language_extensions.setdefault(row['LANGUAGE'], list()).append(row['PATTERN'])
+        self.all_extensions = [y for x in self.language_extensions.values() for y in x]
+
+    def _dict_to_argv(self, gen_opts):
+        """
+        Converts from a dict with command line arguments to the argument list of a universal ctags process, starting with the executable.
+        @param gen_opts: command line arguments, key=argument, value=setting or None
+        @type gen_opts: dict
+        @rtype: list
+        """
+        argv = [self._executable_path]
+        for k, v in gen_opts.items():
+            if v is None:
+                argv.append(k)
+            elif k[0:2] == '--':
+                argv.append(k + '=' + v)
+            else:
+                argv.extend([k, v])
+        return argv
+
+    def _prepare_to_generate(self, kw):
+        """
+        Prepares parameters to be passed to universal ctags.
+        @returns: tuple (generator_options_dict, file list for stdin as a generator of bytes chunks)
+        @raise ValueError: no ctags executable, or a reserved option was passed
+        """
+        self.warnings = list()
+        gen_opts = copy(self.__default_opts)
+        if 'generator_options' in kw:
+            for opt in self.__reserved_opts:
+                if opt in kw['generator_options']:
+                    raise ValueError("The option " + opt + " is used internally.")
+            gen_opts.update(kw['generator_options'])
+
+        if 'tag_program' in kw:
+            if self.ctags_executable(kw['tag_program']):
+                self._executable_path = kw['tag_program']
+
+        if 'files' in kw:
+            self._file_list = list(kw['files'])
+
+        if not self._executable_path:
+            for program in self.__default_programs:
+                try:
+                    if self.ctags_executable(program):
+                        self._executable_path = program
+                        break
+                except TypeError:
+                    continue
+            else:
+                raise ValueError("No universal ctags executable set.")
+
+        file_list = iter([])
+        if gen_opts['-L'] == '-':
+            file_list = _file_list_chunks(self._file_list, '\n')
+        return (gen_opts, file_list)
+
+    def generate_tags(self, **kwargs):
+        """
+        Parses source files into a list of tags in the classic tags format, which ctags_file and the other pyctags tools read.
+            - B{Keyword Arguments:}
+                - B{tag_program:} (str) path to ctags executable, or name of a ctags program in path
+                - B{files:} (sequence) files to process with ctags
+                - B{generator_options:} (dict) command-line options to pass to ctags program
+        @returns: strings output by universal ctags
+        @rtype: list
+        @raise ValueError: ctags executable path not set, fails execution
+        """
+        valid_kwargs = ['tag_program', 'files', 'generator_options']
+        validator.validate(kwargs.keys(), valid_kwargs)
+
+        (gen_opts, file_list) = self._prepare_to_generate(kwargs)
+        argv = self._dict_to_argv(gen_opts)
+        self.command_line = subprocess.list2cmdline(argv)
+        p = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        messages = list()
+        results = [line.decode("utf-8") for line in _pipeline(p, file_list, messages)]
+
+        if p.returncode != 0:
+            raise ValueError("Ctags execution did not complete, return value: " + str(p.returncode) + ".\nCommand line: " + self.command_line)
+
+        self.warnings = b''.join(messages).decode("utf-8").splitlines()
+        return results
+
+    def generate_tagfile(self, output_file, **kwargs):
+        """
+        Generates a tag file in the classic tags format from a list of files.
+            - B{Keyword Arguments:}
+                - B{tag_program:} (str) path to ctags executable, or name of a ctags program in path
+                - B{files:} (sequence) files to process with ctags
+                - B{generator_options:} (dict) options to pass to ctags program
+        @param output_file: File name and location to write tagfile.
+        @type output_file: str
+        @returns: file written
+        @rtype: boolean
+        @raise ValueError: ctags executable path not set or output file isn't valid
+        """
+        valid_kwargs = ['tag_program', 'files', 'generator_options']
+        validator.validate(kwargs.keys(), valid_kwargs)
+
+        if not output_file:
+            raise ValueError("No output file set")
+
+        (gen_opts, file_list) = self._prepare_to_generate(kwargs)
+        gen_opts['-f'] = output_file
+        argv = self._dict_to_argv(gen_opts)
+        self.command_line = subprocess.list2cmdline(argv)
+        p = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        messages = list()
+        for line in _pipeline(p, file_list, messages):
+            pass
+        self.warnings = b''.join(messages).decode("utf-8").splitlines()
+        return p.returncode == 0
+
+    def __entry_builder(self, output_format, gen_opts):
+        """
+        Sets the options for an output format, so kinds come out as they would in the classic format.
+        @param gen_opts: command line options, updated
+        @type gen_opts: dict
+        @returns: function building an entry from a line of output and an intern table, None for the classic format
+        @rtype: callable
+        """
+        fields = _enabled_fields(gen_opts)
+        # the classic format writes kind letters unless the long kind field is on
+        letters = 'K' not in fields
+        if output_format == 'xref':
+            del gen_opts['-f']
+            gen_opts['-x'] = None
+            if letters:
+                gen_opts[self.xformat_option] = _XREF_FIELDS_.replace('%K', '%k')
+            else:
+                gen_opts[self.xformat_option] = _XREF_FIELDS_
+            return _xref_entry
+        if output_format == 'json':
+            gen_opts['--output-format'] = 'json'
+            if not letters:
+                return _json_entry
+            # JSON names kinds, the language is needed to look up their letters
+            language = 'l' in fields or '*' in fields
+            if not language:
+                gen_opts['--fields'] = gen_opts.get('--fields', '') + '+l'
+            kind_letters = self.kind_letters
+            return lambda line, strings: _json_entry(line, strings, kind_letters, language)
+        return None
+
+    def generate_object(self, **kwargs):
+        """
+        Parses source files into a ctags_file instance, parsing ctags output as it's read.
+            - B{Keyword Arguments:}
+                - B{tag_program:} (str) path to ctags executable, or name of a ctags program in path
+                - B{files:} (sequence) files to process with ctags
+                - B{generator_options:} (dict) options to pass to ctags program
+                - B{output_format:} (str) 'xref', 'json' or 'ctags', default is the first of self.output_formats that keeps the fields asked for.  Cross reference output keeps the name, file, line, kind and scope of each tag, so it's only the default when --fields asks for no others; JSON and classic output keep every field ctags is asked for.
+                - B{harvesters:} (list) list of harvester data classes for ctags_file to use while parsing
+                - B{columnar:} (bool) keep tags in a tag_store instead of a list of ctags_entry instances
+                - B{lazy_extensions:} (bool) keep each entry's extension fields as text until they're used, for the classic format
+                - B{keep_tags:} (bool) if False, entries are only passed to the harvesters and the returned ctags_file has no tags, default True
+                - B{encoding_errors:} (str) how to handle invalid UTF-8 in ctags output, as for bytes.decode(), default 'strict'
+        @returns: generated instance of ctags_file on success, None on failure
+        @rtype: (ctags_file or None)
+        @raise ValueError: ctags executable path not set, or the output format isn't supported by this ctags
+        """
+        valid_kwargs = ['tag_program', 'files', 'generator_options', 'output_format', 'harvesters', 'columnar', 'lazy_extensions', 'keep_tags', 'encoding_errors']
+        validator.validate(kwargs.keys(), valid_kwargs)
+
+        (gen_opts, file_list) = self._prepare_to_generate(kwargs)
+
+        if 'output_format' in kwargs:
+            output_format = kwargs['output_format']
+        else:
+            formats = [f for f in self.output_formats if f != 'xref' or _fits_xref(gen_opts)]
+            output_format = formats[0]
+        if output_format not in self.output_formats:
+            raise ValueError("Output format " + str(output_format) + " isn't supported by " + self._executable_path + ".")
+        build = self.__entry_builder(output_format, gen_opts)
+
+        encoding_errors = 'strict'
+        if 'encoding_errors' in kwargs:
+            encoding_errors = kwargs['encoding_errors']
+
+        feed_options = dict()
+        for k in ['harvesters', 'columnar', 'lazy_extensions', 'keep_tags', 'encoding_errors']:
+            if k in kwargs:
+                feed_options[k] = kwargs[k]
+        tagfile = ctags_file()
+        tagfile.feed_init(**feed_options)
+
+        argv = self._dict_to_argv(gen_opts)
+        self.command_line = subprocess.list2cmdline(argv)
+        p = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        messages = list()
+        lines = _pipeline(p, file_list, messages)
+        try:
+            if output_format == 'ctags':
+                for line in lines:
+                    tagfile.feed_line(line)
+            else:
+                strings = tagfile._strings
+                for line in lines:
+                    entry = build(line.decode("utf-8", encoding_errors), strings)
+                    if entry is not None:
+                        tagfile.feed_entry(entry)
+        finally:
+            lines.close()
+
+        self.warnings = b''.join(messages).decode("utf-8").splitlines()
+        tagfile.feed_finish()
+
+        if p.returncode == 0:
+            return tagfile
+        return None
+
+    def generate_buffers(self, buffers, **kwargs):
+        """
+        Parses source text that isn't saved, such as editor buffers, into a ctags_file instance, with one ctags run for all of them.
+        If this ctags has the interactive feature, the text is streamed to it as --_interactive commands and never touches the disk, and the tags name the virtual paths directly.  Otherwise the buffers are written to a temporary directory, and the tags renamed back to the virtual paths.
+            - B{Keyword Arguments:}
+                - B{tag_program:} (str) path to ctags executable, or name of a ctags program in path
+                - B{generator_options:} (dict) options to pass to ctags program
+                - B{harvesters:} (list) list of harvester data classes for ctags_file to use while parsing
+                - B{columnar:} (bool) keep tags in a tag_store instead of a list of ctags_entry instances
+                - B{lazy_extensions:} (bool) keep each entry's extension fields as text until they're used, when the buffers go through temporary files
+                - B{keep_tags:} (bool) if False, entries are only passed to the harvesters and the returned ctags_file has no tags, default True
+                - B{encoding_errors:} (str) how to handle invalid UTF-8 in ctags output, as for bytes.decode(), default 'strict'
+                - B{temp_dir:} (str) directory to write the buffers under when ctags isn't interactive, default is the system temporary directory
+        @param buffers: (virtual path, text) pairs, text as unicode str or bytes.  The virtual path's extension or name decides the language, as for a file.
+        @type buffers: sequence
+        @returns: generated instance of ctags_file on success, None on failure
+        @rtype: (ctags_file or None)
+        @raise ValueError: ctags executable path not set, or a reserved option was passed
+        """
+        valid_kwargs = ['tag_program', 'generator_options', 'harvesters', 'columnar', 'lazy_extensions', 'keep_tags', 'encoding_errors', 'temp_dir']
+        validator.validate(kwargs.keys(), valid_kwargs)
+
+        if '-L' in kwargs.get('generator_options', dict()):
+            raise ValueError("The option -L is used internally.")
+        prepare = dict()
+        for k in ['tag_program', 'generator_options']:
+            if k in kwargs:
+                prepare[k] = kwargs[k]
+
+        feed_options = dict()
+        for k in ['harvesters', 'columnar', 'lazy_extensions', 'keep_tags', 'encoding_errors']:
+            if k in kwargs:
+                feed_options[k] = kwargs[k]
+        encoding_errors = feed_options.get('encoding_errors', 'strict')
+        tagfile = ctags_file()
+        tagfile.feed_init(**feed_options)
+
+        # the buffers aren't the wrapper's files, keep its file list as it was
+        file_list = self._file_list
+        work_dir = None
+        try:
+            (gen_opts, requests) = self._prepare_to_generate(prepare)
+            interactive = 'interactive' in self.features and 'json' in self.features
+            if interactive:
+                del gen_opts['-L']
+                del gen_opts['-f']
+                gen_opts['--_interactive'] = None
+                build = self.__entry_builder('json', gen_opts)
+                requests = _interactive_requests(buffers)
+            else:
+                work_dir = tempfile.mkdtemp(dir=kwargs.get('temp_dir'))
+                (files, virtual) = _write_buffers(buffers, work_dir)
+                prepare['files'] = files
+                (gen_opts, requests) = self._prepare_to_generate(prepare)
+
+            argv = self._dict_to_argv(gen_opts)
+            self.command_line = subprocess.list2cmdline(argv)
+            p = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+            messages = list()
+            lines = _pipeline(p, requests, messages)
+            warnings = list()
+            try:
+                if interactive:
+                    strings = tagfile._strings
+                    for line in lines:
+                        text = line.decode("utf-8", encoding_errors)
+                        entry = build(text, strings)
+                        if entry is not None:
+                            tagfile.feed_entry(entry)
+                        elif line.find(b'"error"') >= 0:
+                            # errors about a buffer come back in the output, the other replies only report progress
+                            reply = json.loads(text)
+                            if reply.get('_type') == 'error':
+                                warnings.append(reply.get('message', text))
+                else:
+                    for line in _buffer_lines(lines, virtual):
+                        tagfile.feed_line(line)
+            finally:
+                lines.close()
+
+            self.warnings = warnings + b''.join(messages).decode("utf-8").splitlines()
+            if work_dir is not None and self.warnings:
+                # warnings name the files written, not the buffers
+                for (f, path) in virtual.items():
+                    self.warnings = [w.replace(f, path) for w in self.warnings]
+        finally:
+            self._file_list = file_list
+            if work_dir is not None:
+                shutil.rmtree(work_dir, True)
+
+        tagfile.feed_finish()
+
+        if p.returncode == 0:
+            return tagfile
+        return None
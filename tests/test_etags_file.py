@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not, 
+##    see <http://www.gnu.org/licenses/>.
+
+import unittest, sys, os
+sys.path.append("../pyctags")
+from etags_file import etags_file
+
+def section(file, lines):
+    body = "".join(lines)
+    return "\x0c\n" + file + "," + str(len(body)) + "\n" + body
+
+class test_etags_file(unittest.TestCase):
+    def setUp(self):
+        f = open("TAGS", "wb")
+        f.write(section("src/a.c", ["int main(int argc\x7fmain\x0112,140\n",
+            "static int count;\x7f14,200\n",
+            "#define MAX_SIZE \x7fMAX_SIZE\x013,20\n"]).encode("utf-8"))
+        f.write("\x0c\nother/TAGS,include\n".encode("utf-8"))
+        f.write(section("src/b.py", ["def main(\x7fmain\x014,31\n",
+            "class path/like:\x7f9,80\n"]).encode("utf-8"))
+        f.close()
+
+    def tearDown(self):
+        os.remove("TAGS")
+
+    def test_sections(self):
+        et = etags_file("TAGS")
+        try:
+            self.failUnlessEqual(et.files(), ["src/a.c", "src/b.py"])
+            self.failUnlessEqual(et.includes, ["other/TAGS"])
+            
+            # nothing is parsed until it's asked for
+            self.failUnlessEqual(len(et._parsed), 0)
+            tags = et.file_tags("src/a.c")
+            self.failUnlessEqual(list(et._parsed.keys()), ["src/a.c"])
+            
+            self.failUnlessEqual([t.name for t in tags], ["main", "count", "MAX_SIZE"])
+            self.failUnlessEqual(tags[0].line_number, 12)
+            self.failUnlessEqual(tags[0].pattern, "/^int main(int argc/")
+            self.failUnlessEqual(et.file_tags("missing.c"), [])
+            
+            b = et.file_tags("src/b.py")
+            self.failUnlessEqual(b[1].name, "like")
+            self.failUnlessEqual(b[1].pattern, "/^class path\\/like:/")
+        finally:
+            et.close()
+
+    def test_find(self):
+        et = etags_file("TAGS")
+        try:
+            self.failUnlessEqual(len(et.find("main")), 2)
+            self.failUnlessEqual([t.file for t in et.find("main", files=["src/b.py"])], ["src/b.py"])
+            self.failUnlessEqual(len(et.find("max_size", case_sensitive=False)), 1)
+            self.failUnlessEqual(len(list(et.iter_entries())), 5)
+        finally:
+            et.close()
+
+    def test_separate_extensions(self):
+        et = etags_file("TAGS")
+        try:
+            tags = et.file_tags("src/a.c")
+            tags[0].extensions['kind'] = 'f'
+            self.failUnlessEqual(tags[0].extensions['kind'], 'f')
+            self.failIf('kind' in tags[1].extensions)
+        finally:
+            et.close()
+
+    def test_repeated_section(self):
+        # etags -a appends another section for a file that's already in the TAGS file
+        f = open("TAGS", "ab")
+        f.write(section("src/a.c", ["void foo(\x7ffoo\x0120,300\n"]).encode("utf-8"))
+        f.close()
+        et = etags_file("TAGS")
+        try:
+            self.failUnlessEqual(et.files(), ["src/a.c", "src/b.py"])
+            self.failUnlessEqual([t.name for t in et.file_tags("src/a.c")], ["main", "count", "MAX_SIZE", "foo"])
+            self.failUnlessEqual(len(list(et.iter_entries())), 6)
+        finally:
+            et.close()
+
+    def test_bad_size(self):
+        f = open("TAGS", "wb")
+        f.write("\x0c\nsrc/a.c,5\nint main(\x7fmain\x011,0\n".encode("utf-8"))
+        f.write(section("src/b.c", ["int b(\x7fb\x011,0\n"]).encode("utf-8"))
+        f.close()
+        et = etags_file("TAGS")
+        try:
+            self.failUnlessEqual(et.files(), ["src/a.c", "src/b.c"])
+            self.failUnlessEqual([t.name for t in et.iter_entries()], ["main", "b"])
+        finally:
+            et.close()
+        
+        f = open("TAGS", "wb")
+        f.write("!_TAG_FILE_FORMAT\t2\n".encode("utf-8"))
+        f.close()
+        self.failUnlessRaises(ValueError, etags_file, "TAGS")
+
+if __name__ == '__main__':
+    unittest.main()
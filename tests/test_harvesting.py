@@ -128,6 +128,51 @@ class TestHarvesting(TestCase):
         tags = lookup_harvest.starts_with('C', num_results=2, case_sensitive=False)
         self.failUnlessEqual(len(tags), 2)
 
+    def test_columnar_harvesting(self):
+        kh = kind_harvester()
+        by_name_h = by_name_harvester()
+        lookup_harvest = name_lookup_harvester()
+        tf = ctags_file(tag_lists['extended']['body'], harvesters=[kh, by_name_h, lookup_harvest], columnar=True)
+        kinds = kh.get_data()
+        
+        for tag in tf.tags:
+            self.failUnless(tag in kinds[tag.extensions['kind']])
+        
+        name_dict = by_name_h.get_data()
+        self.failUnless(name_dict['ctags_entry'][0].name == 'ctags_entry')
+        self.failUnless(name_dict['ctags_entry'][0].extensions['kind'] == 'c')
+        self.failUnlessEqual(len(lookup_harvest.starts_with('ctags_')), len([n for n in name_dict if n.startswith('ctags_')]))
+        
+        kh2 = kind_harvester()
+        tf.harvest([kh2])
+        self.failUnlessEqual(sorted(kh2.get_data().keys()), sorted(kinds.keys()))
+    def test_merge(self):
+        tags = ctags_file(tag_lists['extended']['body']).tags
+        half = len(tags) // 2
+        
+        for cls in [kind_harvester, by_name_harvester]:
+            whole = cls()
+            whole.process_tag_list(tags)
+            first = cls()
+            first.process_tag_list(tags[:half])
+            second = cls()
+            second.process_tag_list(tags[half:])
+            first.merge(second)
+            self.failUnlessEqual(first.get_data(), whole.get_data())
+        
+        whole = name_lookup_harvester()
+        whole.process_tag_list(tags)
+        first = name_lookup_harvester()
+        first.do_before()
+        for t in tags[:half]:
+            first.feed(t)
+        second = name_lookup_harvester()
+        second.do_before()
+        for t in tags[half:]:
+            second.feed(t)
+        first.merge(second)
+        first.do_after()
+        self.failUnlessEqual(first.starts_with(''), whole.starts_with(''))
 
 if __name__ == '__main__':
     unittest_main()
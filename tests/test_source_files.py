@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not, 
+##    see <http://www.gnu.org/licenses/>.
+
+import unittest, sys, os, shutil
+sys.path.append("../pyctags")
+from source_files import find_sources, _name_matcher
+from kwargs_validator import ParameterError
+
+class test_source_files(unittest.TestCase):
+    def setUp(self):
+        self.root = "source_tree"
+        for path in ["a.c", "a.h", "notes.txt", "Makefile", "rules.mk", "archive.tar.gz",
+                "lib/b.c", "lib/b.o", "lib/deep/c.c", "lib/deep/generated.c",
+                "build/out.c", "build/keep/kept.c", "vendor/d.c", ".git/e.c"]:
+            path = os.path.join(self.root, path)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            f = open(path, "w")
+            f.write("int x;\n")
+            f.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def rel(self, found):
+        return [os.path.relpath(f, self.root).replace(os.sep, '/') for f in found]
+
+    def write_ignore(self, directory, text):
+        f = open(os.path.join(self.root, directory, ".gitignore"), "w")
+        f.write(text)
+        f.close()
+
+    def test_matcher(self):
+        m = _name_matcher(['.c', '.h', 'Makefile', '*.mk', '.tar.gz'])
+        for name in ['a.c', 'a.h', 'Makefile', 'rules.mk', 'x.tar.gz', 'b.test.c']:
+            self.failUnless(m(name), name)
+        for name in ['a.cc', 'makefile.bak', 'notes.txt', '.c', 'mk']:
+            self.failIf(m(name), name)
+
+    def test_find_sources(self):
+        everything = self.rel(find_sources(self.root))
+        self.failUnlessEqual(len(everything), 14)
+
+        c_files = ['.git/e.c', 'a.c', 'build/keep/kept.c', 'build/out.c', 'lib/b.c', 'lib/deep/c.c', 'lib/deep/generated.c', 'vendor/d.c']
+        self.failUnlessEqual(self.rel(find_sources(self.root, extensions=['.c'])), c_files)
+        self.failUnlessEqual(self.rel(find_sources(self.root, extensions=['.c'], workers=1)), c_files)
+        self.failUnlessEqual(self.rel(find_sources([self.root], extensions=['.c', '.h', 'Makefile', '*.mk'])),
+            sorted(c_files + ['Makefile', 'a.h', 'rules.mk']))
+
+        found = find_sources(self.root, extensions=['.c'], exclude=['vendor', 'lib/deep/*', '.*'])
+        self.failUnlessEqual(self.rel(found), ['a.c', 'build/keep/kept.c', 'build/out.c', 'lib/b.c'])
+
+        # files given as roots are matched like files found in a directory
+        found = find_sources([os.path.join(self.root, "a.c"), os.path.join(self.root, "notes.txt")], extensions=['.c'])
+        self.failUnlessEqual(found, [os.path.join(self.root, "a.c")])
+
+        self.failUnlessRaises(ParameterError, find_sources, self.root, bad_arg=True)
+
+    def test_gitignore(self):
+        self.write_ignore("", "# comment\n\n/build/*\n!/build/keep/\ngenerated.*\nvendor/\n")
+        self.write_ignore("lib", "*.o\n/b.c\n")
+        found = find_sources(self.root, gitignore=True)
+        self.failUnlessEqual(self.rel(found), ['.gitignore', 'Makefile', 'a.c', 'a.h', 'archive.tar.gz',
+            'build/keep/kept.c', 'lib/.gitignore', 'lib/deep/c.c', 'notes.txt', 'rules.mk'])
+
+        # rules only apply when asked for
+        self.failUnlessEqual(len(find_sources(self.root, extensions=['.c'])), 8)
+
+        self.write_ignore("lib", "deep/**/*.c\n")
+        found = find_sources(self.root, extensions=['.c'], gitignore=True)
+        self.failUnlessEqual(self.rel(found), ['a.c', 'build/keep/kept.c', 'lib/b.c'])
+
+    def test_links(self):
+        if not hasattr(os, 'symlink'):
+            return
+        try:
+            os.symlink(os.path.abspath(os.path.join(self.root, "lib")), os.path.join(self.root, "lib", "deep", "up"))
+            os.symlink(os.path.abspath(os.path.join(self.root, "vendor")), os.path.join(self.root, "linked_vendor"))
+        except OSError:
+            return
+        c_files = ['.git/e.c', 'a.c', 'build/keep/kept.c', 'build/out.c', 'lib/b.c', 'lib/deep/c.c', 'lib/deep/generated.c', 'vendor/d.c']
+        self.failUnlessEqual(self.rel(find_sources(self.root, extensions=['.c'])), c_files)
+        # a directory reached through several paths is scanned once, and the loop from lib/deep/up back to lib isn't followed
+        found = self.rel(find_sources(self.root, extensions=['.c'], follow_links=True, workers=1))
+        self.failUnlessEqual(len(found), 8)
+        self.failUnless('lib/b.c' in found)
+        self.failUnless('vendor/d.c' in found or 'linked_vendor/d.c' in found)
+
+if __name__ == '__main__':
+    unittest.main()
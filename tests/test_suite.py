@@ -24,6 +24,19 @@ import test_tag_entry
 import test_tag_file
 import test_writetags
 import test_harvesting
+import test_tag_lookup
+import test_tag_snapshot
+import test_tag_writer
+import test_etags_file
+import test_tag_manifest
+try:
+    import test_tag_async
+except (SyntaxError, ImportError):
+    # async def and asyncio need Python 3.5 or later
+    test_tag_async = None
+import test_universal
+import test_source_files
+import test_tag_watch
 
 from kwargs_validator import ParameterError, the_validator as validator
 from exuberant import exuberant_ctags
@@ -63,11 +76,22 @@ tag_file_tests = l.loadTestsFromModule(test_tag_file)
 
 write_tests = l.loadTestsFromModule(test_writetags)
 harvest_tests = l.loadTestsFromModule(test_harvesting)
+lookup_tests = l.loadTestsFromModule(test_tag_lookup)
+snapshot_tests = l.loadTestsFromModule(test_tag_snapshot)
+writer_tests = l.loadTestsFromModule(test_tag_writer)
+etags_tests = l.loadTestsFromModule(test_etags_file)
+manifest_tests = l.loadTestsFromModule(test_tag_manifest)
+async_tests = unittest.TestSuite()
+if test_tag_async is not None:
+    async_tests = l.loadTestsFromModule(test_tag_async)
+universal_tests = l.loadTestsFromModule(test_universal)
+source_files_tests = l.loadTestsFromModule(test_source_files)
+watch_tests = l.loadTestsFromModule(test_tag_watch)
 
 validator_tests = l.loadTestsFromTestCase(kwargs_validator)
 ends = l.loadTestsFromTestCase(end_to_end)
 
-alltests = unittest.TestSuite([write_tests, entry_tests, tag_file_tests, harvest_tests, validator_tests, ends])
+alltests = unittest.TestSuite([write_tests, entry_tests, tag_file_tests, harvest_tests, lookup_tests, snapshot_tests, writer_tests, etags_tests, manifest_tests, async_tests, universal_tests, source_files_tests, watch_tests, validator_tests, ends])
 
 r = unittest.TestResult()
 unittest.TextTestRunner().run(alltests)
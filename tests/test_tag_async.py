@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not, 
+##    see <http://www.gnu.org/licenses/>.
+
+import unittest, sys, asyncio
+sys.path.append("../pyctags")
+import tag_async
+from tag_file import ctags_file
+from exuberant import exuberant_ctags
+from harvesters import kind_harvester
+from tag_lists import tag_lists
+from make_tagfiles import file_lists, tag_program
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+class test_tag_async(unittest.TestCase):
+    def test_parse(self):
+        kh = kind_harvester()
+        tf = run(tag_async.parse(ctags_file(), "extended.tags", harvesters=[kh]))
+        tf2 = ctags_file("extended.tags")
+        self.failUnlessEqual(list(tf.tags), list(tf2.tags))
+        self.failUnlessEqual(tf.version, tf2.version)
+        self.failUnlessEqual(tf.sorted, tf2.sorted)
+        self.failUnlessEqual(sum([len(v) for v in kh.get_data().values()]), len(tf2.tags))
+        
+        tf = run(tag_async.parse(ctags_file(), tag_lists['extended']['head'] + tag_lists['extended']['body'], columnar=True))
+        self.failUnlessEqual(list(tf.tags), list(tf2.tags))
+
+    def test_generate_tags(self):
+        ec = exuberant_ctags(tag_program=tag_program, files=file_lists['relpath'])
+        tags = run(tag_async.generate_tags(ec))
+        self.failUnlessEqual(tags, ec.generate_tags())
+
+    def test_generate_object(self):
+        ec = exuberant_ctags(tag_program=tag_program, files=file_lists['relpath'])
+        tf = ec.generate_object()
+        
+        async def generate_all():
+            jobs = [tag_async.generate_object(exuberant_ctags(tag_program=tag_program, files=file_lists['relpath'])) for i in range(4)]
+            return await asyncio.gather(*jobs)
+        
+        for tf2 in run(generate_all()):
+            self.failUnlessEqual([repr(t) for t in tf2.tags], [repr(t) for t in tf.tags])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,7 +19,7 @@
 
 import unittest, sys
 sys.path.append("../pyctags")
-from tag_entry import ctags_entry
+from tag_entry import ctags_entry, extension_fields
 
 
 entry_kwargs_pattern = {"name" : "testName", "file" : "../testFile", "pattern" : "testPattern", "extensions" : {"aa" : "aav", "bb" : "bbv"}}
@@ -167,6 +167,49 @@ class test_ctags_entry(unittest.TestCase):
             
         self.failIf(fail)
         
+    def test_slots(self):
+        te = ctags_entry(**entry_kwargs_both)
+        self.failIf(hasattr(te, '__dict__'))
+        
+    def test_extension_fields(self):
+        ext = extension_fields(('kind', 'line'), ('c', '12'))
+        self.failUnlessEqual(ext, {'kind' : 'c', 'line' : '12'})
+        self.failUnless('kind' in ext)
+        self.failIf('access' in ext)
+        self.failUnlessEqual(ext['line'], '12')
+        self.failUnlessEqual(eval(repr(ext)), {'kind' : 'c', 'line' : '12'})
+        
+        ext['access'] = 'public'
+        ext['kind'] = 'm'
+        del ext['line']
+        self.failUnlessEqual(ext, {'kind' : 'm', 'access' : 'public'})
+        self.failIf(hasattr(ext, '__dict__'))
+        
+    def test_get_extension(self):
+        te = ctags_entry(**entry_kwargs_both)
+        self.failUnlessEqual(te.get_extension('aa'), 'aav')
+        self.failUnlessEqual(te.get_extension('kind'), None)
+        
+        te = ctags_entry(**entry_kwargs_min_line)
+        self.failUnlessEqual(te.get_extension('kind', 'none'), 'none')
+    
+    def test_hash(self):
+        te = ctags_entry(**entry_kwargs_both)
+        ent = ctags_entry(repr(te))
+        self.failUnlessEqual(hash(te), hash(ent))
+        self.failUnlessEqual(len(set([te, ent])), 1)
+        
+        ent = ctags_entry(**entry_kwargs_line)
+        self.failIfEqual(te, ent)
+        self.failUnless(te != ent)
+        self.failUnlessEqual(len(set([te, ent])), 2)
+        
+        d = dict(entry_kwargs_both)
+        d['extensions'] = {"aa" : "aav"}
+        ent = ctags_entry(**d)
+        self.failIfEqual(te, ent)
+        
+        self.failIfEqual(te, repr(te))
         
 if __name__ == '__main__':
     unittest.main()
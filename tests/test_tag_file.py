@@ -17,11 +17,28 @@
 ##    and the GNU Lesser General Public Licens along with pyctags.  If not, 
 ##    see <http://www.gnu.org/licenses/>.
 
-import unittest, sys
+import unittest, sys, os, gzip, bz2
 sys.path.append("../pyctags")
 from tag_file import ctags_file
 from tag_entry import ctags_entry
 from tag_lists import tag_lists
+from harvesters import kind_harvester, by_name_harvester, base_harvester
+
+class kind_count_harvester(base_harvester):
+    """ Counts the tags of one kind, set when it's made."""
+    def __init__(self, kind):
+        self.kind = kind
+        self.count = 0
+    
+    def feed(self, entry):
+        if entry.extensions.get('kind') == self.kind:
+            self.count += 1
+    
+    def merge(self, other):
+        self.count += other.count
+    
+    def clone(self):
+        return kind_count_harvester(self.kind)
 
 class test_ctags_file(unittest.TestCase):
     
@@ -74,6 +91,250 @@ class test_ctags_file(unittest.TestCase):
         
         self.failUnlessEqual(tf.tags[0].extensions['kind'], tf2.tags[0].extensions['kind'])
     
+    def test_shared_strings(self):
+        tf = ctags_file(tag_lists['extended']['body'])
+        files = dict()
+        for t in tf.tags:
+            if t.file in files:
+                self.failUnless(t.file is files[t.file])
+            files[t.file] = t.file
+        
+        first = tf.tags[0]
+        for t in tf.tags[1:]:
+            if t.extensions['kind'] == first.extensions['kind']:
+                self.failUnless(t.extensions['kind'] is first.extensions['kind'])
+            if list(t.extensions.keys()) == list(first.extensions.keys()):
+                self.failUnless(t.extensions._keys is first.extensions._keys)
+
+    def test_columnar(self):
+        tf = ctags_file(tag_lists['extended']['body'], columnar=True)
+        tf2 = ctags_file(tag_lists['extended']['body'])
+        self.failUnlessEqual(len(tf.tags), len(tf2.tags))
+        
+        i = 0
+        for t in tf.tags:
+            self.failUnlessEqual(t, tf2.tags[i])
+            self.failUnlessEqual(tf.tags.kind(i), t.extensions['kind'])
+            i += 1
+        self.failUnlessEqual(tf.tags[-1], tf2.tags[-1])
+        self.failUnlessEqual(tf.tags[1:3], tf2.tags[1:3])
+        
+        tf = ctags_file(tag_lists['unextended']['body'], columnar=True)
+        tf2 = ctags_file(tag_lists['unextended']['body'])
+        self.failUnlessEqual(list(tf.tags), tf2.tags)
+        
+        tf.tags.append(tf2.tags[0])
+        self.failUnlessEqual(tf.tags[-1], tf2.tags[0])
+    def test_lazy_extensions(self):
+        tf = ctags_file(tag_lists['extended']['body'], lazy_extensions=True)
+        tf2 = ctags_file(tag_lists['extended']['body'])
+        self.failUnlessEqual(len(tf.tags), len(tf2.tags))
+        
+        i = 0
+        for t in tf.tags:
+            self.failUnlessEqual(t.line_number, tf2.tags[i].line_number)
+            self.failUnlessEqual(t.get_extension('kind'), tf2.tags[i].extensions['kind'])
+            self.failUnlessEqual(t.get_extension('language'), 'Python')
+            self.failUnlessEqual(t.get_extension('signature', 'none'), 'none')
+            self.failUnlessEqual(t.extensions, tf2.tags[i].extensions)
+            self.failUnlessEqual(t, tf2.tags[i])
+            i += 1
+        
+        tf = ctags_file(tag_lists['relpath']['body'], lazy_extensions=True)
+        tf2 = ctags_file(tag_lists['relpath']['body'])
+        self.failUnlessEqual(tf.tags[0].get_extension('kind'), tf2.tags[0].extensions['kind'])
+        self.failUnlessEqual(tf.tags, tf2.tags)
+    def test_deduplicate(self):
+        body = tag_lists['extended']['body']
+        tf = ctags_file(body + body[:10] + body)
+        self.failUnlessEqual(tf.deduplicate(), len(body) + 10)
+        self.failUnlessEqual(tf.tags, ctags_file(body).tags)
+        self.failUnlessEqual(tf.deduplicate(), 0)
+        
+        tf = ctags_file(body + body[:10], columnar=True)
+        self.failUnlessEqual(tf.deduplicate(), 10)
+        self.failUnlessEqual(list(tf.tags), ctags_file(body).tags)
+    def test_iter_entries(self):
+        tf = ctags_file()
+        tf2 = ctags_file("relpath.tags")
+        i = 0
+        for t in tf.iter_entries("relpath.tags"):
+            self.failUnlessEqual(t, tf2.tags[i])
+            i += 1
+        self.failUnlessEqual(i, len(tf2.tags))
+        self.failUnlessEqual(len(tf.tags), 0)
+        self.failUnlessEqual(tf.format, tf2.format)
+        self.failUnlessEqual(tf.sorted, tf2.sorted)
+        
+        tags = list(ctags_file().iter_entries(tag_lists['extended']['body'], lazy_extensions=True))
+        self.failUnlessEqual(tags, ctags_file(tag_lists['extended']['body']).tags)
+    
+    def test_keep_tags(self):
+        kh = kind_harvester()
+        tf = ctags_file("relpath.tags", harvesters=[kh], keep_tags=False)
+        self.failUnlessEqual(len(tf.tags), 0)
+        
+        tf2 = ctags_file("relpath.tags")
+        self.failUnlessEqual(sum([len(v) for v in kh.get_data().values()]), len(tf2.tags))
+        
+        fail = True
+        try:
+            ctags_file("relpath.tags", columnar=True, keep_tags=False)
+        except ValueError:
+            fail = False
+        self.failIf(fail)
+    
+    def test_parallel_parse(self):
+        tf2 = ctags_file("extended.tags")
+        kh2 = kind_harvester()
+        kh2.process_tag_list(tf2.tags)
+        
+        for columnar in [False, True]:
+            kh = kind_harvester()
+            tf = ctags_file("extended.tags", jobs=3, columnar=columnar, harvesters=[kh])
+            self.failUnlessEqual(tf.format, tf2.format)
+            self.failUnlessEqual(list(tf.tags), tf2.tags)
+            
+            kinds = kh.get_data()
+            self.failUnlessEqual(sorted(kinds.keys()), sorted(kh2.get_data().keys()))
+            for k in kinds:
+                self.failUnlessEqual(list(kinds[k]), kh2.get_data()[k])
+        
+        kh = kind_harvester()
+        tf = ctags_file("extended.tags", jobs=2, harvesters=[kh], keep_tags=False)
+        self.failUnlessEqual(len(tf.tags), 0)
+        self.failUnlessEqual(sum([len(v) for v in kh.get_data().values()]), len(tf2.tags))
+        
+        # harvesters that already hold data get each tag once more, not once per job
+        names = by_name_harvester()
+        ctags_file("extended.tags", harvesters=[names])
+        ctags_file("extended.tags", jobs=3, harvesters=[names])
+        self.failUnlessEqual(sum([len(v) for v in names.get_data().values()]), 2 * len(tf2.tags))
+        
+        
+        # workers get clones, which keep the settings of harvesters made with arguments
+        counts = kind_count_harvester('m')
+        ctags_file("extended.tags", jobs=3, harvesters=[counts])
+        self.failUnless(counts.count > 0)
+        self.failUnlessEqual(counts.count, len([t for t in tf2.tags if t.extensions.get('kind') == 'm']))
+        
+        self.failUnlessRaises(NotImplementedError, ctags_file, "extended.tags", jobs=2, harvesters=[base_harvester()])
+    
+    def test_refresh(self):
+        lines = open("extended.tags").readlines()
+        body = [l for l in lines if l[0] != '!']
+        f = open("refresh.tags", "w")
+        f.writelines(lines[:len(lines) - 5])
+        f.close()
+        
+        try:
+            kh = kind_harvester()
+            tf = ctags_file("refresh.tags", harvesters=[kh])
+            self.failUnlessEqual(tf.refresh(), 0)
+            
+            # the last line isn't finished yet
+            f = open("refresh.tags", "a")
+            f.writelines(lines[len(lines) - 5:])
+            f.write(body[0].rstrip('\n'))
+            f.close()
+            self.failUnlessEqual(tf.refresh(), 5)
+            self.failUnlessEqual(tf.tags, ctags_file("extended.tags").tags)
+            self.failUnlessEqual(sum([len(v) for v in kh.get_data().values()]), len(body))
+            
+            f = open("refresh.tags", "a")
+            f.write('\n')
+            f.close()
+            self.failUnlessEqual(tf.refresh(), 1)
+            self.failUnlessEqual(tf.tags[-1], tf.tags[0])
+            
+            f = open("refresh.tags", "w")
+            f.writelines(lines)
+            f.writelines(lines)
+            f.close()
+            self.failUnlessRaises(ValueError, tf.refresh)
+        finally:
+            os.remove("refresh.tags")
+        
+        self.failUnlessRaises(ValueError, ctags_file(body).refresh)
+    
+    def test_partitioned(self):
+        tf = ctags_file("extended.tags")
+        tf2 = ctags_file("extended.tags", partitioned=True, jobs=2)
+        self.failUnlessEqual(len(tf2.tags), len(tf.tags))
+        self.failUnlessEqual(sorted(tf2.tags, key=repr), sorted(tf.tags, key=repr))
+        self.failUnlessEqual(list(tf2.tags), [tf2.tags[i] for i in range(len(tf2.tags))])
+        
+        files = tf2.tags.files()
+        for tagfile in [tf, tf2]:
+            count = len(tagfile.tags)
+            first = tagfile.file_tags(files[0])
+            self.failUnless(len(first) > 0)
+            self.failUnlessEqual(tagfile.remove_file(files[0]), len(first))
+            self.failUnlessEqual(tagfile.file_tags(files[0]), [])
+            self.failUnlessEqual(tagfile.replace_file(files[0], first[:1]), 0)
+            
+            lines = [l for l in open("extended.tags").readlines() if "\t" + files[-1] + "\t" in l]
+            self.failUnlessEqual(tagfile.replace_file(files[-1], lines[:2]), len(lines))
+            self.failUnlessEqual(len(tagfile.file_tags(files[-1])), 2)
+            self.failUnlessEqual(len(tagfile.tags), count - len(first) + 1 - len(lines) + 2)
+        
+        # a replaced file keeps its place
+        self.failUnlessEqual(tf2.tags.files(), files)
+        self.failUnlessEqual(tf2.tags[0], first[0])
+        
+        # looking tags up by index doesn't change the order
+        tf2.remove_file(files[0])
+        self.failIfEqual(tf2.tags[0], first[0])
+        tf2.replace_file(files[0], first[:1])
+        self.failUnlessEqual(tf2.tags.files(), files)
+        self.failUnlessEqual(tf2.tags[0], first[0])
+        
+        # a file replaced with no tags is removed
+        count = len(tf2.tags)
+        self.failUnlessEqual(tf2.replace_file(files[0], []), 1)
+        self.failUnlessEqual(tf2.tags.files(), files[1:])
+        self.failUnlessEqual(len(tf2.tags), count - 1)
+    
+    def test_compressed(self):
+        tf = ctags_file("extended.tags")
+        data = open("extended.tags", "rb").read()
+        for (name, opener) in [("extended.tags.gz", gzip.GzipFile), ("extended.tags.bz2", bz2.BZ2File)]:
+            f = opener(name, "wb")
+            f.write(data)
+            f.close()
+            try:
+                tf2 = ctags_file(name, jobs=2)
+                self.failUnlessEqual(tf2.format, tf.format)
+                self.failUnlessEqual(tf2.tags, tf.tags)
+                self.failUnlessEqual(list(ctags_file().iter_entries(name)), tf.tags)
+                self.failUnlessRaises(ValueError, tf2.refresh)
+            finally:
+                os.remove(name)
+    
+    def test_encoding_errors(self):
+        f = open("badutf8.tags", "wb")
+        f.write(b'!_TAG_FILE_FORMAT\t2\t/extended format/\n')
+        f.write(b'good\tsrc/a.c\t/^int good;$/;"\tv\n')
+        f.write(b'bad\tsrc/a.c\t/^int bad = \xff;$/;"\tv\n')
+        f.close()
+        try:
+            self.failUnlessRaises(ValueError, ctags_file, "badutf8.tags")
+            
+            tf = ctags_file("badutf8.tags", encoding_errors='replace')
+            self.failUnlessEqual(tf.format, 2)
+            self.failUnlessEqual(tf.tags[1].pattern, u'/^int bad = \ufffd;$/')
+            self.failUnless(tf.tags[0].file is tf.tags[1].file)
+            
+            # columnar storage only decodes what's read
+            tf = ctags_file("badutf8.tags", columnar=True)
+            self.failUnlessEqual(tf.tags.name(1), 'bad')
+            self.failUnlessEqual(tf.tags.kind(1), 'v')
+            self.failUnlessRaises(ValueError, tf.tags.__getitem__, 1)
+            
+            tf = ctags_file("badutf8.tags", columnar=True, encoding_errors='surrogateescape')
+            self.failUnlessEqual(tf.tags[1].pattern.encode('utf-8', 'surrogateescape'), b'/^int bad = \xff;$/')
+        finally:
+            os.remove("badutf8.tags")
 
 if __name__ == '__main__':
     unittest.main()
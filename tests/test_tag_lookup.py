@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not, 
+##    see <http://www.gnu.org/licenses/>.
+
+import unittest, os, sys, gzip
+sys.path.append("../pyctags")
+from tag_lookup import ctags_lookup
+from tag_file import ctags_file
+from tag_lists import tag_lists
+
+def write_tagfile(filename, head, body):
+    f = open(filename, 'w')
+    for line in head + body:
+        f.write(line + '\n')
+    f.close()
+
+class test_ctags_lookup(unittest.TestCase):
+    
+    def setUp(self):
+        self.all_tags = ctags_file(tag_lists['relpath']['body']).tags
+        
+        head = [h for h in tag_lists['relpath']['head'] if not h.startswith('!_TAG_FILE_SORTED')]
+        
+        body = sorted(tag_lists['relpath']['body'], key=lambda l: l.upper())
+        write_tagfile("foldcase.tags", head + ['!_TAG_FILE_SORTED\t2\t/0=unsorted, 1=sorted, 2=foldcase/'], body)
+        
+        body = list(reversed(tag_lists['relpath']['body']))
+        write_tagfile("unsorted.tags", head + ['!_TAG_FILE_SORTED\t0\t/0=unsorted, 1=sorted, 2=foldcase/'], body)
+
+    def tearDown(self):
+        os.remove("foldcase.tags")
+        os.remove("unsorted.tags")
+
+    def check_lookups(self, lookup):
+        for name in ['ctags_entry', 'ctags_file', 'feed', '__init__', 'zzz_no_such_tag', 'a']:
+            expected = [t for t in self.all_tags if t.name == name]
+            found = lookup.find(name)
+            self.failUnlessEqual(sorted(found, key=repr), sorted(expected, key=repr))
+        
+        for prefix in ['ctags_', 'feed', '_', 'zzz']:
+            expected = [t for t in self.all_tags if t.name.startswith(prefix)]
+            found = lookup.starts_with(prefix)
+            self.failUnlessEqual(sorted(found, key=repr), sorted(expected, key=repr))
+        
+        expected = [t for t in self.all_tags if t.name.lower().startswith('ctags_')]
+        found = lookup.starts_with('CTAGS_', case_sensitive=False)
+        self.failUnlessEqual(sorted(found, key=repr), sorted(expected, key=repr))
+        self.failUnlessEqual(len(lookup.starts_with('CTAGS_')), 0)
+        
+        self.failUnlessEqual(len(lookup.starts_with('ctags_', num_results=2)), 2)
+
+    def test_sorted(self):
+        lookup = ctags_lookup("relpath.tags")
+        self.failUnlessEqual(lookup.sorted, 1)
+        self.check_lookups(lookup)
+        lookup.close()
+
+    def test_foldcase(self):
+        lookup = ctags_lookup("foldcase.tags")
+        self.failUnlessEqual(lookup.sorted, 2)
+        self.check_lookups(lookup)
+        lookup.close()
+
+    def test_unsorted(self):
+        lookup = ctags_lookup("unsorted.tags", lazy_extensions=True)
+        self.failUnlessEqual(lookup.sorted, 0)
+        self.check_lookups(lookup)
+        lookup.close()
+
+    def test_compressed(self):
+        f = gzip.GzipFile("relpath.tags.gz", "wb")
+        f.write(open("relpath.tags", "rb").read())
+        f.close()
+        try:
+            lookup = ctags_lookup("relpath.tags.gz")
+            self.failUnlessEqual(lookup.sorted, 1)
+            self.check_lookups(lookup)
+            lookup.close()
+        finally:
+            os.remove("relpath.tags.gz")
+    
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not, 
+##    see <http://www.gnu.org/licenses/>.
+
+import unittest, sys, os, time
+sys.path.append("../pyctags")
+from tag_file import ctags_file
+from tag_manifest import file_manifest, update_tags, update_tagfile
+from exuberant import exuberant_ctags
+from make_tagfiles import tag_program
+
+class renaming_ctags:
+    """ Stands in for a ctags that names the files it's given differently, with ./ in front."""
+    def __init__(self):
+        self._file_list = list()
+    
+    def generate_tags(self, files, generator_options, jobs):
+        lines = list()
+        for source in files:
+            for line in open(source):
+                if line.startswith("def "):
+                    lines.append(line[4:].split("(")[0] + "\t./" + source + "\t/^" + line.rstrip("\n") + "$/;\"\tf")
+        return lines
+
+class test_tag_manifest(unittest.TestCase):
+    def setUp(self):
+        self.sources = ["manifest_a.py", "manifest_b.py", "manifest_c.py"]
+        for (i, source) in enumerate(self.sources):
+            f = open(source, "w")
+            f.write("def func_%d():\n    pass\n" % (i))
+            f.close()
+
+    def tearDown(self):
+        for f in self.sources + ["manifest_d.py", "manifest.txt", "manifest.tags"]:
+            if os.path.exists(f):
+                os.remove(f)
+
+    def test_changes(self):
+        m = file_manifest()
+        m.scan(self.sources + ["no_such_file.py"], content_hash=True)
+        self.failUnlessEqual(sorted(m.files.keys()), self.sources)
+        m.save("manifest.txt")
+        
+        m2 = file_manifest("manifest.txt")
+        self.failUnlessEqual(m2.files, m.files)
+        self.failUnlessEqual(m.changes(m2), ([], [], []))
+        
+        # a failed save leaves the old manifest and no temporary file
+        broken = file_manifest()
+        broken.files[u'\udcff.py'] = (1, 1, None)
+        self.failUnlessRaises(UnicodeError, broken.save, "manifest.txt")
+        self.failUnlessEqual(file_manifest("manifest.txt").files, m.files)
+        self.failUnlessEqual([f for f in os.listdir(".") if f.startswith("manifest.txt.")], [])
+        
+        # touched but not changed
+        st = os.stat(self.sources[0])
+        os.utime(self.sources[0], (st.st_atime, st.st_mtime + 10))
+        f = open(self.sources[1], "a")
+        f.write("def another():\n    pass\n")
+        f.close()
+        os.remove(self.sources[2])
+        f = open("manifest_d.py", "w")
+        f.write("class new_class:\n    pass\n")
+        f.close()
+        
+        m3 = file_manifest()
+        m3.scan(self.sources[:2] + ["manifest_d.py"], content_hash=True, previous=m2)
+        self.failUnlessEqual(m2.changes(m3), (["manifest_d.py"], [self.sources[1]], [self.sources[2]]))
+        
+        # without hashes, a new modification time is a change
+        m4 = file_manifest()
+        m4.scan(self.sources[:2] + ["manifest_d.py"])
+        m5 = file_manifest()
+        m5.scan(self.sources[:2] + ["manifest_d.py"])
+        self.failUnlessEqual(m4.changes(m5), ([], [], []))
+        os.utime(self.sources[0], (st.st_atime, st.st_mtime + 20))
+        m5.scan(self.sources[:2] + ["manifest_d.py"])
+        self.failUnlessEqual(m4.changes(m5), ([], [self.sources[0]], []))
+        
+        f = open("manifest.txt", "w")
+        f.write("not a manifest\n")
+        f.close()
+        self.failUnlessRaises(ValueError, file_manifest, "manifest.txt")
+
+    def test_update_tags(self):
+        ec = exuberant_ctags(tag_program=tag_program)
+        tf = ctags_file(partitioned=True)
+        self.failUnlessEqual(update_tags(tf, ec, "manifest.txt", files=self.sources), (self.sources, [], []))
+        self.failUnlessEqual(sorted([t.name for t in tf.tags]), ["func_0", "func_1", "func_2"])
+        self.failUnlessEqual(update_tags(tf, ec, "manifest.txt", files=self.sources), ([], [], []))
+        
+        time.sleep(0.01)
+        f = open(self.sources[1], "w")
+        f.write("def renamed():\n    pass\n")
+        f.close()
+        os.remove(self.sources[2])
+        self.failUnlessEqual(update_tags(tf, ec, "manifest.txt", files=self.sources), ([], [self.sources[1]], [self.sources[2]]))
+        self.failUnlessEqual(sorted([t.name for t in tf.tags]), ["func_0", "renamed"])
+
+    def test_renamed_files(self):
+        ec = renaming_ctags()
+        tf = ctags_file(partitioned=True)
+        update_tags(tf, ec, "manifest.txt", files=self.sources)
+        self.failUnlessEqual(sorted([t.file for t in tf.tags]), self.sources)
+        
+        time.sleep(0.01)
+        f = open(self.sources[1], "w")
+        f.write("def renamed():\n    pass\n")
+        f.close()
+        os.remove(self.sources[2])
+        self.failUnlessEqual(update_tags(tf, ec, "manifest.txt", files=self.sources), ([], [self.sources[1]], [self.sources[2]]))
+        self.failUnlessEqual(sorted([t.name for t in tf.tags]), ["func_0", "renamed"])
+
+    def test_update_tagfile(self):
+        ec = exuberant_ctags(tag_program=tag_program)
+        update_tagfile(ec, "manifest.tags", "manifest.txt", files=self.sources)
+        full = ec.generate_tags(files=self.sources)
+        self.failUnlessEqual([t._to_line() for t in ctags_file("manifest.tags").tags], [t._to_line() for t in ctags_file(full).tags])
+        
+        os.remove(self.sources[0])
+        self.failUnlessEqual(update_tagfile(ec, "manifest.tags", "manifest.txt", files=self.sources), ([], [], [self.sources[0]]))
+        self.failUnlessEqual(sorted([t.name for t in ctags_file("manifest.tags").tags]), ["func_1", "func_2"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not, 
+##    see <http://www.gnu.org/licenses/>.
+
+import unittest, sys, os, shutil
+sys.path.append("../pyctags")
+from tag_file import ctags_file
+import tag_snapshot
+from tag_snapshot import save_snapshot, load_snapshot, cached_ctags_file
+from tag_lists import tag_lists
+from harvesters import kind_harvester
+
+class test_tag_snapshot(unittest.TestCase):
+    def setUp(self):
+        shutil.copy("extended.tags", "snapshot.tags")
+
+    def tearDown(self):
+        for f in ["snapshot.tags", "snapshot.bin"]:
+            if os.path.exists(f):
+                os.remove(f)
+
+    def test_round_trip(self):
+        for columnar in [False, True]:
+            tf = ctags_file("snapshot.tags", columnar=columnar)
+            save_snapshot(tf, "snapshot.bin")
+            tf2 = load_snapshot("snapshot.bin")
+            self.failUnlessEqual(tf2.format, tf.format)
+            self.failUnlessEqual(tf2.sorted, tf.sorted)
+            self.failUnlessEqual(tf2.version, tf.version)
+            self.failUnlessEqual(list(tf2.tags), list(tf.tags))
+        
+        # tags that weren't read from a file never go stale
+        tf = ctags_file(tag_lists['relpath']['body'])
+        save_snapshot(tf, "snapshot.bin")
+        tf2 = load_snapshot("snapshot.bin")
+        self.failUnlessEqual(tf2.format, None)
+        self.failUnlessEqual(list(tf2.tags), tf.tags)
+        
+        f = open("snapshot.bin", "w")
+        f.write("not a snapshot")
+        f.close()
+        self.failUnlessRaises(ValueError, load_snapshot, "snapshot.bin")
+
+    def test_failed_save(self):
+        def fail(f, column):
+            raise IOError("disk full")
+        write_column = tag_snapshot._write_column
+        tag_snapshot._write_column = fail
+        try:
+            self.failUnlessRaises(IOError, save_snapshot, ctags_file("snapshot.tags"), "snapshot.bin")
+        finally:
+            tag_snapshot._write_column = write_column
+        self.failIf(os.path.exists("snapshot.bin"))
+        self.failUnlessEqual([f for f in os.listdir(".") if f.startswith("snapshot.bin")], [])
+
+    def test_invalidation(self):
+        save_snapshot(ctags_file("snapshot.tags"), "snapshot.bin")
+        self.failIf(load_snapshot("snapshot.bin") is None)
+        
+        f = open("snapshot.tags", "a")
+        f.write(tag_lists['extended']['body'][0])
+        f.close()
+        self.failUnless(load_snapshot("snapshot.bin") is None)
+
+    def test_cached_ctags_file(self):
+        tf = cached_ctags_file("snapshot.tags", "snapshot.bin")
+        self.failUnless(os.path.exists("snapshot.bin"))
+        
+        kh = kind_harvester()
+        tf2 = cached_ctags_file("snapshot.tags", "snapshot.bin", harvesters=[kh])
+        self.failUnlessEqual(list(tf2.tags), list(tf.tags))
+        self.failUnlessEqual(sum([len(v) for v in kh.get_data().values()]), len(tf.tags))
+        
+        f = open("snapshot.tags", "a")
+        f.write(tag_lists['extended']['body'][0].rstrip('\n') + '\n')
+        f.close()
+        self.failUnlessEqual(tf2.refresh(), 1)
+        self.failUnlessEqual(len(cached_ctags_file("snapshot.tags", "snapshot.bin").tags), len(tf.tags) + 1)
+
+if __name__ == '__main__':
+    unittest.main()
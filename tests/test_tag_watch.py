@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not, 
+##    see <http://www.gnu.org/licenses/>.
+
+import unittest, sys, os, time, shutil
+sys.path.append("../pyctags")
+from exuberant import exuberant_ctags
+from harvesters import base_harvester, kind_harvester, by_name_harvester, name_lookup_harvester
+from tag_entry import ctags_entry
+from tag_watch import tag_watcher
+from make_tagfiles import tag_program
+
+class absolute_ctags:
+    """ Stands in for a ctags that names the files it's given by their absolute paths."""
+    all_extensions = ['.py']
+    
+    def __init__(self):
+        self._file_list = list()
+    
+    def generate_tags(self, files, generator_options, jobs):
+        lines = list()
+        for source in files:
+            for line in open(source):
+                if line.startswith("def ") or line.startswith("class "):
+                    name = line.split()[1].split("(")[0].rstrip(":")
+                    lines.append(name + "\t" + os.path.abspath(source) + "\t/^" + line.rstrip("\n") + "$/;\"\tf")
+        return lines
+
+class test_tag_watch(unittest.TestCase):
+    def setUp(self):
+        self.root = "watched_tree"
+        os.makedirs(os.path.join(self.root, "pkg"))
+        self.write("a.py", "def func_a():\n    pass\n")
+        self.write("pkg/b.py", "class class_b:\n    pass\n")
+        self.write("notes.txt", "def not_source():\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, name, text):
+        path = os.path.join(self.root, name)
+        f = open(path, "w")
+        f.write(text)
+        f.close()
+        # make sure the change shows even on file systems with coarse modification times
+        st = os.stat(path)
+        os.utime(path, (st.st_atime, st.st_mtime + 2))
+
+    def names(self, watcher):
+        watcher.lock.acquire()
+        try:
+            return sorted([t.name for t in watcher.tagfile.tags])
+        finally:
+            watcher.lock.release()
+
+    def test_harvester_remove(self):
+        entries = [ctags_entry("a\ta.py\t/^a$/;\"\tkind:f"), ctags_entry("a\tb.py\t/^a$/;\"\tkind:f"), ctags_entry("b\tb.py\t/^b$/;\"\tkind:c")]
+        kinds = kind_harvester()
+        by_name = by_name_harvester()
+        names = name_lookup_harvester()
+        for h in [kinds, by_name, names]:
+            h.process_tag_list(entries)
+            h.remove(entries[1])
+            h.remove(entries[2])
+            h.do_after()
+        self.failUnlessEqual(kinds.get_data(), {'f' : [entries[0]]})
+        self.failUnlessEqual(by_name.get_data(), {'a' : [entries[0]]})
+        self.failUnlessEqual(names.starts_with(''), ['a'])
+        names.remove(entries[0])
+        names.do_after()
+        self.failUnlessEqual(names.starts_with(''), [])
+
+    def test_check(self):
+        names = name_lookup_harvester()
+        updates = list()
+        watcher = tag_watcher(exuberant_ctags(tag_program=tag_program), self.root, harvesters=[names],
+            on_update=lambda changed, removed: updates.append((changed, removed)))
+        self.failUnlessEqual(watcher.check(), ([], []))
+        self.failUnlessEqual(self.names(watcher), ['class_b', 'func_a'])
+        self.failUnlessEqual(names.starts_with(''), ['class_b', 'func_a'])
+
+        a = os.path.join(self.root, "a.py")
+        b = os.path.join(self.root, "pkg", "b.py")
+        c = os.path.join(self.root, "pkg", "deeper", "c.py")
+        self.write("a.py", "def func_a2():\n    pass\n")
+        os.remove(b)
+        os.makedirs(os.path.join(self.root, "pkg", "deeper"))
+        self.write("pkg/deeper/c.py", "def func_c():\n    pass\n")
+        self.failUnlessEqual(watcher.check(), (sorted([a, c]), [b]))
+        self.failUnlessEqual(self.names(watcher), ['func_a2', 'func_c'])
+        self.failUnlessEqual(names.starts_with(''), ['func_a2', 'func_c'])
+        self.failUnlessEqual(updates, [(sorted([a, c]), [b])])
+
+        shutil.rmtree(os.path.join(self.root, "pkg"))
+        self.failUnlessEqual(watcher.check(), ([], [c]))
+        self.failUnlessEqual(self.names(watcher), ['func_a2'])
+
+        # errors on the watching thread are kept, and the next change is still picked up
+        def fail(changed, removed):
+            raise RuntimeError("callback failed")
+        watcher.on_update = fail
+        self.write("a.py", "def func_a3():\n    pass\n")
+        watcher._guarded_update(None)
+        self.failUnlessEqual([str(e) for e in watcher.errors], ["callback failed"])
+        self.failUnlessEqual(self.names(watcher), ['func_a3'])
+
+    def test_renamed_files(self):
+        watcher = tag_watcher(absolute_ctags(), self.root)
+        watcher.check()
+        a = os.path.join(self.root, "a.py")
+        self.failUnlessEqual([t.name for t in watcher.tagfile.file_tags(a)], ['func_a'])
+        
+        # the old tags are found under the scanned name and replaced
+        self.write("a.py", "def func_a2():\n    pass\n")
+        self.failUnlessEqual(watcher.check(), ([a], []))
+        self.failUnlessEqual(self.names(watcher), ['class_b', 'func_a2'])
+        self.failUnlessEqual(sorted(set([t.file for t in watcher.tagfile.tags])), sorted([a, os.path.join(self.root, "pkg", "b.py")]))
+
+    def test_harvester_support(self):
+        self.failUnlessRaises(ValueError, tag_watcher, exuberant_ctags(tag_program=tag_program), self.root, harvesters=[base_harvester()])
+
+    def test_watch(self):
+        names = by_name_harvester()
+        for polling in [False, True]:
+            watcher = tag_watcher(exuberant_ctags(tag_program=tag_program), self.root, harvesters=[names], polling=polling, poll_interval=0.1)
+            watcher.start()
+            try:
+                self.write("pkg/new.py", "def func_new():\n    pass\n")
+                deadline = time.time() + 10
+                while 'func_new' not in self.names(watcher) and time.time() < deadline:
+                    time.sleep(0.05)
+                self.failUnless('func_new' in self.names(watcher), watcher.mode)
+                self.failUnless('func_new' in names.get_data())
+                self.failUnlessEqual(watcher.errors, [])
+            finally:
+                watcher.stop()
+            os.remove(os.path.join(self.root, "pkg", "new.py"))
+            names = by_name_harvester()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not, 
+##    see <http://www.gnu.org/licenses/>.
+
+import unittest, sys, os
+sys.path.append("../pyctags")
+from tag_file import ctags_file
+from tag_entry import ctags_entry
+from tag_writer import write_tags, merge_tags
+from tag_lookup import ctags_lookup
+
+class test_tag_writer(unittest.TestCase):
+    def tearDown(self):
+        for f in ["written.tags", "written2.tags", "merged.tags"]:
+            if os.path.exists(f):
+                os.remove(f)
+
+    def test_sorted(self):
+        tf = ctags_file("extended.tags")
+        tags = list(reversed(tf.tags))
+        
+        # a small run size spills runs to temporary files
+        self.failUnlessEqual(write_tags(tags, "written.tags", run_size=7), len(tags))
+        self.failUnlessEqual(write_tags(tags, "written2.tags"), len(tags))
+        self.failUnlessEqual(open("written.tags").read(), open("written2.tags").read())
+        
+        tf2 = ctags_file("written.tags")
+        self.failUnlessEqual(tf2.sorted, 1)
+        self.failUnlessEqual(len(tf2.tags), len(tags))
+        for t in tags:
+            self.failUnless(t in tf2.tags)
+        names = [t.name for t in tf2.tags]
+        self.failUnlessEqual(names, sorted(names))
+
+    def test_foldcase(self):
+        tf = ctags_file("extended.tags", columnar=True)
+        tf.write("written.tags", sort=2, run_size=5)
+        tf2 = ctags_file("written.tags")
+        self.failUnlessEqual(tf2.sorted, 2)
+        self.failUnlessEqual(tf2.version, tf.version)
+        names = [t.name.upper() for t in tf2.tags]
+        self.failUnlessEqual(names, sorted(names))
+        
+        lookup = ctags_lookup("written.tags")
+        try:
+            name = tf.tags[0].name
+            self.failUnlessEqual(len(lookup.find(name.swapcase(), case_sensitive=False)), len([t for t in tf.tags if t.name.upper() == name.upper()]))
+        finally:
+            lookup.close()
+
+    def test_foldcase_non_ascii(self):
+        names = [u'\xdf', u'sa', u'sz', u'\xe4', u'b', u'\xc4']
+        tags = [ctags_entry(name + u'\tfold.c\t/^' + name + u'$/;"\tkind:v') for name in names]
+        write_tags(tags, "written.tags", sort=2)
+        lookup = ctags_lookup("written.tags")
+        try:
+            # only ASCII letters are folded, as the lookup's binary search expects
+            for name in names:
+                self.failUnlessEqual([t.name for t in lookup.find(name, case_sensitive=False)], [name])
+        finally:
+            lookup.close()
+    
+    def test_unsorted(self):
+        tf = ctags_file("extended.tags")
+        tags = list(reversed(tf.tags))
+        write_tags(tags, "written.tags", sort=0)
+        tf2 = ctags_file("written.tags")
+        self.failUnlessEqual(tf2.sorted, 0)
+        self.failUnlessEqual(tf2.tags, tags)
+        
+        self.failUnlessRaises(ValueError, write_tags, tags, "written.tags", sort=3)
+    
+    def test_merge(self):
+        tf = ctags_file("extended.tags")
+        half = len(tf.tags) // 2
+        write_tags(tf.tags[:half], "written.tags")
+        write_tags(tf.tags[half - 3:], "written2.tags")
+        
+        self.failUnlessEqual(merge_tags(["written.tags", "written2.tags"], "merged.tags"), len(tf.tags) + 3)
+        
+        # duplicates have the same name, file and locator
+        identities = set([(t.name, t.file, t.pattern or t.line_number) for t in tf.tags])
+        self.failUnlessEqual(merge_tags(["written.tags", "written2.tags"], "merged.tags", deduplicate=True), len(identities))
+        merged = open("merged.tags").read()
+        tf2 = ctags_file("merged.tags")
+        self.failUnlessEqual(tf2.sorted, 1)
+        self.failUnlessEqual(set([(t.name, t.file, t.pattern or t.line_number) for t in tf2.tags]), identities)
+        names = [t.name for t in tf2.tags]
+        self.failUnlessEqual(names, sorted(names))
+        
+        # ctags_file inputs are sorted in memory
+        lines = [l for l in open("extended.tags").readlines() if l[0] != '!']
+        merge_tags([ctags_file(list(reversed(lines))), "written2.tags"], "merged.tags", deduplicate=True)
+        self.failUnlessEqual(open("merged.tags").read(), merged)
+        
+        write_tags(tf.tags, "written2.tags", sort=2)
+        self.failUnlessRaises(ValueError, merge_tags, ["written.tags", "written2.tags"], "merged.tags")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+## Copyright (C) 2008 Ben Smith <benjamin.coder.smith@gmail.com>
+
+##    This file is part of pyctags.
+
+##    pyctags is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU Lesser General Public License as published
+##    by the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+
+##    pyctags is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+
+##    You should have received a copy of the GNU Lesser General Public License
+##    and the GNU Lesser General Public Licens along with pyctags.  If not, 
+##    see <http://www.gnu.org/licenses/>.
+
+import unittest, sys
+sys.path.append("../pyctags")
+from universal import universal_ctags, _xref_entry, _json_entry, _machinable_rows, _enabled_fields, _fits_xref
+from tag_entry import ctags_entry
+from tag_file import ctags_file
+from make_tagfiles import file_lists
+
+universal_program = 'ctags'
+
+def universal():
+    """ @returns: a universal_ctags wrapper, or None if ctags isn't installed or isn't Universal Ctags."""
+    try:
+        uc = universal_ctags(tag_program=universal_program, files=file_lists['relpath'])
+    except TypeError:
+        return None
+    if uc.output_formats is None:
+        return None
+    return uc
+
+class test_universal_ctags(unittest.TestCase):
+    def test_xref_entry(self):
+        strings = dict()
+        e = _xref_entry('get\tsrc/a.py\t12\tmember\tclass\tcache\t/^    def get(self,\tkey):$/', strings)
+        self.failUnlessEqual(e.name, 'get')
+        self.failUnlessEqual(e.file, 'src/a.py')
+        self.failUnlessEqual(e.line_number, 12)
+        # the tab in the pattern survives
+        self.failUnlessEqual(e.pattern, '/^    def get(self,\tkey):$/')
+        self.failUnlessEqual(dict(e.extensions), {'kind' : 'member', 'line' : '12', 'class' : 'cache'})
+        
+        e2 = _xref_entry('cache\tsrc/a.py\t3\tclass\t-\t-\t/^class cache:$/', strings)
+        self.failUnlessEqual(dict(e2.extensions), {'kind' : 'class', 'line' : '3'})
+        self.failUnless(e2.file is e.file)
+        
+        self.failUnlessRaises(ValueError, _xref_entry, 'get\tsrc/a.py\t12', strings)
+        self.failUnlessRaises(ValueError, _xref_entry, 'get\tsrc/a.py\t-\tmember\t-\t-\t-', strings)
+
+    def test_json_entry(self):
+        strings = dict()
+        line = '{"_type": "tag", "name": "get", "path": "src/a.py", "pattern": "/^    def get(self,\\tkey):$/", "line": 12, "kind": "member", "scope": "cache", "scopeKind": "class", "file": true}'
+        e = _json_entry(line, strings)
+        self.failUnlessEqual(e.name, 'get')
+        self.failUnlessEqual(e.line_number, 12)
+        self.failUnlessEqual(e.pattern, '/^    def get(self,\tkey):$/')
+        self.failUnlessEqual(dict(e.extensions), {'kind' : 'member', 'line' : '12', 'class' : 'cache', 'file' : ''})
+        
+        # the same tag from the classic format
+        classic = ctags_entry('get\tsrc/a.py\t/^    def get(self,\tkey):$/;"\tkind:member\tline:12\tclass:cache\tfile:')
+        self.failUnlessEqual(repr(e), repr(classic))
+        
+        # kinds named in JSON can be turned into the letters the classic format writes
+        kind_letters = {'python' : {'member' : 'm'}}
+        e = _json_entry(line[:-1] + ', "language": "Python"}', strings, kind_letters, False)
+        self.failUnlessEqual(dict(e.extensions), {'kind' : 'm', 'line' : '12', 'class' : 'cache', 'file' : ''})
+        e = _json_entry(line[:-1] + ', "language": "Python"}', strings, kind_letters)
+        self.failUnlessEqual(e.extensions['language'], 'Python')
+        
+        self.failUnlessEqual(_json_entry('{"_type": "ptag", "name": "JSON_OUTPUT_VERSION", "path": "0.0"}', strings), None)
+        self.failUnlessRaises(ValueError, _json_entry, '{"_type": "tag", "name": "get"}', strings)
+        self.failUnlessRaises(ValueError, _json_entry, 'get\tsrc/a.py\t12', strings)
+
+    def test_fields(self):
+        self.failUnlessEqual(_enabled_fields({}), set('NFPfkst'))
+        self.failUnlessEqual(_enabled_fields({'--fields' : '+Kn-f'}), set('NFPkstKn'))
+        self.failUnlessEqual(_enabled_fields({'--fields' : 'Kn'}), set('Kn'))
+        self.failUnlessEqual(_enabled_fields({'--fields' : '+{signature}-t'}), set(['N', 'F', 'P', 'f', 'k', 's', '{signature}']))
+        
+        # the default file scope and typeref fields aren't in cross reference output
+        self.failIf(_fits_xref({}))
+        self.failUnless(_fits_xref({'--fields' : '-ft+Kn'}))
+        self.failIf(_fits_xref({'--fields' : '-ft+S'}))
+        self.failIf(_fits_xref({'--fields' : '-ft', '--fields-C++' : '+{template}'}))
+
+    def test_machinable_rows(self):
+        rows = _machinable_rows("#LANGUAGE\tEXTENSION\nC\tc\nC\th\n")
+        self.failUnlessEqual(rows, [{'LANGUAGE' : 'C', 'EXTENSION' : 'c'}, {'LANGUAGE' : 'C', 'EXTENSION' : 'h'}])
+        self.failUnlessEqual(_machinable_rows("ctags: Unknown option\n"), [])
+
+    def test_output_formats(self):
+        uc = universal()
+        if uc is None:
+            return
+        self.failUnless(len(uc.output_formats))
+        self.failUnlessEqual(uc.output_formats[-1], 'ctags')
+        self.failUnless('.py' in uc.all_extensions)
+        
+        key = lambda t: (t.name, t.file, t.line_number)
+        classic = sorted(uc.generate_object(output_format='ctags', generator_options={'--fields' : '+Kn-f'}).tags, key=key)
+        self.failUnless(len(classic))
+        for fmt in uc.output_formats:
+            tf = uc.generate_object(output_format=fmt, generator_options={'--fields' : '+Kn-f'})
+            tags = sorted(tf.tags, key=key)
+            self.failUnlessEqual([(t.name, t.file, t.line_number, t.pattern) for t in tags], [(t.name, t.file, t.line_number, t.pattern) for t in classic])
+        
+        self.failUnlessEqual(len(ctags_file(uc.generate_tags()).tags), len(classic))
+        
+        # the default format keeps the default fields, and kinds as the classic format writes them
+        classic = sorted(uc.generate_object(output_format='ctags').tags, key=key)
+        tags = sorted(uc.generate_object().tags, key=key)
+        self.failUnlessEqual([(t.name, t.file, t.extensions.get('kind')) for t in tags], [(t.name, t.file, t.extensions.get('kind')) for t in classic])
+        uc.generate_object(generator_options={'--fields' : '+S'})
+        self.failIf(uc.command_line.find(' -x ') >= 0)
+
+    def test_generate_buffers(self):
+        uc = universal()
+        if uc is None:
+            return
+        text = u'def unsaved_function():\n    pass\n'
+        buffers = [('src/unsaved.py', text), ('other/unsaved.py', text)]
+        tf = uc.generate_buffers(buffers)
+        self.failUnless(tf)
+        names = sorted([(t.name, t.file) for t in tf.tags])
+        self.failUnlessEqual(names, [('unsaved_function', 'other/unsaved.py'), ('unsaved_function', 'src/unsaved.py')])
+        
+        # without the interactive mode, the buffers go through temporary files
+        uc.features = [f for f in uc.features if f != 'interactive']
+        tf = uc.generate_buffers(buffers)
+        self.failUnlessEqual(sorted([(t.name, t.file) for t in tf.tags]), names)
+
+if __name__ == '__main__':
+    unittest.main()
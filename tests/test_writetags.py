@@ -18,15 +18,32 @@
 ##    see <http://www.gnu.org/licenses/>.
 
 
-import unittest, os, sys
+import unittest, os, sys, shutil, tempfile
 sys.path.append("../pyctags")
-from exuberant import exuberant_ctags
+from exuberant import exuberant_ctags, _shard_files
+import tag_base
 from tag_lists import tag_lists
 from make_tagfiles import file_lists, extended_tests, tag_program
 from tag_file import ctags_file
 
+_cache_dirs = list()
+
+def setUpModule():
+    # keep probe results out of the user's cache directory
+    _cache_dirs.append((tag_base.ctags_base.probe_cache_dir, tempfile.mkdtemp()))
+    tag_base.ctags_base.probe_cache_dir = _cache_dirs[-1][1]
+
+def tearDownModule():
+    (tag_base.ctags_base.probe_cache_dir, cache_dir) = _cache_dirs.pop()
+    shutil.rmtree(cache_dir, True)
 
 class test_exuberant_ctags(unittest.TestCase):
+    def setUp(self):
+        # each test probes ctags afresh, whatever ran before it
+        tag_base._probe_results.clear()
+    
+    def tearDown(self):
+        tag_base._probe_results.clear()
     
     def test_init(self):
         ec = exuberant_ctags(tag_program=tag_program, files=file_lists['relpath'])
@@ -140,6 +157,15 @@ class test_exuberant_ctags(unittest.TestCase):
         ec.generate_tags(files=file_lists['relpath'])
         self.failUnlessEqual(len(ec.warnings), 0)
     
+    def test_generate_object_warnings(self):
+        # more warnings than a pipe holds, while tags are still being written
+        fl = file_lists['relpath'] + ["missing_%d.py" % (i) for i in range(5000)] + file_lists['relpath']
+        ec = exuberant_ctags(tag_program=tag_program, files=fl)
+        tf = ec.generate_object()
+        self.failIfEqual(tf, None)
+        self.failUnlessEqual(len(ec.warnings), 5000)
+        self.failUnless(len(tf.tags))
+    
     def test_generate_object(self):
         ec = exuberant_ctags(tag_program=tag_program, files=file_lists['relpath'])
         tf = ec.generate_object()
@@ -152,6 +178,104 @@ class test_exuberant_ctags(unittest.TestCase):
             self.failUnlessEqual(repr(tag), repr(tf.tags[i]))
             i += 1
     
+    def test_jobs(self):
+        ec = exuberant_ctags(tag_program=tag_program, files=file_lists['relpath'])
+        tags = ec.generate_tags()
+        self.failUnlessEqual(ec.generate_tags(jobs=3), tags)
+        
+        tf = ec.generate_object()
+        tf2 = ec.generate_object(jobs=3)
+        self.failUnlessEqual([repr(t) for t in tf2.tags], [repr(t) for t in tf.tags])
+        
+        ec.generate_tagfile("generated.tags")
+        ec.generate_tagfile("sharded.tags", jobs=3)
+        self.failUnlessEqual([repr(t) for t in ctags_file("sharded.tags").tags], [repr(t) for t in ctags_file("generated.tags").tags])
+        os.remove("generated.tags")
+        os.remove("sharded.tags")
+    
+    def test_combine_tagfiles(self):
+        ec = exuberant_ctags()
+        shards = ["shard0.tags", "shard1.tags"]
+        f = open(shards[0], 'wb')
+        f.write(b'!_TAG_FILE_FORMAT\t1\t/original ctags format/\n')
+        f.write(b'!_TAG_FILE_SORTED\t1\t/0=unsorted, 1=sorted, 2=foldcase/\n')
+        f.write(b'!_TAG_PROGRAM_AUTHOR\tJ\xf6rg\t//\n')
+        f.write(b'b\tb.c\t/^int b;$/\n')
+        f.close()
+        f = open(shards[1], 'wb')
+        f.write(b'!_TAG_FILE_FORMAT\t1\t/original ctags format/\n')
+        f.write(b'a\ta.c\t/^char *a = "\xe9";$/\n')
+        f.close()
+        
+        ec._combine_tagfiles({"--sort" : "yes"}, shards, "combined.tags")
+        f = open("combined.tags", 'rb')
+        self.failUnlessEqual(f.read().splitlines(), [b'!_TAG_FILE_FORMAT\t1\t/original ctags format/',
+            b'!_TAG_FILE_SORTED\t1\t/0=unsorted, 1=sorted, 2=foldcase/', b'!_TAG_PROGRAM_AUTHOR\tJ\xf6rg\t//',
+            b'a\ta.c\t/^char *a = "\xe9";$/', b'b\tb.c\t/^int b;$/'])
+        f.close()
+        for name in shards + ["combined.tags"]:
+            os.remove(name)
+    
+    def test_shard_files(self):
+        files = file_lists['relpath']
+        shards = _shard_files(files, 3)
+        self.failUnlessEqual(len(shards), min(3, len(files)))
+        self.failUnlessEqual([f for shard in shards for f in shard], files)
+        for shard in shards:
+            self.failUnless(len(shard))
+        
+        self.failUnlessEqual(_shard_files(['a', 'b'], 8), [['a'], ['b']])
+    
+    def test_batches(self):
+        ec = exuberant_ctags(tag_program=tag_program, files=file_lists['relpath'])
+        tags = ec.generate_tags()
+        ec.generate_tagfile("generated.tags")
+        
+        # one ctags process per file, run one after another
+        ec.batch_size = 1
+        self.failUnlessEqual(ec.generate_tags(), tags)
+        self.failUnlessEqual(ec.generate_tags(jobs=2), tags)
+        ec.generate_tagfile("batched.tags")
+        self.failUnlessEqual([repr(t) for t in ctags_file("batched.tags").tags], [repr(t) for t in ctags_file("generated.tags").tags])
+        os.remove("generated.tags")
+        os.remove("batched.tags")
+    
+    def test_argv(self):
+        ec = exuberant_ctags()
+        ec._executable_path = "ctags"
+        argv = ec._dict_to_argv({"-L" : "-", "-f" : "my tags", "--fields" : "+n", "-e" : None})
+        self.failUnlessEqual(argv, ["ctags", "-e", "-L", "-", "-f", "my tags", "--fields=+n"])
+        
+        files = ["dir %d/file %d.py" % (i, i) for i in range(20000)]
+        chunks = list(tag_base._file_list_chunks(files, "\n"))
+        self.failUnless(len(chunks) > 1)
+        self.failUnlessEqual(b''.join(chunks).decode().splitlines(), files)
+        self.failUnlessEqual(list(tag_base._file_list_chunks([])), [])
+    
+    def test_probe_cache(self):
+        class counting_ctags(exuberant_ctags):
+            probe_cache_dir = tempfile.mkdtemp()
+            probes = 0
+            def _query_tag_generator(self, path):
+                counting_ctags.probes += 1
+                exuberant_ctags._query_tag_generator(self, path)
+        
+        try:
+            ec = counting_ctags(tag_program=tag_program)
+            ec2 = counting_ctags(tag_program=tag_program)
+            ec2.generate_tags(tag_program=tag_program, files=file_lists['relpath'])
+            self.failUnlessEqual(counting_ctags.probes, 1)
+            self.failUnlessEqual(ec2.language_info, ec.language_info)
+            self.failUnlessEqual(ec2.version, ec.version)
+            
+            # a new process finds the results on disk
+            tag_base._probe_results.clear()
+            ec3 = counting_ctags(tag_program=tag_program)
+            self.failUnlessEqual(counting_ctags.probes, 1)
+            self.failUnlessEqual(ec3.all_extensions, ec.all_extensions)
+        finally:
+            shutil.rmtree(counting_ctags.probe_cache_dir, True)
+    
     def test_language_maps(self):
         ec = exuberant_ctags(tag_program=tag_program)
         self.failUnless('.x68' in ec.all_extensions)
@@ -159,5 +283,29 @@ class test_exuberant_ctags(unittest.TestCase):
         self.failUnless('makefile' in ec.all_extensions)
         self.failUnless('.scm' in ec.all_extensions)
         
+    def test_write_buffers(self):
+        try:
+            os.mkdir("buffers")
+            (files, virtual) = tag_base._write_buffers([('src/a.py', u'def a():\n    pass\n'), ('lib/a.py', b'x = 1\n')], "buffers")
+            self.failUnlessEqual(len(files), 2)
+            self.failIf(files[0] == files[1])
+            self.failUnlessEqual([os.path.basename(f) for f in files], ['a.py', 'a.py'])
+            self.failUnlessEqual([virtual[f] for f in files], ['src/a.py', 'lib/a.py'])
+            self.failUnlessEqual(open(files[1], 'rb').read(), b'x = 1\n')
+        finally:
+            shutil.rmtree("buffers", True)
+    
+    def test_generate_buffers(self):
+        ec = exuberant_ctags(tag_program=tag_program, files=file_lists['relpath'])
+        text = u'def unsaved_function():\n    pass\n\nclass unsaved_class:\n    pass\n'
+        tf = ec.generate_buffers([('src/unsaved.py', text), ('other/unsaved.py', text)])
+        self.failUnless(tf)
+        names = [(t.name, t.file) for t in tf.tags]
+        self.failUnless(('unsaved_function', 'src/unsaved.py') in names)
+        self.failUnless(('unsaved_class', 'other/unsaved.py') in names)
+        self.failUnlessEqual(len(names), 4)
+        self.failUnlessEqual(ec._file_list, file_lists['relpath'])
+        self.failUnlessRaises(ValueError, ec.generate_buffers, [], generator_options={'-L' : 'files'})
+        
 if __name__ == '__main__':
     unittest.main()